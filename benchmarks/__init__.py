@@ -0,0 +1 @@
+"""dexterCLI benchmarks."""
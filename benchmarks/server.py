@@ -0,0 +1,487 @@
+"""
+Stand-in Dexter API server for benchmarks.
+
+Serves a configurable number of synthetic reports from the 'reports'
+endpoints, with full report bodies of a configurable size which are
+generated as they are sent, so that payloads much larger than memory can
+be served. Status and report bodies have ETags and honour If-None-Match
+with '304 Not Modified', report bodies may be requested in part with
+Range (and If-Range), or compressed with 'encoding' (brotli or gzip) if
+the client accepts it, and every 'throttle'th request to queue a report
+is refused with '429 Too Many Requests'. Queued reports are complete
+after 'delay' seconds, when their callback URL (if any) is called.
+
+Usage: python -m benchmarks.server [--port N] [--reports N] [--size SIZE]
+                                   [--throttle N] [--delay SECONDS]
+"""
+
+import argparse
+import collections.abc
+import contextlib
+import datetime
+import http.server
+import json
+import re
+import threading
+import time
+from typing import Any
+import urllib.parse
+import urllib.request
+import zlib
+
+import brotli  # type: ignore[import-untyped]
+
+# The time at which the synthetic reports were queued, relative to which
+# report 'i' was queued 'i' seconds earlier
+EPOCH = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+# The status of each synthetic report, by its number modulo 4
+STATUSES = ('queued', 'running', 'complete', 'callback')
+# A page in a full report body, which has a fixed length
+PAGE = (
+    '{{"url": "https://example.com/page/{0:010d}", "status": 200,'
+    ' "title": "Page {0:010d}", "links": ["https://example.com/",'
+    ' "https://example.com/about"], "size": 12345, "time": 0.25,'
+    ' "headers": {{"content-type": "text/html; charset=utf-8"}}}}'
+)
+# The number of pages to generate at once when sending a report body
+PAGES_PER_BLOCK = 1000
+# Suffixes for sizes given on the command line
+SIZE_SUFFIXES = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(size: str) -> int:
+    """Parse a size in bytes, which may have a suffix K, M or G."""
+    match = re.fullmatch(r'(\d+)([KMG]?)B?', size.strip().upper())
+    if not match:
+        raise ValueError(f'invalid size: {size!r}')
+    return int(match.group(1)) * SIZE_SUFFIXES[match.group(2)]
+
+
+def report(number: int, root: str) -> dict[str, Any]:
+    """Return the status of a synthetic report."""
+    status = STATUSES[number % 4]
+    queued = EPOCH - datetime.timedelta(seconds=number)
+    return {
+        'id': f'r{number}',
+        'url': f'https://example.com/site/{number}',
+        'priority': number % 3,
+        'status': status,
+        'pages': 100 if status == 'complete' else number % 100,
+        'requestedPages': 100,
+        'queued': queued.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'detail': f'{root}detail/r{number}',
+    }
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Request handler for the stand-in API."""
+
+    protocol_version = 'HTTP/1.1'
+    server: 'DexterServer'
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Do not log requests."""
+
+    def send(
+        self,
+        status: int,
+        body: bytes = b'',
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """Send a complete response."""
+        self.send_response(status)
+        if body:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(
+        self,
+        data: Any,  # noqa: ANN401
+        etag: str | None = None,
+        status: int = 200,
+    ) -> None:
+        """Send a JSON response, or '304 Not Modified' if it is unchanged."""
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            self.send(304, headers={'ETag': etag})
+            return
+        self.send(
+            status,
+            json.dumps(data).encode(),
+            {'ETag': etag} if etag is not None else None,
+        )
+
+    def do_GET(self) -> None:
+        """Handle a GET request."""
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/reports':
+            self.list_reports(urllib.parse.parse_qs(url.query))
+        elif match := re.fullmatch(r'/reports/r(\d+)', url.path):
+            self.status(int(match.group(1)))
+        elif match := re.fullmatch(r'/detail/r(\d+)', url.path):
+            self.detail(int(match.group(1)))
+        else:
+            self.send(404)
+
+    def do_POST(self) -> None:
+        """Queue a report."""
+        data = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])))
+        if self.server.throttled():
+            self.send(429, headers={'Retry-After': '0'})
+            return
+        self.send_json(self.server.queue(data), status=201)
+
+    def do_PUT(self) -> None:
+        """Update a report's metadata."""
+        data = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])))
+        self.send_json(data)
+
+    def do_DELETE(self) -> None:
+        """Delete a report."""
+        self.send(204)
+
+    def list_reports(self, query: dict[str, list[str]]) -> None:
+        """
+        Send a list of reports, optionally filtered and paginated.
+
+        Pages are at most 'max_page' reports, if it is set. If the server
+        uses cursors, the cursor for a page is its offset.
+        """
+        limit = int(query['limit'][0]) if 'limit' in query else None
+        if self.server.max_page:
+            limit = min(limit or self.server.max_page, self.server.max_page)
+        self.send(200, self.server.list_body(
+            frozenset(query.get('status', ())),
+            int(query.get('cursor', query.get('offset', ['0']))[0]),
+            limit,
+        ))
+
+    def status(self, number: int) -> None:
+        """Send the status of a report."""
+        if (status := self.server.status(number)) is None:
+            self.send(404)
+            return
+        self.send_json(status, f'"s{number}-{status["status"]}"')
+
+    def detail(self, number: int) -> None:
+        """Send a full report, generating its body as it is sent."""
+        if self.server.status(number) is None:
+            self.send(404)
+            return
+        pages = self.server.detail_pages()
+        encoding = self.server.encoding
+        if encoding and encoding not in self.headers.get(
+            'Accept-Encoding', ''
+        ):
+            encoding = None
+        etag = f'"d{number}-{pages}{"-" + encoding if encoding else ""}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send(304, headers={'ETag': etag})
+            return
+        prefix = f'{{"id": "r{number}", "pages": ['.encode()
+        suffix = b']}'
+        if encoding:
+            self.send_encoded(
+                encoding, etag, self.detail_blocks(prefix, pages, suffix))
+            return
+        page_length = len(PAGE.format(0)) + 2
+        length = len(prefix) + pages * page_length - 2 + len(suffix)
+        offset = 0
+        if (
+            (match := re.fullmatch(
+                r'bytes=(\d+)-', self.headers.get('Range', ''))) and
+            self.headers.get('If-Range', etag) == etag
+        ):
+            offset = int(match.group(1))
+            if offset >= length:
+                self.send(416, headers={'Content-Range': f'bytes */{length}'})
+                return
+        self.send_response(206 if offset else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        if offset:
+            self.send_header(
+                'Content-Range', f'bytes {offset}-{length - 1}/{length}')
+        self.send_header('Content-Length', str(length - offset))
+        self.end_headers()
+        for block in self.detail_blocks(prefix, pages, suffix):
+            if offset >= len(block):
+                offset -= len(block)
+                continue
+            self.wfile.write(block[offset:])
+            offset = 0
+
+    def send_encoded(
+        self,
+        encoding: str,
+        etag: str,
+        blocks: collections.abc.Iterable[bytes],
+    ) -> None:
+        """Send a body compressed as it is sent, closing the connection."""
+        compressor: Any = (
+            brotli.Compressor() if encoding == 'br' else
+            zlib.compressobj(wbits=16 + zlib.MAX_WBITS))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', etag)
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for block in blocks:
+            self.wfile.write(
+                compressor.process(block) if encoding == 'br' else
+                compressor.compress(block))
+        self.wfile.write(compressor.finish() if encoding == 'br' else
+                         compressor.flush())
+
+    @staticmethod
+    def detail_blocks(
+        prefix: bytes, pages: int, suffix: bytes
+    ) -> collections.abc.Iterator[bytes]:
+        """Yield the body of a full report in blocks of pages."""
+        yield prefix
+        for start in range(0, pages, PAGES_PER_BLOCK):
+            end = min(start + PAGES_PER_BLOCK, pages)
+            block = ', '.join(PAGE.format(page) for page in range(start, end))
+            yield (', ' + block if start else block).encode()
+        yield suffix
+
+
+class DexterServer(http.server.ThreadingHTTPServer):
+    """
+    Stand-in Dexter API server.
+
+    The server runs on a background thread, listening on the loopback
+    interface, and may be reconfigured while it is running. It may be used
+    as a context manager, which stops the server on exit.
+    """
+
+    daemon_threads = True
+    # Clients open many connections at once, which would otherwise overflow
+    # the default listen backlog of 5 and wait for SYNs to be retransmitted
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        port: int = 0,
+        *,
+        reports: int = 10,
+        size: int = 1 << 20,
+        throttle: int = 0,
+        delay: float = 1.0,
+    ) -> None:
+        """
+        Initialise the server, without starting it.
+
+        Lists of reports are paginated by offset, without a maximum page
+        size, and full reports are not compressed (see configure()).
+        """
+        super().__init__(('127.0.0.1', port), Handler)
+        self.cursors = False
+        self.delay = delay
+        self.details = True
+        self.encoding: str | None = None
+        self.max_page = 0
+        self.lock = threading.Lock()
+        self.posts = 0
+        self.queued: dict[int, tuple[float, dict[str, Any]]] = {}
+        self.reports = reports
+        self.root = f'http://127.0.0.1:{self.server_address[1]}/'
+        self.size = size
+        self.throttle = throttle
+        self.thread: threading.Thread | None = None
+        self.bodies: dict[tuple[frozenset[str], int, int | None], bytes] = {}
+        self.numbers: dict[frozenset[str], list[int]] = {}
+
+    def __enter__(self) -> 'DexterServer':  # noqa: PYI034
+        """Start the server on a background thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, name='dexter-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+    def configure(
+        self,
+        *,
+        reports: int | None = None,
+        size: int | None = None,
+        throttle: int | None = None,
+        max_page: int | None = None,
+        cursors: bool | None = None,
+        details: bool | None = None,
+        encoding: str | None = None,
+    ) -> None:
+        """
+        Change the number of reports, report size, throttling or paging.
+
+        If 'details' is false, lists of reports leave out each report's
+        'detail' URL, which is then only in the report's own status. Full
+        reports are compressed with 'encoding' ('br' or 'gzip', or '' for
+        none) if the client accepts it.
+        """
+        with self.lock:
+            if reports is not None:
+                self.reports = reports
+                self.bodies.clear()
+                self.numbers.clear()
+            if max_page is not None:
+                self.max_page = max_page
+            if cursors is not None:
+                self.cursors = cursors
+                self.bodies.clear()
+            if details is not None:
+                self.details = details
+                self.bodies.clear()
+            if encoding is not None:
+                self.encoding = encoding or None
+            if size is not None:
+                self.size = size
+            if throttle is not None:
+                self.throttle = throttle
+                self.posts = 0
+
+    def queue(self, data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Queue a report, returning its status.
+
+        The report is complete after 'delay' seconds, at which point its
+        callback URL (if it has one) is called with its status.
+        """
+        with self.lock:
+            number = self.reports + len(self.queued)
+            self.queued[number] = (time.monotonic() + self.delay, data)
+        if data.get('callback'):
+            timer = threading.Timer(self.delay, self.call_back, (number,))
+            timer.daemon = True
+            timer.start()
+        return self.status(number) or {}
+
+    def status(self, number: int) -> dict[str, Any] | None:
+        """Return the status of a report, or None if it does not exist."""
+        if number < self.reports:
+            return report(number, self.root)
+        with self.lock:
+            if number not in self.queued:
+                return None
+            complete, data = self.queued[number]
+        done = time.monotonic() >= complete
+        status = {
+            **report(number, self.root),
+            **data,
+            'status': 'complete' if done else 'queued',
+        }
+        status['pages'] = status.pop('requestedPages', 1)
+        return status
+
+    def call_back(self, number: int) -> None:
+        """Send the status of a queued report to its callback URL."""
+        status = self.status(number)
+        if status is None:
+            return
+        request = urllib.request.Request(  # noqa: S310
+            status['callback'], json.dumps(status).encode(),
+            {'Content-Type': 'application/json'})
+        with contextlib.suppress(OSError):
+            urllib.request.urlopen(request, timeout=10).close()  # noqa: S310
+
+    def detail_pages(self) -> int:
+        """Return the number of pages in a full report of about 'size'."""
+        overhead = len('{"id": "r0", "pages": []}')
+        return max((self.size - overhead) // (len(PAGE.format(0)) + 2), 1)
+
+    def throttled(self) -> bool:
+        """Return whether a request to queue a report should be refused."""
+        with self.lock:
+            self.posts += 1
+            return bool(self.throttle) and self.posts % self.throttle == 0
+
+    def listed(self, number: int) -> dict[str, Any]:
+        """Return a report as it is given in a list of reports."""
+        status = report(number, self.root)
+        if not self.details:
+            del status['detail']
+        return status
+
+    def list_body(
+        self, statuses: frozenset[str], offset: int, limit: int | None
+    ) -> bytes:
+        """
+        Return the body of a list of reports.
+
+        Bodies are kept until the server is reconfigured, so that listing
+        a large number of reports repeatedly measures the client rather than
+        the server.
+        """
+        with self.lock:
+            if (body := self.bodies.get((statuses, offset, limit))):
+                return body
+            numbers = self.numbers.get(statuses)
+        if numbers is None:
+            numbers = [
+                number for number in range(self.reports)
+                if not statuses or STATUSES[number % 4] in statuses
+            ]
+        end = len(numbers) if limit is None else offset + limit
+        if self.cursors:
+            # A cursor rather than a total, as with a large or changing list
+            tail = f', "next": "{end}"' if end < len(numbers) else ''
+        else:
+            tail = f', "total": {len(numbers)}'
+        body = b''.join((
+            b'{"reports": {',
+            ', '.join(
+                f'"r{number}": {json.dumps(self.listed(number))}'
+                for number in numbers[offset:end]
+            ).encode(),
+            f'}}{tail}}}'.encode(),
+        ))
+        with self.lock:
+            self.bodies[statuses, offset, limit] = body
+            self.numbers[statuses] = numbers
+        return body
+
+
+def main() -> None:
+    """Run the server until interrupted."""
+    parser = argparse.ArgumentParser(
+        description='Run a stand-in Dexter API server')
+    parser.add_argument(
+        '--port', type=int, default=8000,
+        help='The port to listen on (default: 8000)')
+    parser.add_argument(
+        '--reports', metavar='N', type=int, default=10,
+        help='The number of reports (default: 10)')
+    parser.add_argument(
+        '--size', type=parse_size, default='1M',
+        help='The approximate size of each full report (default: 1M)')
+    parser.add_argument(
+        '--throttle', metavar='N', type=int, default=0,
+        help='Refuse every Nth request to queue a report with 429')
+    parser.add_argument(
+        '--delay', metavar='SECONDS', type=float, default=1.0,
+        help='The time until a queued report is complete, and its callback'
+        ' is called (default: 1)')
+    args = parser.parse_args()
+    with DexterServer(
+        args.port, reports=args.reports, size=args.size,
+        throttle=args.throttle, delay=args.delay,
+    ) as server:
+        print(f'Serving on {server.root}')
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
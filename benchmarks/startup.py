@@ -0,0 +1,103 @@
+"""
+dexterCLI start-up time benchmark.
+
+Runs the command-line interface with 'python -X importtime' for commands
+that make no API requests, and reports the median time spent importing
+modules after the interpreter has started. Exits with a non-zero status if
+any command exceeds its budget, or imports an HTTP library.
+
+Usage: python -m benchmarks.startup [--runs N] [--scale FACTOR]
+"""
+
+import argparse
+import os
+from pathlib import Path
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+
+# Commands to time, and their import-time budgets in milliseconds
+BUDGETS = {
+    '--version': 25.0,
+    '--help': 25.0,
+    'fetch --help': 50.0,
+    'status --help': 50.0,
+    'cache stats': 60.0,
+}
+# Modules which should only be imported when a request is made
+FORBIDDEN = ('requests', 'urllib3')
+
+
+def import_times(
+    args: list[str], env: dict[str, str]
+) -> tuple[float, set[str]]:
+    """Return the import time in milliseconds and the modules imported."""
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, '-X', 'importtime', '-m', 'dexterCLI', *args],
+        capture_output=True,
+        check=False,
+        env=env,
+        text=True,
+    )
+    total = 0
+    modules = set()
+    started = False
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[12:].split('|')
+        if cumulative.strip() == 'cumulative':
+            continue
+        modules.add(name.strip())
+        if not started:
+            # Ignore everything imported while the interpreter starts
+            started = name.strip() == 'site'
+        elif not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1000, modules
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(
+        description='Measure the start-up time of dexter commands')
+    parser.add_argument(
+        '--runs', type=int, default=11,
+        help='The number of times to run each command (default: 11)')
+    parser.add_argument(
+        '--scale', type=float, default=1.0,
+        help='Multiply the budgets by this factor (default: 1)')
+    args = parser.parse_args()
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            'PYTHONPATH': str(Path(__file__).resolve().parent.parent),
+            'PYTHONPYCACHEPREFIX': directory,
+            'XDG_CACHE_HOME': directory,
+        }
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        print(f'{"Command":<16}{"Median":>10}{"Budget":>10}')
+        for command, budget in BUDGETS.items():
+            argv = ['--rcfile', os.devnull, *command.split()]
+            import_times(argv, env)  # compile the bytecode
+            times = []
+            modules: set[str] = set()
+            for _ in range(max(args.runs, 1)):
+                elapsed, modules = import_times(argv, env)
+                times.append(elapsed)
+            median = statistics.median(times)
+            budget *= args.scale
+            status = 'ok'
+            if median > budget:
+                status = 'OVER BUDGET'
+            if forbidden := sorted(modules.intersection(FORBIDDEN)):
+                status = f'imports {", ".join(forbidden)}'
+            failed = failed or status != 'ok'
+            print(f'{command:<16}{median:>8.1f}ms{budget:>8.1f}ms  {status}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
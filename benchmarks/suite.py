@@ -0,0 +1,402 @@
+"""
+dexterCLI performance benchmarks.
+
+Starts a stand-in Dexter API server (see benchmarks.server) and times the
+command-line interface end-to-end, listing reports, displaying a report's
+status, fetching full reports (with and without the cache), exporting
+many reports concurrently to a directory and queueing reports while the
+server is refusing some requests. Each command is run with DEXTER_TRACE
+set, so the time taken by each phase (requests, downloads, decoding and
+rendering) is recorded as well. display_table() and display_verbose() are
+also timed directly.
+
+The results are written to a JSON file, and may be compared with the
+results from another version, in which case the exit status is non-zero
+if any benchmark is slower than the given threshold.
+
+Usage: python -m benchmarks.suite [--quick] [--runs N] [--output FILE]
+                                  [--compare FILE] [--threshold RATIO]
+"""
+
+import argparse
+import collections
+import datetime
+import functools
+import io
+import json
+import operator
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from typing import Any
+
+from dexterCLI import VERSION
+from dexterCLI.commands import Base, List
+from dexterCLI.report import Report
+
+from .server import DexterServer, parse_size, report
+
+# The numbers of reports, and the sizes of full reports, to benchmark with
+REPORTS = (10, 1000, 10000, 100000, 1000000)
+SIZES = ('1M', '10M', '100M', '1G')
+# Smaller sets of sizes for --quick
+QUICK_REPORTS = (10, 1000, 10000)
+QUICK_SIZES = ('1M', '10M')
+# The largest full report to display in the verbose format
+DISPLAY_LIMIT = 100 << 20
+# The number of reports to export with 'fetch --status', and the largest
+# full report to export them with
+EXPORT_REPORTS = 40
+EXPORT_LIMIT = 10 << 20
+# The number of reports to queue, and how often the server refuses one
+QUEUE_REPORTS = 100
+QUEUE_THROTTLE = 10
+
+
+class Suite:
+    """
+    Runs benchmarks and collects their results.
+
+    Each result records the benchmark name, the size of its data, the time
+    taken by each run in seconds and, for end-to-end benchmarks, the phases
+    recorded by the tracer in the median run.
+    """
+
+    def __init__(
+        self, server: DexterServer, directory: Path, runs: int
+    ) -> None:
+        """Initialise the suite, using a temporary directory for files."""
+        self.directory = directory
+        self.failed = False
+        self.results: list[dict[str, Any]] = []
+        self.rcfile = directory / 'dexter.conf'
+        self.rcfile.write_text(
+            f'[default]\nroot = {server.root}\napi-key = benchmark\n',
+            encoding='utf-8')
+        self.runs = max(runs, 1)
+        self.server = server
+        self.env = {
+            **os.environ,
+            'PYTHONPATH': str(Path(__file__).resolve().parent.parent),
+            'XDG_CACHE_HOME': str(directory / 'cache'),
+        }
+
+    def run(self, args: list[str]) -> tuple[float, dict[str, Any], int]:
+        """
+        Run a dexter command, with its output discarded.
+
+        Returns the elapsed time, the phases recorded by the tracer, and
+        the exit status.
+        """
+        trace = self.directory / 'trace.jsonl'
+        trace.unlink(missing_ok=True)
+        start = time.perf_counter()
+        process = subprocess.run(  # noqa: S603
+            [
+                sys.executable, '-m', 'dexterCLI', '--rcfile',
+                str(self.rcfile), '--no-pager', '--output', os.devnull,
+                *args,
+            ],
+            check=False,
+            env={**self.env, 'DEXTER_TRACE': str(trace)},
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+        )
+        elapsed = time.perf_counter() - start
+        stages: dict[str, dict[str, float]] = collections.defaultdict(
+            lambda: {'count': 0, 'seconds': 0.0, 'bytes': 0})
+        if trace.exists():
+            with trace.open(encoding='utf-8') as file:
+                for line in file:
+                    span = json.loads(line)
+                    stage = stages[span['name']]
+                    stage['count'] += 1
+                    stage['seconds'] += span['duration']
+                    stage['bytes'] += span.get('bytes') or 0
+        return elapsed, dict(stages), process.returncode
+
+    def command(
+        self,
+        name: str,
+        size: int,
+        unit: str,
+        args: list[str],
+        setup: list[str] | None = None,
+    ) -> None:
+        """
+        Benchmark a dexter command.
+
+        If 'setup' is given, it is run (untimed) before each run, for
+        example to fill the cache.
+        """
+        runs = []
+        for _ in range(self.runs):
+            if setup is not None:
+                self.run(setup)
+            runs.append(self.run(args))
+        failed = [code for _, _, code in runs if code]
+        median = sorted(runs, key=operator.itemgetter(0))[len(runs) // 2]
+        self.record(
+            name, size, unit, [run[0] for run in runs], median[1],
+            failed[0] if failed else 0)
+
+    def function(
+        self,
+        name: str,
+        size: int,
+        unit: str,
+        function: collections.abc.Callable[[], object],
+    ) -> None:
+        """Benchmark a function, called in this process."""
+        times = []
+        for _ in range(self.runs):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        self.record(name, size, unit, times)
+
+    def record(
+        self,
+        name: str,
+        size: int,
+        unit: str,
+        times: list[float],
+        stages: dict[str, Any] | None = None,
+        exit_code: int = 0,
+    ) -> None:
+        """Record, and display, the result of a benchmark."""
+        result = {
+            'name': name,
+            'size': size,
+            'unit': unit,
+            'runs': times,
+            'median': statistics.median(times),
+            'min': min(times),
+            'max': max(times),
+        }
+        if stages is not None:
+            result['stages'] = stages
+        if exit_code:
+            result['exit_code'] = exit_code
+            self.failed = True
+        self.results.append(result)
+        print(
+            f'{name:<16}{size:>12,} {unit:<8}{result["median"]:>10.3f}s'
+            f'{"  FAILED" if exit_code else ""}',
+            flush=True)
+
+    def list_reports(self, sizes: collections.abc.Iterable[int]) -> None:
+        """Benchmark listing reports, and displaying them directly."""
+        for size in sizes:
+            self.server.configure(reports=size)
+            self.command('list', size, 'reports', ['list', 'all'])
+            self.command(
+                'list --json', size, 'reports', ['--json', 'list', 'all'])
+            self.command(
+                'list --page-size', size, 'reports',
+                ['list', '--page-size', '1000', 'all'])
+            reports = {
+                f'r{number}': report(number, self.server.root)
+                for number in range(size)
+            }
+            now = time.time()
+            rows = [
+                List.row(record, now)
+                for record in Report.from_reports(reports)
+            ]
+            header = ['20<URL', '>Pri', '4^Status', '>Pages', '>Age']
+            self.function(
+                'display_table', size, 'reports', functools.partial(
+                    display, Base.display_table, [header, *rows]))
+            self.function(
+                'display_verbose', size, 'reports', functools.partial(
+                    display, Base.display_verbose, reports))
+
+    def status(self) -> None:
+        """Benchmark displaying the status of a report."""
+        self.server.configure(reports=10)
+        self.command('status', 1, 'reports', ['status', 'r2'])
+
+    def fetch(self, sizes: collections.abc.Iterable[int]) -> None:
+        """Benchmark fetching full reports."""
+        self.server.configure(reports=10)
+        cache = self.directory / 'cache'
+        for size in sizes:
+            self.server.configure(size=size)
+            self.command(
+                'fetch --stream', size, 'bytes',
+                ['fetch', '--no-cache', '--stream', 'r2'])
+            # Revalidated with '304 Not Modified' and copied from the cache
+            self.command(
+                'fetch --cached', size, 'bytes', ['fetch', '--stream', 'r2'],
+                setup=['fetch', '--stream', 'r2'])
+            if size <= DISPLAY_LIMIT:
+                self.command(
+                    'fetch --verbose', size, 'bytes',
+                    ['fetch', '--no-cache', 'r2'])
+            for path in cache.glob('dexter/*'):
+                path.unlink()
+        # Running reports are not complete, so they are downloaded again by
+        # every run rather than skipped
+        self.server.configure(reports=EXPORT_REPORTS)
+        for size in sizes:
+            if size > EXPORT_LIMIT:
+                break
+            self.server.configure(size=size)
+            self.command(
+                'fetch --status', size, 'bytes',
+                ['fetch', '--status', 'running', '--output-dir',
+                 str(self.directory / 'export')])
+
+    def queue(self) -> None:
+        """Benchmark queueing reports while some requests are refused."""
+        urls = self.directory / 'urls.txt'
+        urls.write_text(''.join(
+            f'https://example.com/site/{number} 10\n'
+            for number in range(QUEUE_REPORTS)
+        ), encoding='utf-8')
+        self.server.configure(throttle=QUEUE_THROTTLE)
+        self.command(
+            'queue --from-file', QUEUE_REPORTS, 'reports',
+            ['queue', '--from-file', str(urls)])
+        self.server.configure(throttle=0)
+
+
+def display(
+    function: collections.abc.Callable[..., None],
+    data: Any,  # noqa: ANN401
+) -> None:
+    """Call a display function, with its output discarded."""
+    with Path(os.devnull).open('w', encoding='utf-8') as output:
+        function({'output': output, 'width': 120}, data)
+
+
+def compare(
+    results: list[dict[str, Any]],
+    previous: list[dict[str, Any]],
+    threshold: float,
+) -> bool:
+    """
+    Display the change in each benchmark since the previous results.
+
+    Returns whether any benchmark has become slower than the threshold
+    ratio.
+    """
+    before = {
+        (result['name'], result['size']): result['median']
+        for result in previous
+    }
+    regressed = False
+    output = io.StringIO()
+    output.write(
+        f'\n{"Benchmark":<16}{"Size":>13}{"Before":>10}{"After":>10}'
+        f'{"Change":>9}\n')
+    for result in results:
+        old = before.get((result['name'], result['size']))
+        if not old:
+            continue
+        ratio = result['median'] / old
+        status = ''
+        if ratio > threshold:
+            status = '  REGRESSED'
+            regressed = True
+        output.write(
+            f'{result["name"]:<16}{result["size"]:>13,}{old:>9.3f}s'
+            f'{result["median"]:>9.3f}s{ratio - 1:>+9.0%}{status}\n')
+    print(output.getvalue(), end='')
+    return regressed
+
+
+def git_commit() -> str | None:
+    """Return the current git commit, if known."""
+    try:
+        process = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],  # noqa: S607
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.strip()
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark dexter against a stand-in API server')
+    parser.add_argument(
+        '--quick', action='store_true',
+        help='Use smaller numbers of reports and report sizes')
+    parser.add_argument(
+        '--reports', metavar='N', type=int, nargs='+',
+        help='The numbers of reports to list (default: '
+        f'{" ".join(map(str, REPORTS))})')
+    parser.add_argument(
+        '--sizes', metavar='SIZE', type=parse_size, nargs='+',
+        help=f'The sizes of reports to fetch (default: {" ".join(SIZES)})')
+    parser.add_argument(
+        '--only', metavar='NAME', nargs='+',
+        choices=('list', 'status', 'fetch', 'queue'),
+        help='Only run these benchmarks')
+    parser.add_argument(
+        '--runs', type=int, default=3,
+        help='The number of times to run each benchmark (default: 3)')
+    parser.add_argument(
+        '--output', metavar='FILENAME', default='benchmark-results.json',
+        help='The file to write the results to'
+        ' (default: benchmark-results.json)')
+    parser.add_argument(
+        '--compare', metavar='FILENAME', type=argparse.FileType(),
+        help='Compare the results with those in this file')
+    parser.add_argument(
+        '--threshold', metavar='RATIO', type=float, default=1.2,
+        help='The ratio of the previous time above which a benchmark'
+        ' counts as a regression (default: 1.2)')
+    args = parser.parse_args()
+    reports = args.reports or (QUICK_REPORTS if args.quick else REPORTS)
+    sizes = args.sizes or [
+        parse_size(size) for size in (QUICK_SIZES if args.quick else SIZES)]
+    only = set(args.only or ('list', 'status', 'fetch', 'queue'))
+    started = datetime.datetime.now(tz=datetime.timezone.utc)
+    print(f'{"Benchmark":<16}{"Size":>12} {"Unit":<8}{"Median":>11}')
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        DexterServer() as server,
+    ):
+        suite = Suite(server, Path(directory), args.runs)
+        if 'list' in only:
+            suite.list_reports(reports)
+        if 'status' in only:
+            suite.status()
+        if 'fetch' in only:
+            suite.fetch(sizes)
+        if 'queue' in only:
+            suite.queue()
+    with Path(args.output).open('w', encoding='utf-8') as file:
+        json.dump({
+            'version': VERSION,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started': started.isoformat(),
+            'runs': args.runs,
+            'results': suite.results,
+        }, file, indent=2)
+        file.write('\n')
+    regressed = False
+    if args.compare:
+        regressed = compare(
+            suite.results, json.load(args.compare)['results'],
+            args.threshold)
+    sys.exit(1 if suite.failed or regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
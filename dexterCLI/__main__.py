@@ -1,5 +1,12 @@
 """dexterCLI main entry point."""
 
-from .cli import main
+import sys
 
-main()
+from .daemon import forward
+
+# Run the command using the daemon if it is running, otherwise in-process
+if (code := forward()) is None:
+    from .cli import main
+
+    main()
+sys.exit(code)
@@ -1,12 +1,97 @@
 """dexterCLI API utilities."""
 
 import collections
+import configparser
 import datetime
 import json
-from typing import Any
+from pathlib import Path
+import threading
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlencode, urljoin
 
-import requests
+from .trace import span
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_RCFILE = '~/.dexter.conf'
+DEFAULT_TIMEOUT = 30
+# The statuses that are selected by 'incomplete'
+INCOMPLETE = ('queued', 'running', 'callback')
+
+# Held while a shared session's connection pools are replaced
+_resize_lock = threading.Lock()
+
+
+def load_profile(
+    name: str = 'default',
+    rcfile: str = DEFAULT_RCFILE,
+    *,
+    required: bool = True,
+) -> dict[str, Any]:
+    """
+    Return a profile from the configuration file.
+
+    If the profile does not exist, configparser.NoSectionError is raised,
+    unless 'required' is false in which case an empty profile is returned.
+    """
+    config = configparser.ConfigParser()
+    config.read(Path(rcfile).expanduser())
+    if not required and not config.has_section(name):
+        return {}
+    return dict(config.items(name))
+
+
+def session(profile: dict[str, Any]) -> 'requests.Session':
+    """
+    Return the HTTP session for this profile, creating it if necessary.
+
+    The session keeps connections alive between requests, so that all the
+    API calls made by a command (and by all the commands run using the same
+    profile) share a pool of connections rather than opening a new TCP and
+    TLS connection each time. The pool may be tuned with the profile keys
+    'pool-connections', 'pool-maxsize' and 'max-retries'. Responses may be
+    compressed with brotli or gzip, and are decompressed as they are read.
+    The HTTP libraries are only imported when the first session is created,
+    so that commands which make no requests start quickly. If a session
+    shared with other commands (see dexterCLI.daemon) has fewer connections
+    per pool than 'pool-maxsize', its pools are replaced with larger ones.
+    """
+    maxsize = int(profile.get('pool-maxsize', 10))
+    if (http := profile.get('session')) is not None:
+        import requests.adapters  # noqa: PLC0415
+
+        with _resize_lock:
+            for adapter in set(http.adapters.values()):
+                if isinstance(adapter, requests.adapters.HTTPAdapter) and (
+                    adapter.poolmanager.connection_pool_kw.get('maxsize', 0)
+                    < maxsize
+                ):
+                    # Connections in use are returned to the old pools
+                    adapter.init_poolmanager(
+                        int(profile.get('pool-connections', 10)), maxsize)
+    else:
+        with span(profile.get('tracer'), 'session'):
+            import requests  # noqa: PLC0415
+            import requests.adapters  # noqa: PLC0415
+
+            http = requests.Session()
+            http.headers['Accept-Encoding'] = 'br, gzip'
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=int(profile.get('pool-connections', 10)),
+                pool_maxsize=maxsize,
+                max_retries=int(profile.get('max-retries', 0)),
+            )
+            http.mount('https://', adapter)
+            http.mount('http://', adapter)
+            profile['session'] = http
+    return http
+
+
+def timeout(profile: dict[str, Any]) -> tuple[float, float]:
+    """Return the (connect, read) timeouts to use for this profile."""
+    read = float(profile.get('timeout', DEFAULT_TIMEOUT))
+    return float(profile.get('connect-timeout', read)), read
 
 
 def api(
@@ -15,29 +100,135 @@ def api(
     base: str = '.',
     method: str | None = None,
     params: collections.abc.Sequence[tuple[str, str]] | None = None,
-    data: Any = None  # noqa: ANN401
-) -> requests.Response:
-    """Call the API and output the results to stdout when in debug mode."""
+    data: Any = None,  # noqa: ANN401
+    headers: dict[str, str] | None = None,
+    *,
+    stream: bool = False,
+) -> 'requests.Response':
+    """
+    Call the API and output the results to stdout when in debug mode.
+
+    If 'stream' is true then the response body is not read until it is
+    used, so that it may be processed as it is downloaded.
+    """
     method = ('GET' if data is None else 'POST') if method is None else method
     url = urljoin(urljoin(profile['root'].rstrip('/') + '/', base), path)
     if profile.get('debug'):
         print(f'{method} {url}{"?" + urlencode(params) if params else ""}')
         if data:
             print(json.dumps(data, indent=2))
-    return requests.request(
-        method,
-        url,
-        auth=('dexter', profile['api-key']),
-        json=data,
-        params=params,
-        timeout=30
-    )
+    http = session(profile)
+    with span(
+        profile.get('tracer'), 'request', method=method, url=url
+    ) as attributes:
+        response = http.request(
+            method,
+            url,
+            auth=('dexter', profile['api-key']),
+            headers=headers,
+            json=data,
+            params=params,
+            stream=stream,
+            timeout=timeout(profile)
+        )
+        attributes['status'] = response.status_code
+        if not stream:
+            attributes['bytes'] = len(response.content)
+        attributes['ttfb'] = response.elapsed.total_seconds()
+    return response
 
 
 def parse_date(s: str) -> datetime.datetime:
     """Given a dexter date (ISO 8601 UTC), return a datetime object."""
+    # fromisoformat() is much faster than strptime(), but before Python
+    # 3.11 it does not accept 'Z' or fractions other than 3 or 6 digits.
+    try:
+        time = datetime.datetime.fromisoformat(
+            s[:-1] + '+00:00' if s.endswith('Z') else s)
+    except ValueError:
+        pass
+    else:
+        if time.tzinfo is not None:
+            return time
     try:
         time = datetime.datetime.strptime(s, '%Y-%m-%dT%H:%M:%S.%f%z')
     except ValueError:
         time = datetime.datetime.strptime(s, '%Y-%m-%dT%H:%M:%S%z')
     return time
+
+
+def list_request(
+    statuses: collections.abc.Iterable[str] = ('incomplete',),
+    user: str | None = None,
+    limit: int | None = None,
+) -> dict[str, Any]:
+    """
+    Return the arguments to api() to list reports.
+
+    The statuses may include 'incomplete', which selects reports that are
+    queued, running or waiting for a callback, and 'all', which selects
+    every report.
+    """
+    wanted = set(statuses)
+    if 'all' in wanted:
+        wanted.clear()
+    elif 'incomplete' in wanted:
+        wanted.update(INCOMPLETE)
+        wanted.remove('incomplete')
+    params = [('status', status) for status in wanted]
+    if user is not None:
+        params.append(('user', user))
+    if limit is not None:
+        params.append(('limit', str(limit)))
+    return {'path': 'reports', 'params': params}
+
+
+def queue_request(
+    url: str,
+    pages: int = 1,
+    *,
+    callback: str | None = None,
+    callback_id: str | None = None,
+    config: str | None = None,
+    lifetime: int | None = None,
+    metadata: Any = None,  # noqa: ANN401
+    priority: int | None = None,
+) -> dict[str, Any]:
+    """Return the arguments to api() to queue a report."""
+    data: dict[str, Any] = {'url': url, 'requestedPages': pages}
+    if callback:
+        data['callback'] = callback
+    if callback_id:
+        data['callbackId'] = callback_id
+    if config:
+        data['config'] = config
+    if lifetime:
+        data['lifetime'] = lifetime
+    if metadata is not None:
+        data['metadata'] = metadata
+    if priority is not None:
+        data['priority'] = priority
+    return {'path': 'reports', 'data': data}
+
+
+def status_request(report: str) -> dict[str, Any]:
+    """Return the arguments to api() to get the status of a report."""
+    return {'path': report, 'base': 'reports/'}
+
+
+def update_request(
+    report: str,
+    metadata: Any,  # noqa: ANN401
+) -> dict[str, Any]:
+    """Return the arguments to api() to update a report's metadata."""
+    return {
+        'path': report,
+        'base': 'reports/',
+        'data': {'metadata': metadata},
+        'method': 'PUT',
+    }
+
+
+def delete_request(report: str) -> dict[str, Any]:
+    """Return the arguments to api() to delete a report."""
+    return {'path': report, 'base': 'reports/', 'method': 'DELETE'}
@@ -0,0 +1,314 @@
+"""dexterCLI on-disk report cache."""
+
+import collections.abc
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import IO, TYPE_CHECKING, Any
+
+from .api import session, timeout
+from .compress import decompress
+from .stream import CHUNK_SIZE
+from .trace import count_bytes, span
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_SIZE = 1024  # megabytes
+
+# Seconds after which a temporary file is taken to be left behind by a
+# process which was killed while writing it
+STALE_TEMPORARY = 3600
+
+
+class ReportCache:
+    """
+    On-disk cache of fetched reports, with least-recently-used eviction.
+
+    Each entry is stored as a single file, named after a hash of the report
+    ID and its 'detail' URL, holding a line of JSON metadata followed by the
+    report body. Entries are written to a temporary file and then atomically
+    renamed into place, so several processes may safely use the same cache
+    at once, and a body is never read with another response's metadata.
+    Reading an entry updates its modification time, which is used to decide
+    which entries to evict when the cache exceeds its maximum size, and a
+    report larger than that is not stored at all. Bodies sent with brotli
+    or gzip content-coding are stored as they were transferred, and
+    decompressed when they are read.
+    """
+
+    def __init__(self, directory: Path, max_size: int) -> None:
+        """Initialise the cache, with 'max_size' in bytes."""
+        self.directory = directory
+        self.max_size = max_size
+
+    @classmethod
+    def from_profile(cls, profile: dict[str, Any]) -> 'ReportCache':
+        """Return the cache configured by a profile."""
+        if profile.get('cache-dir'):
+            directory = Path(profile['cache-dir']).expanduser()
+        else:
+            directory = Path(
+                profile.get('environ', os.environ).get('XDG_CACHE_HOME') or
+                '~/.cache'
+            ).expanduser() / 'dexter'
+        return cls(
+            directory,
+            int(float(profile.get('cache-size', DEFAULT_SIZE)) * 1000000),
+        )
+
+    @staticmethod
+    def key(report: str, url: str) -> str:
+        """Return the cache key for a report ID and detail URL."""
+        return hashlib.sha256(f'{report}\n{url}'.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        """Return the path of the file for a cache entry."""
+        return self.directory / f'{key}.entry'
+
+    def metadata(self, key: str) -> dict[str, Any] | None:
+        """Return the metadata for a cache entry, if it exists."""
+        try:
+            file, metadata = self.open(self.path(key), decode=False)
+        except (OSError, ValueError):
+            return None
+        file.close()
+        return metadata
+
+    @staticmethod
+    def open(
+        path: Path, *, decode: bool = True
+    ) -> tuple[IO[bytes], dict[str, Any]]:
+        """
+        Open a cache entry, returning its report body and metadata.
+
+        The body is decompressed unless 'decode' is false, in which case it
+        is as it was transferred, with the metadata's 'encoding'. Raises
+        ValueError if the entry is not valid.
+        """
+        file = path.open('rb')
+        try:
+            metadata: dict[str, Any] = json.loads(file.readline())
+        except BaseException:
+            file.close()
+            raise
+        if decode:
+            return decompress(file, metadata.get('encoding')), metadata
+        return file, metadata
+
+    def entries(self) -> list[tuple[Path, os.stat_result]]:
+        """Return the file and its status for each cache entry."""
+        entries = []
+        with contextlib.suppress(FileNotFoundError):
+            for path in self.directory.glob('*.entry'):
+                with contextlib.suppress(FileNotFoundError):
+                    entries.append((path, path.stat()))
+        return entries
+
+    def request(
+        self,
+        profile: dict[str, Any],
+        report: str,
+        url: str,
+        *,
+        immutable: bool = False,
+    ) -> tuple[
+        'requests.Response | None',
+        Path | collections.abc.Generator[bytes, None, None] | None,
+    ]:
+        """
+        Request a report via the cache.
+
+        Returns the response (which is None if the cached copy was used
+        without revalidating it), and either the path of the cache entry,
+        or the chunks of the report body as it is downloaded, or None if
+        the response was unsuccessful. The chunks are as they were
+        transferred (see encoded()), and are stored in the cache as they
+        are read (see tee()). A cached copy is revalidated using its ETag or
+        Last-Modified date, unless it has neither and 'immutable' is true.
+        """
+        key = self.key(report, url)
+        metadata = self.metadata(key)
+        headers = {}
+        if metadata is not None:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last-modified'):
+                headers['If-Modified-Since'] = metadata['last-modified']
+            if not headers and immutable:
+                self.touch(key)
+                return None, self.path(key)
+        http = session(profile)
+        with span(
+            profile.get('tracer'), 'request', method='GET', url=url
+        ) as attributes:
+            response = http.get(
+                url, headers=headers, stream=True, timeout=timeout(profile))
+            attributes['status'] = response.status_code
+            attributes['ttfb'] = response.elapsed.total_seconds()
+        if response.status_code == 304 and metadata is not None:
+            response.close()
+            self.touch(key)
+            return response, self.path(key)
+        if response.status_code != 200:
+            return response, None
+        if self.encoded(response):
+            chunks = response.raw.stream(CHUNK_SIZE, decode_content=False)
+        else:
+            chunks = response.iter_content(CHUNK_SIZE)
+        return response, self.tee(report, url, response, chunks)
+
+    def fetch(
+        self,
+        profile: dict[str, Any],
+        report: str,
+        url: str,
+        *,
+        immutable: bool = False,
+    ) -> tuple['requests.Response | None', Path | None]:
+        """
+        Fetch a report into the cache, as request().
+
+        Returns the response and the path of the cache entry, which is None
+        if the response was unsuccessful or the report is too large to be
+        cached.
+        """
+        response, body = self.request(
+            profile, report, url, immutable=immutable)
+        if body is None or isinstance(body, Path):
+            return response, body
+        with span(profile.get('tracer'), 'download', url=url) as attributes:
+            for _ in count_bytes(body, attributes):
+                pass
+        path = self.path(self.key(report, url))
+        return response, path if path.exists() else None
+
+    @staticmethod
+    def encoded(response: 'requests.Response') -> str | None:
+        """Return the content-coding to store a response body with."""
+        encoding = response.headers.get('content-encoding', '').lower()
+        return encoding if encoding in {'br', 'gzip'} else None
+
+    def tee(
+        self,
+        report: str,
+        url: str,
+        response: 'requests.Response',
+        chunks: collections.abc.Iterable[bytes],
+    ) -> collections.abc.Generator[bytes, None, None]:
+        """
+        Yield the chunks of a response body, storing them in the cache.
+
+        The entry is written to a temporary file as the chunks are read,
+        and only renamed into place once they have all been read. It is
+        discarded if the iteration stops early or fails, or if the body is
+        larger than the maximum size of the cache.
+        """
+        metadata = {
+            'encoding': self.encoded(response),
+            'etag': response.headers.get('etag'),
+            'last-modified': response.headers.get('last-modified'),
+            'report': report,
+            'url': url,
+        }
+        header = json.dumps(metadata).encode() + b'\n'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix='.', suffix='.tmp', delete=False
+        ) as file:
+            temporary = Path(file.name)
+            stored = False
+            try:
+                file.write(header)
+                size = len(header)
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size and not file.closed:
+                        # Too large to be cached, so stop writing it
+                        file.close()
+                        temporary.unlink()
+                    if not file.closed:
+                        file.write(chunk)
+                    yield chunk
+                if not file.closed:
+                    file.close()
+                    path = self.path(self.key(report, url))
+                    temporary.replace(path)
+                    stored = True
+                    self.evict(keep=path)
+            finally:
+                if not stored:
+                    file.close()
+                    temporary.unlink(missing_ok=True)
+
+    def touch(self, key: str) -> None:
+        """Mark a cache entry as having been used."""
+        with contextlib.suppress(OSError):
+            self.path(key).touch()
+
+    @staticmethod
+    def remove(path: Path) -> None:
+        """Remove a cache entry, given the path of its file."""
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+    def temporaries(self) -> list[tuple[Path, os.stat_result]]:
+        """
+        Return the temporary files of entries being written, and their status.
+
+        Files which have not been modified for a while are left behind by a
+        process which was killed while writing them, and are removed.
+        """
+        temporaries = []
+        stale = time.time() - STALE_TEMPORARY
+        with contextlib.suppress(FileNotFoundError):
+            for path in self.directory.glob('.*.tmp'):
+                with contextlib.suppress(FileNotFoundError):
+                    status = path.stat()
+                    if status.st_mtime < stale:
+                        path.unlink()
+                    else:
+                        temporaries.append((path, status))
+        return temporaries
+
+    def evict(self, keep: Path | None = None) -> None:
+        """
+        Remove the least-recently-used entries until under size.
+
+        The entries being written count towards the size of the cache.
+        """
+        entries = self.entries()
+        size = sum(
+            status.st_size
+            for _, status in [*entries, *self.temporaries()])
+        entries.sort(key=lambda entry: entry[1].st_mtime)
+        for path, status in entries:
+            if size <= self.max_size:
+                break
+            if path != keep:
+                self.remove(path)
+                size -= status.st_size
+
+    def clear(self) -> int:
+        """Remove all the entries from the cache, returning the count."""
+        entries = self.entries()
+        for path, _ in entries:
+            self.remove(path)
+        self.temporaries()
+        return len(entries)
+
+    def stats(self) -> dict[str, Any]:
+        """Return statistics about the cache."""
+        entries = self.entries()
+        return {
+            'directory': str(self.directory),
+            'entries': len(entries),
+            'size': sum(
+                status.st_size
+                for _, status in [*entries, *self.temporaries()]),
+            'max-size': self.max_size,
+        }
@@ -0,0 +1,152 @@
+"""dexterCLI local receiver for report callbacks."""
+
+import argparse
+import http.server
+import json
+import socket
+import threading
+import time
+from typing import Any
+from urllib.parse import parse_qs, urljoin, urlsplit
+import uuid
+
+# The largest callback body which is read
+MAX_BODY = 1 << 20
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Parse '[HOST:]PORT' as the address to listen on."""
+    host, _, port = address.rpartition(':')
+    if not port.isdigit() or int(port) > 65535:
+        raise argparse.ArgumentTypeError(f'invalid address: {address!r}')
+    return host.strip('[]') or '127.0.0.1', int(port)
+
+
+class CallbackHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler for report callbacks."""
+
+    protocol_version = 'HTTP/1.1'
+    server: 'CallbackReceiver'
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Do not log requests."""
+
+    def receive(self) -> None:
+        """Record a callback, if it is for an expected report."""
+        url = urlsplit(self.path)
+        length = min(int(self.headers.get('Content-Length') or 0), MAX_BODY)
+        body = self.rfile.read(length) if length else b''
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            payload = None
+        keys = [url.path.rstrip('/').rsplit('/', 1)[-1]]
+        for values in parse_qs(url.query).values():
+            keys.extend(values)
+        if isinstance(payload, dict):
+            keys.extend(
+                str(payload[name]) for name in ('callbackId', 'id')
+                if payload.get(name) is not None)
+        found = self.server.receive(keys, payload)
+        self.send_response(204 if found else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = do_PUT = receive  # noqa: N815
+
+
+class CallbackReceiver(http.server.ThreadingHTTPServer):
+    """
+    Local HTTP listener which receives the callbacks for reports.
+
+    Each report which is expected is registered with keys, any of which in
+    a callback identifies the report: the last segment of the callback
+    URL's path, a query parameter, or the 'callbackId' or 'id' of a JSON
+    body. Callbacks for other reports are refused with '404 Not Found'. If
+    a public URL is given (which should be forwarded to the listener), it
+    is used for the callback URLs rather than the listener's own address.
+    The listener runs on a background thread, and may be used as a context
+    manager, which stops it on exit.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ('127.0.0.1', 0),
+        public_url: str | None = None,
+    ) -> None:
+        """Start listening, without handling requests yet."""
+        super().__init__(address, CallbackHandler)
+        host = address[0]
+        if host in {'', '0.0.0.0', '::'}:  # noqa: S104
+            host = socket.gethostname()
+        self.url = public_url or f'http://{host}:{self.server_port}/'
+        self.condition = threading.Condition()
+        self.expected: dict[str, str] = {}
+        self.keys: dict[str, list[str]] = {}
+        self.received: dict[str, Any] = {}
+        self.thread: threading.Thread | None = None
+
+    def __enter__(self) -> 'CallbackReceiver':  # noqa: PYI034
+        """Start handling requests on a background thread."""
+        self.thread = threading.Thread(
+            target=self.serve_forever, name='dexter-callbacks', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the listener."""
+        self.shutdown()
+        self.server_close()
+
+    def callback_url(self) -> tuple[str, str]:
+        """Return a new callback URL, and the key which identifies it."""
+        key = uuid.uuid4().hex
+        return urljoin(self.url.rstrip('/') + '/', key), key
+
+    def expect(self, report: str, *keys: str | None) -> None:
+        """Expect a callback for a report, identified by any of the keys."""
+        with self.condition:
+            for key in (report, *keys):
+                if key:
+                    self.expected[key] = report
+                    self.keys.setdefault(report, []).append(key)
+
+    def receive(self, keys: list[str], payload: Any) -> bool:  # noqa: ANN401
+        """Record a callback, returning whether it was expected."""
+        with self.condition:
+            for key in keys:
+                if (report := self.expected.get(key)) is not None:
+                    self.received[report] = payload
+                    self.condition.notify_all()
+                    return True
+        return False
+
+    def forget(self, report: str) -> None:
+        """Stop expecting a callback for a report."""
+        with self.condition:
+            for key in self.keys.pop(report, ()):
+                self.expected.pop(key, None)
+            self.received.pop(report, None)
+
+    def wait(self, timeout: float) -> dict[str, Any]:
+        """
+        Return the callbacks received, waiting for one if there are none.
+
+        The callbacks are returned at most once, by report, with the
+        payload of each (or None if it had no JSON body). An empty dict is
+        returned if there are none after 'timeout' seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not self.received:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            received, self.received = self.received, {}
+            for report in received:
+                for key in self.keys.pop(report, ()):
+                    self.expected.pop(key, None)
+        return received
@@ -1,30 +1,124 @@
 """dexterCLI command-line parser."""
 
 import argparse
-import configparser
-import io
+import collections
 import os
-from pathlib import Path
 import shutil
-import subprocess  # noqa: S404
 import sys
-from typing import Any
+from typing import IO, TYPE_CHECKING, Any
 
-from . import VERSION, commands
+from . import VERSION
+
+if TYPE_CHECKING:
+    from . import commands
+
+# The name of each command's class in the commands module, and the aliases
+# for the command. These are listed here rather than found by inspecting
+# the commands module, so that the command-line can be parsed without
+# importing every command and everything that they depend on.
+COMMANDS = {
+    'batch': ('Batch', ()),
+    'cache': ('Cache', ()),
+    'daemon': ('Daemon', ()),
+    'delete': ('Delete', ('cancel',)),
+    'diff': ('Diff', ()),
+    'fetch': ('Fetch', ()),
+    'index': ('Index', ()),
+    'list': ('List', ()),
+    'query': ('Query', ()),
+    'queue': ('Queue', ()),
+    'status': ('Status', ('info',)),
+    'update': ('Update', ()),
+    'wait': ('Wait', ()),
+}
+
+
+class FileType(argparse.FileType):
+    """
+    Factory for file arguments, which opens relative paths in a directory.
+
+    This is registered as the 'file' type of each command's parser, so that
+    commands run by the daemon open files relative to the working directory
+    of the process which sent them.
+    """
+
+    def __init__(self, directory: str = '') -> None:
+        """Initialise the factory, for files in 'directory'."""
+        super().__init__()
+        self.directory = directory
+
+    def __call__(self, string: str) -> IO[Any]:
+        """Open a file given on the command-line."""
+        if string != '-':
+            string = os.path.join(self.directory, string)  # noqa: PTH118
+        return super().__call__(string)
+
+
+class CommandParser(argparse.ArgumentParser):
+    """Argument parser for a command, which is only defined when used."""
+
+    command: str | None = None
+
+    def parse_known_args(
+        self,
+        args: collections.abc.Sequence[str] | None = None,
+        namespace: Any = None,  # noqa: ANN401
+    ) -> tuple[Any, list[str]]:
+        """Define the command's arguments, then parse the command-line."""
+        if self.command is not None:
+            from . import commands  # noqa: PLC0415
+
+            handler = getattr(commands, self.command)
+            self.command = None
+            self.description = handler.description
+            handler.add_arguments(self)
+        return super().parse_known_args(args, namespace)
 
 
 def main(argv: list[str] | None = None) -> None:
     """Main entry point for command-line parser."""  # noqa: D401
+    sys.exit(run(*prepare(argv)))
+
+
+def prepare(
+    argv: list[str] | None = None,
+    *,
+    environ: collections.abc.Mapping[str, str] = os.environ,
+    load: collections.abc.Callable[..., dict[str, Any]] | None = None,
+    terminal: os.terminal_size | None = None,
+    cwd: str | None = None,
+) -> tuple['type[commands.Base]', dict[str, Any], argparse.Namespace,
+           IO[str]]:
+    """
+    Parse the command-line, and prepare to run the command.
+
+    Returns the command's class, the profile, the parsed arguments and the
+    output stream, which are the arguments to run(). The environment,
+    function to load the profile, terminal size and working directory (to
+    which relative paths are resolved) may be given, for running commands
+    on behalf of other processes.
+    """
+
+    def resolve(path: str) -> str:
+        """Return a path given by the user, relative to 'cwd'."""
+        if cwd is None:
+            return path
+        return os.path.join(cwd, os.path.expanduser(path))  # noqa: PTH111, PTH118
+
     parser = argparse.ArgumentParser(
         description='Dexter API command-line interface',
         prog='dexter')
     parser.add_argument(
         '--api-key', help='The API key to use')
+    parser.add_argument(
+        '--compress', choices=('br', 'gz'),
+        help='Compress the output with brotli or gzip (default: according'
+        ' to the output filename, if it ends in ".br" or ".gz")')
     parser.add_argument(
         '--debug', '-d', action='store_true', help='Display debug output')
     parser.add_argument(
-        '--output', '-o', metavar='FILENAME', type=argparse.FileType('w'),
-        default=sys.stdout, help='The file to write the output to')
+        '--output', '-o', metavar='FILENAME', default='-',
+        help='The file to write the output to (default: stdout)')
     parser.add_argument(
         '--no-pager', '-P', action='store_true',
         help='Do not use a pager to display the output')
@@ -38,6 +132,9 @@ def main(argv: list[str] | None = None) -> None:
         help='The configuration file to load (default: ~/.dexter.conf)')
     parser.add_argument(
         '--root', help='The root URL of the API interface')
+    parser.add_argument(
+        '--timings', action='store_true',
+        help='Display a summary of the time taken by each phase on stderr')
     parser.add_argument(
         '--json', action='store_true',
         help='Output data in JSON format (the default for some commands)')
@@ -50,34 +147,27 @@ def main(argv: list[str] | None = None) -> None:
         '--version', '-V', action='version',
         help='Display the version number and exit',
         version='dexter ' + VERSION)
-    subparsers = parser.add_subparsers(dest='command', required=True)
-    handlers = {}
-    for command in dir(commands):
-        if command.startswith('_'):
-            continue
-        command = getattr(commands, command)
-        try:
-            valid = (issubclass(command, commands.Base) and
-                     command is not commands.Base)
-        except TypeError:
-            valid = False
-        if valid:
-            name = command.name or command.__name__.lower()
-            command.add_arguments(subparsers.add_parser(
-                name,
-                aliases=command.aliases or (),
-                description=command.description,
-            ))
-            handlers[name] = command.process
-            handlers.update(
-                dict.fromkeys(command.aliases or (), command.process)
-            )
+    subparsers = parser.add_subparsers(
+        dest='command', parser_class=CommandParser, required=True)
+    names = {}
+    for name, (class_name, aliases) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, aliases=aliases)
+        subparser.command = class_name
+        subparser.register('type', 'file', FileType(cwd or ''))
+        names[name] = class_name
+        names.update(dict.fromkeys(aliases, class_name))
 
     args = parser.parse_args(argv)
-    config = configparser.ConfigParser()
-    config.read(Path(args.rcfile).expanduser())
-    profile: dict[str, Any] = dict(config.items(args.profile))
-    terminal = shutil.get_terminal_size((80, 24))
+    from . import commands  # noqa: PLC0415
+    from .api import load_profile  # noqa: PLC0415
+    from .compress import ENCODINGS, open_output  # noqa: PLC0415
+    from .trace import Tracer  # noqa: PLC0415
+
+    handler: type[commands.Base] = getattr(commands, names[args.command])
+    profile = (load or load_profile)(
+        args.profile, resolve(args.rcfile), required=handler.requires_api)
+    if terminal is None:
+        terminal = shutil.get_terminal_size((80, 24))
     if args.api_key:
         profile['api-key'] = args.api_key
     if args.debug:
@@ -90,38 +180,69 @@ def main(argv: list[str] | None = None) -> None:
         profile['root'] = args.root
     if args.verbose:
         profile['verbose'] = args.verbose
+    if cwd is not None:
+        profile['cwd'] = cwd
+    profile['environ'] = environ
     if args.width:
         profile['width'] = args.width
     elif not profile.get('width'):
         profile['width'] = (terminal.columns or 80) - 1
-    if not profile.get('api-key'):
+    if handler.requires_api and not profile.get('api-key'):
         parser.error('api-key not specified')
-    if not profile.get('root'):
+    if handler.requires_api and not profile.get('root'):
         parser.error('root not specified')
-    buffer = None
-    if args.output.isatty() and not args.no_pager:
-        profile['output'] = buffer = io.StringIO()
-    else:
-        profile['output'] = args.output
-    exit_code = handlers[args.command](profile, args)
-    if buffer:
-        output = buffer.getvalue()
-        pager: str | None = os.environ.get('PAGER') or '/bin/more'
-        if pager and not os.access(pager, os.X_OK):
-            pager = None
-        lines = sum(
-            1 + len(line) // profile['width']
-            for line in output.split('\n')
+    trace_file = environ.get('DEXTER_TRACE')
+    if args.timings or trace_file:
+        profile['tracer'] = Tracer(
+            trace_file and resolve(trace_file), summary=args.timings)
+    try:
+        output = open_output(
+            args.output if args.output == '-' else resolve(args.output),
+            ENCODINGS.get(f'.{args.compress}'))
+    except OSError as e:
+        parser.error(f"argument --output/-o: can't open '{args.output}': {e}")
+    if (
+        output.isatty() and not args.no_pager and
+        getattr(args, 'watch', None) is None
+    ):
+        from .pager import Pager  # noqa: PLC0415
+
+        profile['output'] = Pager(
+            output,
+            profile['width'],
+            terminal.lines or 24,
+            profile.get('tracer'),
+            environ=environ,
         )
-        if pager and lines > (terminal.lines or 24):
-            subprocess.run(  # noqa: S603
-                pager,
-                check=False,
-                input=output,
-                stdout=args.output,
-                text=True,
-            )
-        else:
-            while output:
-                output = output[args.output.write(output):]
-    sys.exit(exit_code)
+    else:
+        profile['output'] = output
+    return handler, profile, args, output
+
+
+def run(
+    handler: 'type[commands.Base]',
+    profile: dict[str, Any],
+    args: argparse.Namespace,
+    output: IO[str],
+) -> int:
+    """Run a command, closing its output afterwards."""
+    from .trace import span  # noqa: PLC0415
+
+    tracer = profile.get('tracer')
+    try:
+        with span(tracer, 'command', command=args.command):
+            return handler.process(profile, args)
+    except BrokenPipeError:
+        # The output was closed early (e.g. by 'dexter list | head'), so
+        # discard anything still buffered rather than failing again on exit
+        null = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(null, sys.stdout.fileno())
+        os.close(null)
+        return 74  # EX_IOERR
+    finally:
+        if profile['output'] is not output:
+            profile['output'].close()
+        if output is not sys.stdout:
+            output.close()
+        if tracer is not None:
+            tracer.close()
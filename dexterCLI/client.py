@@ -0,0 +1,237 @@
+"""
+dexterCLI asynchronous client.
+
+DexterClient makes the same API requests as the command-line interface,
+for programs that need to make many requests at once:
+
+    async with DexterClient.from_config() as client:
+        reports = await client.list_reports(['running'])
+        statuses = await asyncio.gather(
+            *(client.status(report.id) for report in reports))
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import operator
+import types
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .api import (
+    DEFAULT_RCFILE,
+    api,
+    delete_request,
+    list_request,
+    load_profile,
+    queue_request,
+    session,
+    status_request,
+    timeout,
+    update_request,
+)
+from .report import Report
+from .stream import CHUNK_SIZE
+
+if TYPE_CHECKING:
+    import requests
+
+T = TypeVar('T')
+
+
+class DexterError(Exception):
+    """An unsuccessful response from the API."""
+
+    def __init__(
+        self,
+        status: int,
+        reason: str,
+        data: Any = None,  # noqa: ANN401
+    ) -> None:
+        """Initialise the exception from the response status and body."""
+        super().__init__(f'{status} {reason}')
+        self.data = data
+        self.reason = reason
+        self.status = status
+
+
+class DexterClient:
+    """
+    Asynchronous client for the Dexter API.
+
+    Requests are made using the same pooled HTTP session as the command-
+    line interface, on a pool of threads, so that up to 'concurrency'
+    operations may be in progress at once while the event loop carries on
+    with other work. Unsuccessful responses raise DexterError.
+    """
+
+    def __init__(
+        self, profile: dict[str, Any], *, concurrency: int = 10
+    ) -> None:
+        """Initialise the client, given a configuration profile."""
+        if not profile.get('api-key'):
+            raise ValueError('api-key not specified')
+        if not profile.get('root'):
+            raise ValueError('root not specified')
+        concurrency = max(concurrency, 1)
+        self.profile = profile
+        self.profile['pool-maxsize'] = max(
+            int(profile.get('pool-maxsize', 10)), concurrency)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            concurrency, thread_name_prefix='dexter')
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    def from_config(
+        cls,
+        profile: str = 'default',
+        rcfile: str = DEFAULT_RCFILE,
+        *,
+        concurrency: int = 10,
+        **options: Any,  # noqa: ANN401
+    ) -> 'DexterClient':
+        """
+        Return a client using a profile from the configuration file.
+
+        Any keyword arguments override the settings in the profile, with
+        underscores in their names replaced by hyphens (e.g. api_key).
+        """
+        settings = load_profile(profile, rcfile)
+        settings.update(
+            (key.replace('_', '-'), value) for key, value in options.items())
+        return cls(settings, concurrency=concurrency)
+
+    async def __aenter__(self) -> 'DexterClient':  # noqa: PYI034
+        """Return the client, for use as an asynchronous context manager."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: types.TracebackType | None,
+    ) -> None:
+        """Close the client."""
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the client's connections and threads."""
+        if (http := self.profile.pop('session', None)) is not None:
+            http.close()
+        self.executor.shutdown(wait=False)
+
+    async def run(self, function: collections.abc.Callable[[], T]) -> T:
+        """Call a function in the client's thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, function)
+
+    async def request(self, **kwargs: Any) -> Any:  # noqa: ANN401
+        """
+        Call api() with the given arguments, and return the decoded result.
+
+        Returns None if the response has no content.
+        """
+        async with self.semaphore:
+            response = await self.run(
+                functools.partial(api, self.profile, **kwargs))
+        return self.result(response)
+
+    @staticmethod
+    def result(response: 'requests.Response') -> Any:  # noqa: ANN401
+        """
+        Return the decoded body of a response, or raise DexterError.
+
+        The error's data is the decoded body of the response, or its text
+        if it is not JSON (e.g. an error page from a proxy). A successful
+        response whose body is not JSON also raises DexterError.
+        """
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            if 200 <= response.status_code < 300:
+                raise DexterError(
+                    response.status_code, 'Invalid JSON response',
+                    response.text) from None
+            data = response.text
+        if not 200 <= response.status_code < 300:
+            raise DexterError(response.status_code, response.reason, data)
+        return data
+
+    async def list_reports(
+        self,
+        statuses: collections.abc.Iterable[str] = ('incomplete',),
+        user: str | None = None,
+        limit: int | None = None,
+    ) -> list[Report]:
+        """Return the reports in the given statuses, in display order."""
+        data = await self.request(**list_request(statuses, user, limit))
+        reports = Report.from_reports((data or {}).get('reports') or {})
+        reports.sort(key=operator.attrgetter('sort_key'))
+        return reports
+
+    async def queue(
+        self,
+        url: str,
+        pages: int = 1,
+        **options: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        """
+        Queue a report, and return its status.
+
+        The options are 'callback', 'callback_id', 'config', 'lifetime',
+        'metadata' and 'priority'.
+        """
+        result: dict[str, Any] = await self.request(
+            **queue_request(url, pages, **options))
+        return result
+
+    async def status(self, report: str) -> dict[str, Any]:
+        """Return the status of a report."""
+        result: dict[str, Any] = await self.request(**status_request(report))
+        return result
+
+    async def update(
+        self,
+        report: str,
+        metadata: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        """Update the metadata of a report, and return its status."""
+        result: dict[str, Any] = await self.request(
+            **update_request(report, metadata))
+        return result
+
+    async def delete(self, report: str) -> None:
+        """Delete a report."""
+        await self.request(**delete_request(report))
+
+    async def fetch(
+        self, report: str, chunk_size: int = CHUNK_SIZE
+    ) -> collections.abc.AsyncIterator[bytes]:
+        """
+        Yield the full report, in chunks of bytes, as it is downloaded.
+
+        Only making the request counts towards the client's concurrency,
+        not reading the body, so that the client may be used again while
+        iterating over the report. Raises DexterError if the report is not
+        available yet.
+        """
+        status = await self.status(report)
+        if not status.get('detail'):
+            raise DexterError(404, 'Report is not available yet', status)
+        async with self.semaphore:
+            response = await self.run(functools.partial(
+                session(self.profile).get,
+                status['detail'],
+                stream=True,
+                timeout=timeout(self.profile),
+            ))
+        try:
+            if response.status_code != 200:
+                self.result(response)
+            chunks = response.iter_content(chunk_size)
+            while chunk := await self.run(
+                functools.partial(next, chunks, b'')
+            ):
+                yield chunk
+        finally:
+            response.close()
@@ -1,28 +1,69 @@
 """dexterCLI commands."""
 
 import argparse
-import datetime
+import codecs
+import collections
+import contextlib
+import functools
+import io
+import itertools
 import json
+import operator
+import os
+from pathlib import Path
 import re
-from typing import TYPE_CHECKING, Any
+import shutil
+import sys
+import time
+from typing import IO, TYPE_CHECKING, Any, TypeVar, cast
 
-import requests
-
-from .api import api, parse_date
+from .api import (
+    INCOMPLETE,
+    api,
+    delete_request,
+    list_request,
+    queue_request,
+    session,
+    status_request,
+    timeout,
+    update_request,
+)
+from .daemon import thread_pool
+from .report import Report
+from .stream import (
+    CHUNK_SIZE,
+    Event,
+    Progress,
+    dump_events,
+    dump_verbose,
+    format_size,
+    iter_events,
+    iter_items,
+    iter_value_events,
+)
+from .trace import count_bytes, span
 
 if TYPE_CHECKING:
-    import collections
+    import concurrent.futures
+
+    import requests
+
+    from .cache import ReportCache
+    from .callback import CallbackReceiver
+    from .diff import ReportDiff
+    from .download import DownloadProgress
+    from .ratelimit import TokenBucket
 
 Profile = dict[str, Any]
-Table = list[Any]
+Table = collections.abc.Iterable[collections.abc.Sequence[Any]]
+T = TypeVar('T')
 
 
 class Base:
     """Base class for dexterCLI commands."""
 
-    aliases: tuple[str] | None = None
     description: str
-    name: str | None = None
+    requires_api = True
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
@@ -37,7 +78,7 @@ class Base:
     def display_response(
         cls,
         profile: Profile,
-        response: requests.Response,
+        response: 'requests.Response',
         table: Table | None = None
     ) -> int:
         """Display the output from an API call."""
@@ -48,25 +89,255 @@ class Base:
             if response.headers.get('location'):
                 profile['output'].write(
                     f'Location: {response.headers["location"]}')
-            if (response.content and (profile.get('verbose') or not table)
-                    and not profile.get('json')):
-                data = response.json()
-                if len(data) == 1 and 'reports' in data:
-                    data = data['reports']
-                if not data:
-                    profile['output'].write('No results\n')
-                else:
-                    cls.display_verbose(profile, data)
-                    profile['output'].write('\n')
-            elif table and not profile.get('json'):
+            if table and not (profile.get('json') or profile.get('verbose')):
+                # Avoid decoding the response when the table is displayed
                 cls.display_table(profile, table)
             elif response.content:
-                json.dump(response.json(), profile['output'], indent=2)
-                profile['output'].write('\n')
+                cls.display_data(
+                    profile, cls.decode(profile, response), table)
+            elif table and not profile.get('json'):
+                cls.display_table(profile, table)
         if 200 <= response.status_code < 300:
             return 0  # EX_OK
         return 74  # EX_IOERR
 
+    @staticmethod
+    def path(profile: Profile, filename: str) -> Path:
+        """
+        Return a path given on the command-line.
+
+        A relative path is relative to the working directory of the process
+        which ran the command, which is not the daemon's.
+        """
+        path = Path(filename).expanduser()
+        return Path(profile['cwd'], path) if 'cwd' in profile else path
+
+    @staticmethod
+    def decode(profile: Profile, response: 'requests.Response') -> Any:  # noqa: ANN401
+        """Decode the JSON body of a response."""
+        with span(
+            profile.get('tracer'), 'decode', bytes=len(response.content)
+        ) as attributes:
+            data = response.json()
+            attributes['items'] = (
+                len(data) if isinstance(data, (dict, list)) else 1)
+        return data
+
+    @classmethod
+    def display_data(
+        cls,
+        profile: Profile,
+        data: Any,  # noqa: ANN401
+        table: Table | None = None
+    ) -> None:
+        """Display the decoded data returned by an API call."""
+        if (profile.get('verbose') or not table) and not profile.get('json'):
+            if len(data) == 1 and 'reports' in data:
+                data = data['reports']
+            if not data:
+                profile['output'].write('No results\n')
+            else:
+                with span(profile.get('tracer'), 'render', format='verbose'):
+                    cls.display_verbose(profile, data)
+                profile['output'].write('\n')
+        elif table and not profile.get('json'):
+            cls.display_table(profile, table)
+        else:
+            with span(profile.get('tracer'), 'render', format='json'):
+                json.dump(data, profile['output'], indent=2)
+            profile['output'].write('\n')
+
+    @staticmethod
+    def add_watch_argument(parser: argparse.ArgumentParser) -> None:
+        """Add the '--watch' argument to the argument parser."""
+        parser.add_argument(
+            '--watch', metavar='INTERVAL', nargs='?', type=float, const=2.0,
+            help='Keep displaying the output, updating it when it changes,'
+            ' polling every INTERVAL seconds (default: 2) or less often'
+            ' while nothing is changing')
+
+    @staticmethod
+    def add_format_arguments(
+        parser: argparse.ArgumentParser, records: str
+    ) -> None:
+        """Add the '--format' and '--fields' arguments to the parser."""
+        from .formats import FORMATS, parse_fields  # noqa: PLC0415
+
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help=f'Write {records} in this format, one per line, as they'
+            ' are received')
+        parser.add_argument(
+            '--fields', metavar='NAME,...', type=parse_fields,
+            help='Only write these fields with --format (names containing'
+            ' dots select fields of nested objects)')
+
+    @staticmethod
+    def set_format(profile: Profile, args: argparse.Namespace) -> bool:
+        """
+        Set the output format from the '--format' and '--fields' arguments.
+
+        Returns False, after displaying an error, if they are invalid.
+        """
+        if args.fields and not args.format:
+            sys.stderr.write(
+                f'dexter {args.command}: error: --fields requires --format\n')
+            return False
+        if args.format:
+            profile['format'] = args.format
+            profile['fields'] = args.fields
+        return True
+
+    @staticmethod
+    def write_records(
+        profile: Profile, records: collections.abc.Iterable[dict[str, Any]]
+    ) -> int:
+        """Write records to the output in the chosen format."""
+        from .formats import RecordWriter  # noqa: PLC0415
+
+        writer = RecordWriter(
+            profile['output'], profile['format'], profile.get('fields'))
+        for record in records:
+            writer.write(record)
+        writer.close()
+        return writer.count
+
+    @staticmethod
+    def run_tasks(
+        profile: Profile,
+        jobs: int,
+        tasks: collections.abc.Iterable[collections.abc.Callable[[], T]],
+        output: collections.abc.Callable[[T], None],
+        *,
+        completion_order: bool = False,
+    ) -> None:
+        """
+        Run tasks concurrently, passing each result to 'output'.
+
+        At most 'jobs' tasks are run at once, using a connection pool large
+        enough for them all. Tasks are taken from 'tasks' only as they are
+        needed, so that no more than twice that many results are waiting to
+        be output, in the order of the tasks (or in the order they finish,
+        if 'completion_order' is true). A task may simply return a result
+        which is already known, such as an error in the input, so that it
+        is output in order with the others.
+        """
+        import concurrent.futures  # noqa: PLC0415
+
+        profile['pool-maxsize'] = max(
+            int(profile.get('pool-maxsize', 10)), jobs)
+        session(profile)
+        pending: collections.deque[concurrent.futures.Future[T]] = (
+            collections.deque())
+
+        def drain(limit: int) -> None:
+            while len(pending) > limit:
+                if completion_order:
+                    done, _ = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        output(future.result())
+                else:
+                    output(pending.popleft().result())
+
+        with thread_pool(jobs) as executor:
+            for task in tasks:
+                pending.append(executor.submit(task))
+                drain(jobs * 2)
+            drain(0)
+
+    @classmethod
+    def watch(
+        cls,
+        profile: Profile,
+        interval: float,
+        request: collections.abc.Callable[
+            [dict[str, str]], 'requests.Response'],
+        display: collections.abc.Callable[
+            [Profile, 'requests.Response'], int],
+        state: collections.abc.Callable[[Any], tuple[bool, bool]],
+    ) -> int:
+        """
+        Repeatedly poll the API, displaying the output when it changes.
+
+        Conditional requests are used so that unchanged results cost only a
+        '304 Not Modified' response. The polling interval is increased
+        while nothing is changing, but not while 'state' (which is given
+        the decoded response) indicates that something is active. Polling
+        stops when 'state' indicates that the watch is finished.
+        """
+        headers: dict[str, str] = {}
+        previous: list[str] | None = None
+        last: requests.Response | None = None
+        active = done = False
+        delay = interval = max(interval, 0.1)
+        try:
+            while True:
+                response = request(headers)
+                if response.status_code == 304 and last is not None:
+                    response = last
+                    changed = False
+                elif response.status_code != 200:
+                    return cls.display_response(profile, response)
+                else:
+                    if etag := response.headers.get('etag'):
+                        headers['If-None-Match'] = etag
+                    if modified := response.headers.get('last-modified'):
+                        headers['If-Modified-Since'] = modified
+                    changed = (
+                        last is None or response.content != last.content)
+                    last = response
+                    active, done = state(response.json())
+                output = io.StringIO()
+                display({**profile, 'output': output}, response)
+                lines = output.getvalue().splitlines()
+                cls.redraw(profile, previous, lines)
+                previous = lines
+                if done:
+                    return 0  # EX_OK
+                delay = (
+                    interval if changed else min(delay * 1.5, interval * 8))
+                if active:
+                    delay = min(delay, interval)
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            return 0  # EX_OK
+
+    @staticmethod
+    def redraw(
+        profile: Profile, previous: list[str] | None, lines: list[str]
+    ) -> None:
+        """Update the output, redrawing only the lines that have changed."""
+        output = profile['output']
+        if not output.isatty():
+            if lines != previous:
+                output.write(('\n' if previous else '') + '\n'.join(lines))
+                output.write('\n')
+                output.flush()
+            return
+        lines = [line[:profile['width']] for line in lines]
+        height = shutil.get_terminal_size((80, 24)).lines or 24
+        if previous is None or max(len(previous), len(lines)) >= height:
+            output.write(
+                ('' if previous is None else '\x1b[H\x1b[2J') +
+                ''.join(line + '\n' for line in lines))
+            output.flush()
+            return
+        previous = [line[:profile['width']] for line in previous]
+        parts = []
+        for row, line in enumerate(lines[:len(previous)]):
+            if line != previous[row]:
+                up = len(previous) - row
+                parts.append(f'\x1b[{up}A\r\x1b[2K{line}\r\x1b[{up}B')
+        if len(lines) > len(previous):
+            parts.extend(line + '\n' for line in lines[len(previous):])
+        elif len(lines) < len(previous):
+            parts.append(f'\x1b[{len(previous) - len(lines)}A\x1b[J')
+        output.write(''.join(parts))
+        output.flush()
+
     @classmethod
     def display_verbose(
         cls,
@@ -75,91 +346,105 @@ class Base:
         indent: str = ''
     ) -> None:
         """Display some data in our 'verbose' format."""
-        if data is None:
-            profile['output'].write('null')
-        elif isinstance(data, str):
-            profile['output'].write(
-                data if data.isprintable() else repr(data))
-        elif isinstance(data, bool):
-            profile['output'].write('true' if data else 'false')
-        elif isinstance(data, (int, float)):
-            profile['output'].write(f'{data:,}')
-        elif isinstance(data, list):
-            if data:
-                if indent:
-                    profile['output'].write('\n')
-                for row, value in enumerate(data):
-                    profile['output'].write(indent)
-                    cls.display_verbose(profile, value, indent + '    ')
-                    if row < len(data) - 1:
-                        profile['output'].write('\n')
-        elif isinstance(data, dict):
-            if data:
-                if indent:
-                    profile['output'].write('\n')
-                for row, (key, value) in enumerate(data.items()):
-                    profile['output'].write(indent + f'{key}: ')
-                    cls.display_verbose(profile, value, indent + '    ')
-                    if row < len(data) - 1:
-                        profile['output'].write('\n')
-        else:
-            raise ValueError(f'Cannot handle value of type {type(data)}')
+        dump_verbose([('value', data)], profile['output'], indent)
+
+    @staticmethod
+    def display_events(
+        profile: Profile, events: collections.abc.Iterable[Event]
+    ) -> None:
+        """
+        Display data given as parser events, like display_data().
+
+        The data is rendered as it is parsed, so a large document (such as
+        a full report) need never be decoded as a whole.
+        """
+        output = profile['output']
+        if profile.get('json'):
+            dump_events(events, output)
+        elif not dump_verbose(events, output):
+            output.write('No results')
+        output.write('\n')
 
     @classmethod
     def display_table(cls, profile: dict[str, Any], table: Table) -> None:
-        """Display some data in a table format."""
-        header = list(table.pop(0))
-        if not table:
-            profile['output'].write('No results\n')
-            return
-        align = ['<'] * len(header)
-        min_widths: list[int | None] = [None] * len(header)
-        padding = '-|-'
-        for col, field in enumerate(header):
-            match = re.match(r'(\d*)([<>^])(.*)$', field)
-            if match:
-                if match.group(1):
-                    min_widths[col] = int(match.group(1))
-                align[col] = match.group(2)
-                header[col] = match.group(3)
-        widths = [len(head) for head in header]
-        for rownum, row in enumerate(table):
-            if not isinstance(row, list):
-                table[rownum] = row = list(row)
-            for col, column in enumerate(row):
-                row[col] = column = str(column)
-                if len(column) > widths[col]:
-                    widths[col] = len(column)
-        while True:
-            total_width = sum(widths) + len(padding) * len(widths) - 1
-            if total_width <= profile['width']:
-                break
-            if len(padding) > 1:
-                padding = '|'
-                continue
-            for col in range(len(widths) - 1, -1, -1):
-                if (
-                    (min_width := min_widths[col]) and
-                    widths[col] > min_width
-                ):
-                    widths[col] = max(
-                        widths[col] - (total_width - profile['width']),
-                        min_widths[col]
-                    )
+        """
+        Display some data in a table format.
+
+        The first row is the header, which may specify the alignment of each
+        column and either its minimum width (e.g. '20<URL') or its fixed
+        width (e.g. '20!<URL'). The widths of the other columns are
+        calculated from the first 'table-window' rows (default: 1000), and
+        the rows are written out as they are produced.
+        """
+        with span(
+            profile.get('tracer'), 'render', format='table'
+        ) as attributes:
+            rows = iter(table)
+            header = list(next(rows))
+            align = ['<'] * len(header)
+            min_widths: list[int | None] = [None] * len(header)
+            fixed = [False] * len(header)
+            padding = '-|-'
+            for col, field in enumerate(header):
+                match = re.match(r'(\d*)(!?)([<>^])(.*)$', field)
+                if match:
+                    if match.group(1):
+                        min_widths[col] = int(match.group(1))
+                        fixed[col] = bool(match.group(2))
+                    align[col] = match.group(3)
+                    header[col] = match.group(4)
+            window_size = 1 if all(fixed) else max(
+                int(profile.get('table-window', 1000)), 1)
+            window = [
+                [str(column) for column in row]
+                for row in itertools.islice(rows, window_size)
+            ]
+            if not window:
+                profile['output'].write('No results\n')
+                return
+            attributes['rows'] = 0
+            widths = [
+                (min_widths[col] or 0) if fixed[col] else len(head)
+                for col, head in enumerate(header)
+            ]
+            for row in window:
+                for col, column in enumerate(row):
+                    if len(column) > widths[col] and not fixed[col]:
+                        widths[col] = len(column)
+            while True:
+                total_width = sum(widths) + len(padding) * len(widths) - 1
+                if total_width <= profile['width']:
                     break
-            else:
-                break
-        for row, data in enumerate([header, *table]):
-            profile['output'].write(
-                (' ' * len(padding)).join(
-                    f'{column[:widths[col]]:{align[col]}{widths[col]}}'
-                    for col, column in enumerate(data)
-                ) + '\n'
-            )
-            if row == 0:
-                profile['output'].write(
-                    padding.join('-' * width for width in widths) + '\n'
-                )
+                if len(padding) > 1:
+                    padding = '|'
+                    continue
+                for col in range(len(widths) - 1, -1, -1):
+                    if (
+                        (min_width := min_widths[col]) and
+                        widths[col] > min_width
+                    ):
+                        widths[col] = max(
+                            widths[col] - (total_width - profile['width']),
+                            min_width
+                        )
+                        break
+                else:
+                    break
+            row_format = (' ' * len(padding)).join(
+                f'{{:{align[col]}{width}.{width}}}'
+                for col, width in enumerate(widths)
+            ) + '\n'
+            lines = [
+                row_format.format(*header),
+                padding.join('-' * width for width in widths) + '\n',
+            ]
+            for cells in itertools.chain(window, rows):
+                lines.append(row_format.format(*map(str, cells)))
+                attributes['rows'] += 1
+                if len(lines) >= 1000:
+                    profile['output'].write(''.join(lines))
+                    lines.clear()
+            profile['output'].write(''.join(lines))
 
 
 class List(Base):
@@ -170,8 +455,22 @@ class List(Base):
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
         """Define the command-line arguments for this command."""
+        parser.add_argument(
+            '--limit', metavar='N', type=int,
+            help='Display at most this many reports')
+        parser.add_argument(
+            '--page-size', metavar='N', type=int,
+            help='Fetch the reports in pages of this size, and display them'
+            ' in the order returned by the server as they arrive')
+        parser.add_argument(
+            '--prefetch', metavar='N', type=int,
+            help='The number of pages to fetch in advance when using'
+            ' --page-size (default: 2)')
         parser.add_argument(
             '--user', help='Display reports requested by this user')
+        cls.add_watch_argument(parser)
+        cls.add_format_arguments(
+            parser, 'the reports (in the order returned by the server)')
         parser.add_argument(
             'status',
             choices=('incomplete', 'queued', 'running', 'callback',
@@ -179,61 +478,260 @@ class List(Base):
             nargs='*', default='incomplete',
             help='Display reports that are in this status')
 
-    @staticmethod
-    def sort_key(report: dict[str, Any]) -> tuple[Any, ...]:
-        """Return the key with which to sort the output reports."""
+    @classmethod
+    def pages(
+        cls,
+        profile: Profile,
+        params: list[tuple[str, str]],
+        page_size: int,
+        prefetch: int = 2,
+        limit: int | None = None,
+    ) -> collections.abc.Iterator[tuple['requests.Response', Any]]:
+        """
+        Yield the response for each page of a list of reports, and its data.
+
+        Pages are requested by offset, advancing by the number of reports
+        the server actually returns (which may be fewer than 'page_size'),
+        unless the server returns a 'next' cursor, which is then used to
+        request the following page. The next 'prefetch' pages (or, with
+        cursors, just the next page) are requested, and decoded, in the
+        background while each page is being processed. Iteration stops
+        after an unsuccessful response (whose data is None), an empty page,
+        the last page (given by 'total', or by the absence of a cursor), or
+        when 'limit' reports have been returned.
+        """
+
+        def fetch(
+            offset: int, cursor: str | None = None
+        ) -> tuple['requests.Response', Any]:
+            page_params = [*params, ('limit', str(page_size))]
+            if cursor is not None:
+                page_params.append(('cursor', cursor))
+            else:
+                page_params.append(('offset', str(offset)))
+            response = api(profile, 'reports', params=page_params)
+            if response.status_code != 200:
+                return response, None
+            return response, cls.decode(profile, response)
+
+        executor = thread_pool(max(prefetch, 1))
+        # The offset of each page requested, and its response and data
+        pending: collections.deque[tuple[int, concurrent.futures.Future[
+            tuple[requests.Response, Any]]]] = collections.deque(
+                [(0, executor.submit(fetch, 0))])
+        # The number of reports in each page, as far as is known
+        stride = page_size
+        cursors = False
+        try:
+            while pending:
+                offset, future = pending.popleft()
+                response, data = future.result()
+                if data is None:
+                    yield response, data
+                    return
+                size = len(data.get('reports') or ())
+                count = offset + size
+                cursors = cursors or bool(data.get('next'))
+                if (
+                    not size or (cursors and not data.get('next')) or
+                    any(
+                        end is not None and count >= end
+                        for end in (data.get('total'), limit))
+                ):
+                    yield response, data
+                    return
+                if cursors or size != stride:
+                    # The pages requested in advance are not the next ones
+                    for _, ahead in pending:
+                        ahead.cancel()
+                    pending.clear()
+                    stride = size
+                if cursors:
+                    pending.append((count, executor.submit(
+                        fetch, count, str(data['next']))))
+                else:
+                    start = pending[-1][0] + stride if pending else count
+                    wanted = prefetch + 1 - len(pending)
+                    for end in (data.get('total'), limit):
+                        if end is not None:
+                            wanted = min(wanted, -(-(end - start) // stride))
+                    for number in range(wanted):
+                        pending.append((
+                            start + number * stride,
+                            executor.submit(fetch, start + number * stride),
+                        ))
+                yield response, data
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def row(cls, report: Report, now: float) -> tuple[Any, ...]:
+        """Return the table row to display for a report."""
         return (
-            {
-                'queued': 2,
-                'running': 0,
-                'callback': 1,
-                'complete': 3,
-            }.get(report['status'], 1),
-            -report['priority'],
-            report['queued'],
+            report.url,
+            report.priority,
+            report.status,
+            report.progress,
+            cls.age(now - report.queued),
         )
 
+    @classmethod
+    def display_pages(
+        cls,
+        profile: Profile,
+        pages: collections.abc.Iterator[tuple['requests.Response', Any]],
+        limit: int | None = None,
+    ) -> int:
+        """Display the reports from a paginated list as they arrive."""
+        failed: list[requests.Response] = []
+
+        def reports() -> collections.abc.Iterator[tuple[str, Any]]:
+            count = 0
+            for response, data in pages:
+                if data is None:
+                    failed.append(response)
+                    return
+                for item in (data.get('reports') or {}).items():
+                    if limit is not None and count >= limit:
+                        return
+                    count += 1
+                    yield item
+
+        output = profile['output']
+        count = 0
+        if profile.get('quiet') and not profile.get('debug'):
+            for _ in reports():
+                pass
+        elif profile.get('format'):
+            cls.write_records(profile, (
+                {'id': report_id, **report}
+                for report_id, report in reports()
+            ))
+        elif profile.get('json'):
+            output.write('{\n  "reports": {')
+            for report_id, report in reports():
+                output.write(
+                    (',\n    ' if count else '\n    ') +
+                    json.dumps(report_id) + ': ' +
+                    json.dumps(report, indent=2).replace('\n', '\n    '))
+                count += 1
+            output.write('\n  }\n}\n' if count else '}\n}\n')
+        elif profile.get('verbose'):
+            for item in reports():
+                if count:
+                    output.write('\n')
+                cls.display_verbose(profile, dict([item]))
+                count += 1
+            output.write('\n' if count else 'No results\n')
+        else:
+            now = time.time()
+            cls.display_table(profile, itertools.chain(
+                [['20<URL', '>Pri', '4^Status', '>Pages', '>Age']],
+                (cls.row(Report(*item), now) for item in reports()),
+            ))
+        if failed:
+            return cls.display_response(profile, failed[0])
+        return 0  # EX_OK
+
     @classmethod
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'list' command."""
-        statuses = set([args.status] if isinstance(args.status, str)
-                       else args.status)
-        if 'all' in statuses:
-            statuses.clear()
-        elif 'incomplete' in statuses:
-            statuses |= {'queued', 'running', 'callback'}
-            statuses.remove('incomplete')
-        params = [('status', status) for status in statuses]
-        if args.user is not None:
-            params.append(('user', args.user))
-        response = api(profile, 'reports', params=params)
-        reports = list(response.json().get('reports', {}).values())
-        reports.sort(key=cls.sort_key)
+        if not cls.set_format(profile, args):
+            return 64  # EX_USAGE
+        if args.format and args.watch is not None:
+            sys.stderr.write(
+                'dexter list: error: --format cannot be used with --watch\n')
+            return 64  # EX_USAGE
+        params = list_request(
+            [args.status] if isinstance(args.status, str) else args.status,
+            args.user,
+        )['params']
+        page_size = args.page_size or int(profile.get('page-size', 0))
+        if args.watch is not None:
+            if args.limit is not None:
+                params.append(('limit', str(args.limit)))
+            return cls.watch(
+                profile,
+                args.watch,
+                lambda headers: api(
+                    profile, 'reports', params=params, headers=headers),
+                lambda profile, response: cls.display(
+                    profile, response, args.limit),
+                lambda data: (
+                    any(report.get('status') == 'running'
+                        for report in (data.get('reports') or {}).values()),
+                    False,
+                ),
+            )
+        if page_size > 0:
+            prefetch = args.prefetch
+            if prefetch is None:
+                prefetch = int(profile.get('prefetch', 2))
+            return cls.display_pages(
+                profile,
+                cls.pages(profile, params, page_size, prefetch, args.limit),
+                args.limit,
+            )
+        if args.limit is not None:
+            params.append(('limit', str(args.limit)))
+        if args.format:
+            return cls.stream_reports(profile, params, args.limit)
+        return cls.display(
+            profile, api(profile, 'reports', params=params), args.limit)
+
+    @classmethod
+    def stream_reports(
+        cls,
+        profile: Profile,
+        params: list[tuple[str, str]],
+        limit: int | None = None,
+    ) -> int:
+        """
+        Write an (unpaginated) list of reports in the chosen format.
+
+        The reports are written as the response is downloaded and parsed,
+        so that the whole list is never in memory.
+        """
+        response = api(profile, 'reports', params=params, stream=True)
+        if response.status_code != 200:
+            return cls.display_response(profile, response)
+        if profile.get('quiet'):
+            response.close()
+            return 0  # EX_OK
+        with span(
+            profile.get('tracer'), 'render', format=profile['format']
+        ) as attributes:
+            reports = iter_items(count_bytes(
+                response.iter_content(CHUNK_SIZE), attributes), 'reports')
+            attributes['rows'] = cls.write_records(profile, (
+                {'id': report_id, **report}
+                for report_id, report in itertools.islice(reports, limit)
+            ))
+        return 0  # EX_OK
+
+    @classmethod
+    def display(
+        cls,
+        profile: Profile,
+        response: 'requests.Response',
+        limit: int | None = None
+    ) -> int:
+        """Display an (unpaginated) list of reports."""
+        reports = Report.from_reports(
+            cls.decode(profile, response).get('reports', {})
+            if response.content else {})
+        reports.sort(key=operator.attrgetter('sort_key'))
+        now = time.time()
         output: list[collections.abc.Sequence[Any]] = [
             ['20<URL', '>Pri', '4^Status', '>Pages', '>Age']
         ]
-        for report in reports:
-            pages = f'{report["pages"]:,}'
-            if report['status'] == 'queued':
-                pages = f'{report["requestedPages"]:,}'
-            elif report['status'] == 'running':
-                pages = f'{report["pages"]:,}/{report["requestedPages"]:,}'
-            output.append((
-                report['url'],
-                report['priority'],
-                report['status'],
-                pages,
-                cls.age(parse_date(report['queued'])),
-            ))
+        output.extend(cls.row(report, now) for report in reports[:limit])
         return cls.display_response(profile, response, output)
 
     @staticmethod
-    def age(time: datetime.datetime) -> str:
-        """Return the age of the datetime as a human-friendly string."""
-        age = int(
-            (datetime.datetime.now(tz=datetime.timezone.utc) - time)
-            .total_seconds()
-        )
+    def age(seconds: float) -> str:
+        """Return an age in seconds as a human-friendly string."""
+        age = int(seconds)
         if age < 60:
             return f'{age}s'.format(age)
         if age < 60 * 60:
@@ -244,9 +742,12 @@ class List(Base):
 
 
 class Queue(Base):
-    """Queue a report."""
+    """Queue a report, or many reports."""
 
-    description = 'Queue a report'
+    description = (
+        'Queue a report, or queue many reports concurrently, reading their'
+        ' URLs from a file and writing the results in JSON lines format'
+    )
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
@@ -258,7 +759,7 @@ class Queue(Base):
         group = parser.add_mutually_exclusive_group()
         group.add_argument('--config', help='The configuration')
         group.add_argument(
-            '--config-file', type=argparse.FileType(), metavar='FILENAME',
+            '--config-file', type='file', metavar='FILENAME',
             help='Read the configuration from this file')
         parser.add_argument(
             '--lifetime', metavar='DAYS', type=int,
@@ -266,33 +767,316 @@ class Queue(Base):
         group = parser.add_mutually_exclusive_group()
         group.add_argument('--metadata', metavar='JSON', help='The metadata')
         group.add_argument(
-            '--metadata-file', type=argparse.FileType(), metavar='FILENAME',
+            '--metadata-file', type='file', metavar='FILENAME',
             help='Read the metadata from this file')
-        parser.add_argument('url', metavar='URL', help='The start URL')
+        parser.add_argument(
+            '--priority', metavar='N', type=int, help='The report priority')
+        parser.add_argument(
+            '--from-file', metavar='FILENAME', type='file',
+            help='Queue a report for each line of this file ("-" for stdin),'
+            ' which is either a URL optionally followed by the number of'
+            ' pages, or a JSON object with "url", "pages" and any of'
+            ' "callback", "callbackId", "config", "lifetime", "metadata"'
+            ' and "priority"')
+        parser.add_argument(
+            '--jobs', '-j', metavar='N', type=int, default=8,
+            help='The number of reports to queue at once with --from-file'
+            ' (default: 8)')
+        parser.add_argument(
+            '--rate', metavar='N', type=float,
+            help='Queue at most this many reports per second with'
+            ' --from-file')
+        parser.add_argument(
+            '--retries', metavar='N', type=int, default=5,
+            help='The number of times to retry when the server is busy'
+            ' (default: 5)')
+        parser.add_argument(
+            '--wait', action='store_true',
+            help='Wait for the reports to finish, receiving their callbacks'
+            ' with a local HTTP listener (see "dexter wait --help")')
+        Wait.add_wait_arguments(parser)
+        parser.add_argument(
+            'url', metavar='URL', nargs='?', help='The start URL')
         parser.add_argument(
             'pages', default=1, nargs='?', type=int,
             help='The number of pages to scan (default: 1)')
 
+    @staticmethod
+    def parse_line(
+        line: str, pages: int, options: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Return the api() arguments for a line of a file of URLs."""
+        if not line.startswith('{'):
+            url, *rest = line.split()
+            if len(rest) > 1:
+                raise ValueError('expected a URL and number of pages')
+            return queue_request(
+                url, int(rest[0]) if rest else pages, **options)
+        item = json.loads(line)
+        if not isinstance(item, dict) or not item.get('url'):
+            raise ValueError('url not specified')
+        options = {**options, **{
+            key: item[key] for key in (
+                'callback', 'config', 'lifetime', 'metadata', 'priority')
+            if key in item
+        }}
+        if 'callbackId' in item:
+            options['callback_id'] = item['callbackId']
+        return queue_request(
+            str(item['url']), int(item.get('pages', pages)), **options)
+
+    @classmethod
+    def read_urls(
+        cls, file: IO[str], pages: int, options: dict[str, Any]
+    ) -> collections.abc.Iterator[tuple[int, dict[str, Any] | ValueError]]:
+        """
+        Yield the line number and api() arguments (or error) for each URL.
+
+        The options are the default arguments to queue_request(), which may
+        be overridden by each line.
+        """
+        for line_num, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                yield line_num, cls.parse_line(line, pages, options)
+            except ValueError as exc:
+                yield line_num, exc
+
+    @staticmethod
+    def submit(
+        profile: Profile,
+        line_num: int,
+        request: dict[str, Any],
+        limiter: 'TokenBucket | None',
+        retries: int,
+    ) -> tuple[dict[str, Any], list[float]]:
+        """
+        Queue a report, retrying if the server is busy or unreachable.
+
+        Returns the result to output, and the latency of each attempt. The
+        same idempotency key is sent with every attempt, so that a retried
+        request does not queue the report twice.
+        """
+        import uuid  # noqa: PLC0415
+
+        import requests  # noqa: PLC0415
+
+        from .ratelimit import RETRY_STATUSES, retry_delay  # noqa: PLC0415
+
+        headers = {'Idempotency-Key': str(uuid.uuid4())}
+        latencies: list[float] = []
+        result: dict[str, Any] = {
+            'line': line_num, 'url': request['data']['url']}
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = api(profile, **request, headers=headers)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if attempt >= retries:
+                    result['attempts'] = attempt + 1
+                    result['error'] = str(exc)
+                    return result, latencies
+                delay = retry_delay(attempt)
+            else:
+                latencies.append(time.monotonic() - start)
+                if (
+                    response.status_code not in RETRY_STATUSES or
+                    attempt >= retries
+                ):
+                    break
+                delay = retry_delay(
+                    attempt, response.headers.get('retry-after'))
+            attempt += 1
+            time.sleep(delay)
+        result['attempts'] = attempt + 1
+        result['status'] = response.status_code
+        if not 200 <= response.status_code < 300:
+            result['error'] = response.reason
+        if response.content:
+            try:
+                result['response'] = response.json()
+            except ValueError:
+                result['response'] = response.text
+        return result, latencies
+
+    @classmethod
+    def process_file(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        options: dict[str, Any],
+        receiver: 'CallbackReceiver | None' = None,
+    ) -> int:
+        """
+        Queue a report for each URL in a file.
+
+        If a callback receiver is given, each report is given its own
+        callback URL, and the reports which are queued are then waited for.
+        """
+        from .ratelimit import TokenBucket  # noqa: PLC0415
+
+        rate = args.rate or float(profile.get('queue-rate', 0))
+        limiter = TokenBucket(rate) if rate > 0 else None
+        errors = invalid = queued = retries = 0
+        latencies: list[float] = []
+        callbacks: dict[int, str] = {}
+        waiting: dict[str, str] = {}
+        start = time.monotonic()
+
+        def failed(
+            line_num: int, error: str
+        ) -> tuple[dict[str, Any], list[float]]:
+            return {'line': line_num, 'error': error}, []
+
+        def tasks() -> collections.abc.Iterator[collections.abc.Callable[
+                [], tuple[dict[str, Any], list[float]]]]:
+            nonlocal invalid
+            for line_num, request in cls.read_urls(
+                args.from_file, args.pages, options
+            ):
+                if isinstance(request, ValueError):
+                    invalid += 1
+                    yield functools.partial(failed, line_num, str(request))
+                    continue
+                if receiver is not None:
+                    url, name = receiver.callback_url()
+                    request['data']['callback'] = url
+                    request['data'].setdefault('callbackId', name)
+                    receiver.expect(name)
+                    callbacks[line_num] = name
+                yield functools.partial(
+                    cls.submit, profile, line_num, request, limiter,
+                    args.retries)
+
+        def output(item: tuple[dict[str, Any], list[float]]) -> None:
+            nonlocal errors, queued, retries
+            result, times = item
+            latencies.extend(times)
+            retries += result.get('attempts', 1) - 1
+            if 'error' not in result and result['line'] in callbacks:
+                name = callbacks.pop(result['line'])
+                response = result.get('response')
+                if not isinstance(response, dict):
+                    # The report cannot be waited for without its ID
+                    result['error'] = 'Invalid JSON response'
+                elif response.get('id') is not None and receiver is not None:
+                    receiver.expect(name, str(response['id']))
+                    waiting[name] = str(response['id'])
+            if 'error' in result:
+                errors += 1
+            else:
+                queued += 1
+            if not profile.get('quiet'):
+                profile['output'].write(json.dumps(result) + '\n')
+                profile['output'].flush()
+
+        cls.run_tasks(profile, max(args.jobs, 1), tasks(), output)
+        if not profile.get('quiet'):
+            sys.stderr.write(cls.summary(
+                queued, queued + errors - invalid, retries, latencies,
+                time.monotonic() - start))
+        status = 0  # EX_OK
+        if receiver is not None and waiting:
+            status = Wait.wait_for(
+                profile, args, receiver, waiting, poll=False)
+        if invalid:
+            return 65  # EX_DATAERR
+        if errors:
+            return 74  # EX_IOERR
+        return status
+
+    @staticmethod
+    def summary(
+        queued: int,
+        total: int,
+        retries: int,
+        latencies: list[float],
+        elapsed: float,
+    ) -> str:
+        """Return a summary of the throughput and latency of queueing."""
+        text = (
+            f'Queued {queued:,} of {total:,} report'
+            f'{"" if total == 1 else "s"} in {elapsed:.1f}s'
+            f' ({queued / max(elapsed, 1e-6):,.1f}/s),'
+            f' {retries:,} retr{"y" if retries == 1 else "ies"}'
+        )
+        if latencies:
+            latencies = sorted(latencies)
+            for percent in (50, 99):
+                index = min(
+                    len(latencies) - 1, len(latencies) * percent // 100)
+                text += f', p{percent} {1000 * latencies[index]:.0f}ms'
+        return text + '\n'
+
     @classmethod
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'queue' command."""
-        data = {'url': args.url, 'requestedPages': args.pages}
-        if args.callback:
-            data['callback'] = args.callback
-        if args.callback_id:
-            data['callbackId'] = args.callbackId
-        if args.config:
-            data['config'] = args.config
-        if args.config_file:
-            data['config'] = args.config_file.read()
-        if args.lifetime:
-            data['lifetime'] = args.lifetime
+        if (args.url is None) == (args.from_file is None):
+            sys.stderr.write(
+                'dexter queue: error: exactly one of URL and --from-file'
+                ' must be given\n')
+            return 64  # EX_USAGE
+        metadata = None
         if args.metadata:
-            data['metadata'] = json.loads(args.metadata)
+            metadata = json.loads(args.metadata)
         if args.metadata_file:
-            data['metadata'] = json.load(args.metadata_file)
-        return cls.display_response(
-            profile, api(profile, 'reports', data=data))
+            metadata = json.load(args.metadata_file)
+        options = {
+            'callback': args.callback,
+            'callback_id': args.callback_id,
+            'config': args.config_file.read() if args.config_file
+            else args.config,
+            'lifetime': args.lifetime,
+            'metadata': metadata,
+            'priority': args.priority,
+        }
+        if args.wait:
+            return cls.process_wait(profile, args, options)
+        if args.from_file is not None:
+            return cls.process_file(profile, args, options)
+        request = queue_request(args.url, args.pages, **options)
+        return cls.display_response(profile, api(profile, **request))
+
+    @classmethod
+    def process_wait(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        options: dict[str, Any],
+    ) -> int:
+        """Queue a report, or many reports, and wait for them to finish."""
+        if args.callback:
+            sys.stderr.write(
+                'dexter queue: error: --callback cannot be used with'
+                ' --wait\n')
+            return 64  # EX_USAGE
+        receiver = Wait.receiver(profile, args)
+        if receiver is None:
+            return 71  # EX_OSERR
+        with receiver:
+            if args.from_file is not None:
+                return cls.process_file(profile, args, options, receiver)
+            options['callback'], name = receiver.callback_url()
+            options['callback_id'] = options['callback_id'] or name
+            receiver.expect(name)
+            response = api(
+                profile, **queue_request(args.url, args.pages, **options))
+            status = cls.display_response(profile, response)
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            if status or not isinstance(data, dict):
+                return status or 74  # EX_IOERR
+            report = str(data.get('id'))
+            receiver.expect(name, report)
+            return Wait.wait_for(
+                profile, args, receiver, {name: report}, poll=False)
 
 
 class Update(Base):
@@ -306,7 +1090,7 @@ class Update(Base):
         group = parser.add_mutually_exclusive_group(required=True)
         group.add_argument('--metadata', metavar='JSON', help='The metadata')
         group.add_argument(
-            '--metadata-file', type=argparse.FileType(), metavar='FILENAME',
+            '--metadata-file', type='file', metavar='FILENAME',
             help='Read the metadata from this file')
         parser.add_argument(
             'report', metavar='ID', help='The report ID or its status URL')
@@ -315,40 +1099,232 @@ class Update(Base):
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'update' command."""
         if args.metadata:
-            data = {'metadata': json.loads(args.metadata)}
+            metadata = json.loads(args.metadata)
         else:
-            data = {'metadata': json.load(args.metadata_file)}
+            metadata = json.load(args.metadata_file)
         return cls.display_response(
-            profile,
-            api(profile, args.report, base='reports/', data=data,
-                method='PUT')
-        )
+            profile, api(profile, **update_request(args.report, metadata)))
 
 
 class Status(Base):
     """Display the status of a report."""
 
-    aliases = ('info',)
     description = 'Display the status of a report'
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
         """Define the command-line arguments for this command."""
+        cls.add_watch_argument(parser)
         parser.add_argument(
             'report', metavar='ID', help='The report ID or its status URL')
 
     @classmethod
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'status' command."""
+        if args.watch is not None:
+            return cls.watch(
+                profile,
+                args.watch,
+                lambda headers: api(
+                    profile, **status_request(args.report), headers=headers),
+                cls.display_response,
+                lambda data: (
+                    data.get('status') == 'running',
+                    data.get('status') == 'complete',
+                ),
+            )
         return cls.display_response(
-            profile, api(profile, args.report, base='reports/'))
+            profile, api(profile, **status_request(args.report)))
+
+
+class Wait(Base):
+    """Wait for reports to finish."""
+
+    description = (
+        'Wait for reports to finish, receiving their callbacks with a local'
+        ' HTTP listener and polling the status of those which do not call'
+        ' back, writing the results in JSON lines format'
+    )
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        cls.add_wait_arguments(parser)
+        parser.add_argument(
+            'report', metavar='ID', nargs='+',
+            help='The report ID or its status URL')
+
+    @staticmethod
+    def add_wait_arguments(parser: argparse.ArgumentParser) -> None:
+        """Add the arguments for waiting for reports to the parser."""
+        from .callback import parse_address  # noqa: PLC0415
+
+        parser.add_argument(
+            '--listen', metavar='[HOST:]PORT', type=parse_address,
+            help='The address to receive callbacks on (default: a free port'
+            ' on 127.0.0.1)')
+        parser.add_argument(
+            '--public-url', metavar='URL',
+            help='The URL to receive callbacks on, which is forwarded to'
+            ' the --listen address')
+        parser.add_argument(
+            '--poll-after', metavar='SECONDS', type=float, default=60,
+            help='Poll the status of reports which have not called back'
+            ' after this long (default: 60)')
+        parser.add_argument(
+            '--interval', metavar='SECONDS', type=float, default=5,
+            help='The interval between polls, which increases while a'
+            ' report is unfinished (default: 5)')
+        parser.add_argument(
+            '--timeout', metavar='SECONDS', type=float,
+            help='Stop waiting after this long')
+
+    @staticmethod
+    def receiver(
+        profile: Profile, args: argparse.Namespace
+    ) -> 'CallbackReceiver | None':
+        """
+        Return a listener for callbacks, configured by the arguments.
+
+        The 'callback-listen' and 'callback-url' keys of the profile are
+        used if --listen and --public-url are not given. If the listener
+        cannot be started, the error is displayed and None is returned.
+        """
+        from .callback import CallbackReceiver, parse_address  # noqa: PLC0415
+
+        try:
+            address = args.listen or parse_address(
+                profile.get('callback-listen') or '0')
+            receiver = CallbackReceiver(
+                address, args.public_url or profile.get('callback-url'))
+        except (OSError, argparse.ArgumentTypeError) as e:
+            sys.stderr.write(
+                f'dexter {args.command}: error: cannot listen for'
+                f' callbacks: {e}\n')
+            return None
+        if not profile.get('quiet'):
+            sys.stderr.write(f'Waiting for callbacks at {receiver.url}\n')
+        return receiver
+
+    @staticmethod
+    def poll(profile: Profile, report: str) -> dict[str, Any] | None:
+        """
+        Return the result for a report if it has finished, otherwise None.
+
+        Errors which may be temporary count as the report being unfinished,
+        so that it is polled again later.
+        """
+        import requests  # noqa: PLC0415
+
+        from .ratelimit import RETRY_STATUSES  # noqa: PLC0415
+
+        try:
+            response = api(profile, **status_request(report))
+        except (requests.ConnectionError, requests.Timeout):
+            return None
+        if response.status_code in RETRY_STATUSES:
+            return None
+        result: dict[str, Any] = {'report': report, 'via': 'poll'}
+        if response.status_code != 200:
+            result['status'] = response.status_code
+            result['error'] = response.reason
+            return result
+        data = response.json()
+        if isinstance(data, dict) and data.get('status') in INCOMPLETE:
+            return None
+        result['response'] = data
+        return result
+
+    @classmethod
+    def wait_for(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        receiver: 'CallbackReceiver',
+        reports: dict[str, str],
+        *,
+        poll: bool = True,
+    ) -> int:
+        """
+        Wait for reports to finish, writing a line of JSON as each does.
+
+        'reports' maps the name which each report's callback is expected
+        under (see CallbackReceiver.expect()) to the report's ID. Reports
+        which have not called back after --poll-after seconds (or, if
+        'poll' is true, straight away) are polled, with the interval
+        increasing while they are unfinished, as in watch().
+        """
+        start = time.monotonic()
+        deadline = None if args.timeout is None else start + args.timeout
+        interval = max(args.interval, 0.1)
+        due = dict.fromkeys(
+            reports, start if poll else start + max(args.poll_after, 0))
+        delays = dict.fromkeys(reports, interval)
+        errors = 0
+
+        def output(name: str, result: dict[str, Any]) -> None:
+            nonlocal errors
+            del due[name]
+            receiver.forget(name)
+            if 'error' in result:
+                errors += 1
+            if not profile.get('quiet'):
+                profile['output'].write(json.dumps(result) + '\n')
+                profile['output'].flush()
+
+        with thread_pool(8) as executor:
+            while due:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                polled = [name for name, when in due.items() if when <= now]
+                for name, result in zip(polled, executor.map(
+                    lambda name: cls.poll(profile, reports[name]), polled
+                ), strict=True):
+                    if result is not None:
+                        output(name, result)
+                        continue
+                    due[name] = now + delays[name]
+                    delays[name] = min(delays[name] * 1.5, interval * 8)
+                wake = min(due.values(), default=now)
+                if deadline is not None:
+                    wake = min(wake, deadline)
+                for name, payload in receiver.wait(
+                    max(wake - time.monotonic(), 0)
+                ).items():
+                    if name in due:
+                        output(name, {
+                            'report': reports[name],
+                            'via': 'callback',
+                            'response': payload,
+                        })
+        if due:
+            for name in list(due):
+                output(name, {'report': reports[name], 'error': 'timed out'})
+            return 75  # EX_TEMPFAIL
+        if errors:
+            return 74  # EX_IOERR
+        return 0  # EX_OK
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'wait' command."""
+        receiver = cls.receiver(profile, args)
+        if receiver is None:
+            return 71  # EX_OSERR
+        with receiver:
+            for report in args.report:
+                receiver.expect(
+                    report, report.rstrip('/').rsplit('/', 1)[-1])
+            return cls.wait_for(
+                profile, args, receiver,
+                {report: report for report in args.report})
 
 
 class Delete(Base):
     """Delete a report."""
 
     description = 'Delete a report'
-    aliases = ('cancel',)
 
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
@@ -360,9 +1336,7 @@ class Delete(Base):
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'delete' command."""
         return cls.display_response(
-            profile,
-            api(profile, args.report, base='reports/', method='DELETE')
-        )
+            profile, api(profile, **delete_request(args.report)))
 
 
 class Fetch(Base):
@@ -374,19 +1348,1108 @@ class Fetch(Base):
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
         """Define the command-line arguments for this command."""
         parser.add_argument(
-            'report', metavar='ID', help='The report ID or its status URL')
+            '--no-cache', action='store_true',
+            help='Do not use the cache of fetched reports')
+        parser.add_argument(
+            '--pretty', action='store_true',
+            help='Stream the report, reformatting it as indented JSON'
+            ' (implies --stream)')
+        parser.add_argument(
+            '--stream', action='store_true',
+            help='Write the report to the output as it is downloaded,'
+            ' without loading it into memory')
+        cls.add_format_arguments(parser, 'the pages of the report')
+        parser.add_argument(
+            '--jobs', '-j', metavar='N', type=int, default=8,
+            help='The number of reports to download at once when fetching'
+            ' many reports (default: 8)')
+        parser.add_argument(
+            '--output-dir', '-O', metavar='DIRECTORY',
+            help='Download the reports to files named after their IDs in'
+            ' this directory (the default when fetching many reports is the'
+            ' current directory)')
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            choices=('incomplete', 'queued', 'running', 'callback',
+                     'complete', 'all'),
+            help='Fetch every report that is in this status (may be given'
+            ' more than once)')
+        parser.add_argument(
+            'report', metavar='ID', nargs='*',
+            help='The report ID or its status URL')
+
+    @classmethod
+    def progress(
+        cls,
+        profile: Profile,
+        response: 'requests.Response',
+        chunks: collections.abc.Iterator[bytes],
+    ) -> collections.abc.Iterator[bytes]:
+        """Display the progress of a download, if stderr is a terminal."""
+        if (
+            profile.get('quiet') or not sys.stderr.isatty() or
+            profile['output'].isatty()
+        ):
+            return chunks
+        length = response.headers.get('content-length')
+        return Progress(
+            int(length) if length and
+            not response.headers.get('content-encoding') else None
+        ).wrap(chunks)
+
+    @classmethod
+    def stream_response(
+        cls,
+        profile: Profile,
+        response: 'requests.Response',
+        *,
+        pretty: bool = False,
+        display: bool = False,
+    ) -> int:
+        """
+        Write the body of a streamed response to the output.
+
+        If 'display' is true, the report is displayed like the output of
+        other commands, rather than written as it is.
+        """
+        if response.status_code != 200:
+            return cls.display_response(profile, response)
+        output = profile['output']
+        if display and profile.get('debug'):
+            output.write(f'{response.status_code} {response.reason}\n')
+        elif profile.get('quiet'):
+            response.close()
+            return 0  # EX_OK
+        encoding = response.headers.get('content-encoding', '').lower()
+        with span(
+            profile.get('tracer'), 'download', url=response.url
+        ) as attributes:
+            if (
+                not pretty and not display and not profile.get('format') and
+                encoding and
+                encoding == getattr(output, 'raw_compression', None)
+            ):
+                # Pass the body through without decompressing it
+                for chunk in cls.progress(profile, response, count_bytes(
+                    response.raw.stream(CHUNK_SIZE, decode_content=False),
+                    attributes,
+                )):
+                    output.write_raw(chunk)
+                return 0  # EX_OK
+            chunks = count_bytes(
+                response.iter_content(CHUNK_SIZE), attributes)
+            cls.write_chunks(
+                profile, cls.progress(profile, response, chunks),
+                pretty=pretty, display=display)
+        return 0  # EX_OK
+
+    @staticmethod
+    def write_chunks(
+        profile: Profile,
+        chunks: collections.abc.Iterable[bytes],
+        *,
+        pretty: bool = False,
+        display: bool = False,
+    ) -> None:
+        """Write a report, given as chunks of bytes, to the output."""
+        output = profile['output']
+        if display:
+            # Only one page is decoded at a time
+            Base.display_events(profile, iter_value_events(chunks))
+        elif profile.get('format'):
+            Base.write_records(profile, (
+                page for _, page in iter_items(chunks, 'pages')))
+        elif pretty:
+            dump_events(iter_events(chunks), output)
+            output.write('\n')
+        elif hasattr(output, 'buffer'):
+            output.flush()
+            for chunk in chunks:
+                output.buffer.write(chunk)
+        else:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for chunk in chunks:
+                output.write(decoder.decode(chunk))
+            output.write(decoder.decode(b'', final=True))
 
     @classmethod
     def process(cls, profile: Profile, args: argparse.Namespace) -> int:
         """Run the 'fetch' command."""
-        response = api(profile, args.report, base='reports/')
+        if len(args.report) != 1 or args.statuses or args.output_dir:
+            return cls.process_many(profile, args)
+        if not cls.set_format(profile, args):
+            return 64  # EX_USAGE
+        report_id = args.report[0]
+        status = cls.report_status(profile, report_id)
+        if isinstance(status, int):
+            return status
+        report = status['detail']
+        if not cls.uses_cache(profile, args):
+            return cls.stream_response(
+                profile,
+                session(profile).get(
+                    report, stream=True, timeout=timeout(profile)),
+                pretty=args.pretty,
+                display=not (args.stream or args.pretty or args.format),
+            )
+        return cls.fetch_cached(
+            profile,
+            str(status.get('id') or report_id),
+            report,
+            immutable=status.get('status') == 'complete',
+            stream=bool(args.stream or args.pretty or args.format),
+            pretty=args.pretty,
+        )
+
+    @staticmethod
+    def statuses(
+        profile: Profile, args: argparse.Namespace
+    ) -> collections.abc.Iterator[tuple[str, dict[str, Any] | None]]:
+        """
+        Yield each report to download, and its status if it is known.
+
+        The reports given on the command line are yielded first, without
+        their status, followed by the reports listed with --status, which
+        are parsed as the list is downloaded.
+        """
+        for report in args.report:
+            yield report, None
+        if not args.statuses:
+            return
+        response = api(
+            profile, **list_request(args.statuses), stream=True)
+        if response.status_code != 200:
+            yield '', {'error': response.reason or 'list failed',
+                       'status': response.status_code}
+            return
+        for report, status in iter_items(
+            response.iter_content(CHUNK_SIZE), 'reports'
+        ):
+            yield str(report), status
+
+    @staticmethod
+    def download_report(
+        profile: Profile,
+        directory: Path,
+        report: str,
+        status: dict[str, Any] | None,
+        progress: 'DownloadProgress | None',
+    ) -> dict[str, Any]:
+        """
+        Download a report to a file in a directory, returning the result.
+
+        The status of the report is requested first if it is not known, or
+        if it is from a list of reports which left out its 'detail' URL.
+        """
+        import requests  # noqa: PLC0415
+
+        from .download import download, report_filename  # noqa: PLC0415
+
+        result: dict[str, Any] = {'report': report}
+        try:
+            if not isinstance(status, dict) or not status.get('detail'):
+                response = api(profile, **status_request(report))
+                if response.status_code != 200:
+                    result['status'] = response.status_code
+                    result['error'] = response.reason
+                    return result
+                status = response.json()
+            if not isinstance(status, dict) or not status.get('detail'):
+                result['error'] = 'report is not available yet'
+                return result
+            result['report'] = report = str(status.get('id') or report)
+            result.update(download(
+                profile,
+                status['detail'],
+                directory / report_filename(report),
+                immutable=status.get('status') == 'complete',
+                progress=progress,
+            ))
+        except (OSError, ValueError, requests.RequestException) as exc:
+            result['error'] = str(exc)
+        finally:
+            if progress:
+                progress.finish()
+        return result
+
+    @classmethod
+    def process_many(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """
+        Download many reports concurrently to files in a directory.
+
+        A line of JSON with the result of each download is written to the
+        output, in the order the reports were given, followed by a summary
+        on stderr.
+        """
+        from .download import DownloadProgress  # noqa: PLC0415
+
+        if args.stream or args.pretty or args.format or args.fields:
+            sys.stderr.write(
+                'dexter fetch: error: --stream, --pretty, --format and'
+                ' --fields cannot be used when downloading reports to'
+                ' files\n')
+            return 64  # EX_USAGE
+        if not args.report and not args.statuses:
+            sys.stderr.write(
+                'dexter fetch: error: a report ID or --status is required\n')
+            return 64  # EX_USAGE
+        directory = cls.path(profile, args.output_dir or '.')
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            sys.stderr.write(f'dexter fetch: error: {e}\n')
+            return 73  # EX_CANTCREAT
+        progress = None
+        if not profile.get('quiet') and sys.stderr.isatty():
+            progress = DownloadProgress(
+                None if args.statuses else len(args.report))
+        counts: collections.Counter[str] = collections.Counter()
+        start = time.monotonic()
+
+        def tasks() -> collections.abc.Iterator[
+                collections.abc.Callable[[], dict[str, Any]]]:
+            for report, status in cls.statuses(profile, args):
+                if status is not None and 'error' in status:
+                    yield functools.partial(dict, status)
+                else:
+                    yield functools.partial(
+                        cls.download_report, profile, directory, report,
+                        status, progress)
+
+        def output(result: dict[str, Any]) -> None:
+            counts['error' if 'error' in result else result['result']] += 1
+            counts['bytes'] += result.get('bytes', 0)
+            if not profile.get('quiet'):
+                profile['output'].write(json.dumps(result) + '\n')
+                profile['output'].flush()
+
+        cls.run_tasks(profile, max(args.jobs, 1), tasks(), output)
+        if progress:
+            progress.close()
+        if not profile.get('quiet'):
+            elapsed = time.monotonic() - start
+            fetched = counts['downloaded'] + counts['resumed']
+            sys.stderr.write(
+                f'Fetched {fetched:,} report{"" if fetched == 1 else "s"}'
+                f' ({counts["resumed"]:,} resumed, {counts["skipped"]:,}'
+                f' already complete, {counts["error"]:,} failed),'
+                f' {format_size(counts["bytes"])} in {elapsed:.1f}s'
+                f' ({format_size(counts["bytes"] / max(elapsed, 1e-6))}/s)\n')
+        if counts['error']:
+            return 74  # EX_IOERR
+        return 0  # EX_OK
+
+    @classmethod
+    def report_status(
+        cls, profile: Profile, report: str
+    ) -> dict[str, Any] | int:
+        """
+        Return the status of a report whose full report is available.
+
+        Otherwise, the error is displayed and the exit status is returned.
+        """
+        response = api(profile, report, base='reports/')
         if response.status_code != 200:
             return cls.display_response(profile, response)
         if profile.get('debug'):
             cls.display_response(profile, response)
-        report = response.json().get('detail')
-        if not report:
+        status: dict[str, Any] = cls.decode(profile, response)
+        if not status.get('detail'):
             if not profile.get('quiet'):
-                profile['output'].write('Report is not available yet\n')
+                profile['output'].write(
+                    f'Report {report} is not available yet\n')
+            return 74  # EX_IOERR
+        return status
+
+    @staticmethod
+    def uses_cache(profile: Profile, args: argparse.Namespace) -> bool:
+        """Return whether to fetch reports via the report cache."""
+        return not args.no_cache and str(
+            profile.get('cache', 'yes')).lower() not in {
+                'no', 'false', 'off', '0'}
+
+    @classmethod
+    def fetch_cached(
+        cls,
+        profile: Profile,
+        report_id: str,
+        url: str,
+        *,
+        immutable: bool = False,
+        stream: bool = False,
+        pretty: bool = False,
+    ) -> int:
+        """
+        Fetch and display a report via the report cache.
+
+        A report which is downloaded is written out as it is stored in the
+        cache, rather than once it has been stored.
+        """
+        from .cache import ReportCache  # noqa: PLC0415
+        from .compress import decompress_chunks  # noqa: PLC0415
+
+        cache = ReportCache.from_profile(profile)
+        response, body = cache.request(
+            profile, report_id, url, immutable=immutable)
+        if body is None:
+            return cls.display_response(profile, response) if response else 74
+        tracer = profile.get('tracer')
+        if profile.get('quiet') and not profile.get('debug'):
+            if not isinstance(body, Path):
+                # Store the report in the cache all the same
+                with (
+                    contextlib.closing(body),
+                    span(tracer, 'download', url=url) as attributes,
+                ):
+                    collections.deque(
+                        count_bytes(body, attributes), maxlen=0)
+            return 0  # EX_OK
+        output = profile['output']
+        with contextlib.ExitStack() as stack:
+            if isinstance(body, Path):
+                file, metadata = cache.open(body, decode=False)
+                stack.enter_context(file)
+                encoding = metadata.get('encoding')
+                chunks: collections.abc.Iterator[bytes] = iter(
+                    functools.partial(file.read, CHUNK_SIZE), b'')
+            else:
+                stack.enter_context(contextlib.closing(body))
+                encoding = cache.encoded(cast('requests.Response', response))
+                chunks = body
+            raw = (
+                stream and not pretty and not profile.get('format') and
+                encoding and
+                encoding == getattr(output, 'raw_compression', None)
+            )
+            if stream:
+                render = profile.get('format') or (
+                    'pretty' if pretty else 'raw')
+            else:
+                render = 'json' if profile.get('json') else 'verbose'
+                if profile.get('debug'):
+                    # As for a report which is not cached, even if the cached
+                    # copy was used without downloading it again
+                    output.write('200 OK\n')
+            if isinstance(body, Path):
+                attributes = stack.enter_context(
+                    span(tracer, 'render', format=render))
+                chunks = count_bytes(chunks, attributes)
+            else:
+                attributes = stack.enter_context(
+                    span(tracer, 'download', url=url))
+                chunks = cls.progress(
+                    profile, cast('requests.Response', response),
+                    count_bytes(chunks, attributes))
+            if raw:
+                # Pass the body through without decompressing it
+                for chunk in chunks:
+                    output.write_raw(chunk)
+            else:
+                cls.write_chunks(
+                    profile,
+                    decompress_chunks(chunks, encoding),
+                    pretty=pretty,
+                    display=not stream,
+                )
+        return 0  # EX_OK
+
+
+class Diff(Base):
+    """Compare two full reports."""
+
+    description = 'Compare the pages of two full reports'
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        parser.add_argument(
+            '--key', metavar='FIELD', default='url',
+            help='The field identifying each page (default: url)')
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Do not use the cache of fetched reports')
+        parser.add_argument(
+            '--summary', action='store_true',
+            help='Only display the numbers of pages and fields changed')
+        cls.add_format_arguments(parser, 'the changed pages')
+        parser.add_argument(
+            'old', metavar='OLD',
+            help='The old report ID, its status URL, or a report file')
+        parser.add_argument(
+            'new', metavar='NEW',
+            help='The new report ID, its status URL, or a report file')
+
+    @classmethod
+    def open_report(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        report: str,
+        stack: contextlib.ExitStack,
+    ) -> collections.abc.Iterable[bytes] | int:
+        """
+        Open a report to compare, returning its body as chunks of bytes.
+
+        The report is either a file (decompressed if its name ends in '.br'
+        or '.gz'), or a report ID or status URL, which is fetched via the
+        report cache unless it is disabled. If the report cannot be
+        fetched, the error is displayed and the exit status is returned.
+        """
+        from .cache import ReportCache  # noqa: PLC0415
+        from .compress import ENCODINGS, open_decompressed  # noqa: PLC0415
+
+        path = cls.path(profile, report)
+        if path.is_file():
+            file = stack.enter_context(open_decompressed(
+                path, ENCODINGS.get(path.suffix.lower())))
+        else:
+            fetched = cls.fetch_report(profile, args, report, stack)
+            if not isinstance(fetched, Path):
+                return fetched
+            file = stack.enter_context(
+                ReportCache.open(fetched)[0])
+        return iter(functools.partial(file.read, CHUNK_SIZE), b'')
+
+    @classmethod
+    def fetch_report(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        report: str,
+        stack: contextlib.ExitStack,
+    ) -> collections.abc.Iterable[bytes] | Path | int:
+        """
+        Fetch a report, returning the path of its cache entry.
+
+        If the report is downloaded, or the cache is disabled, the body is
+        streamed instead, and its chunks are returned. If the report cannot
+        be fetched, the error is displayed and the exit status is returned.
+        """
+        from .cache import ReportCache  # noqa: PLC0415
+        from .compress import decompress_chunks  # noqa: PLC0415
+
+        status = Fetch.report_status(profile, report)
+        if isinstance(status, int):
+            return status
+        url = status['detail']
+        if not Fetch.uses_cache(profile, args):
+            response = session(profile).get(
+                url, stream=True, timeout=timeout(profile))
+            stack.callback(response.close)
+            if response.status_code != 200:
+                return cls.display_response(profile, response)
+            return response.iter_content(CHUNK_SIZE)
+        cached_response, body = ReportCache.from_profile(profile).request(
+            profile,
+            str(status.get('id') or report),
+            url,
+            immutable=status.get('status') == 'complete',
+        )
+        if body is None:
+            return cls.display_response(
+                profile, cached_response) if cached_response else 74
+        if isinstance(body, Path):
+            return body
+        # Compare the report as it is downloaded and stored in the cache
+        stack.callback(body.close)
+        return decompress_chunks(body, ReportCache.encoded(
+            cast('requests.Response', cached_response)))
+
+    @classmethod
+    def display_changes(
+        cls,
+        profile: Profile,
+        diff: 'ReportDiff',
+        changes: collections.abc.Iterator[dict[str, Any]],
+        *,
+        summary: bool = False,
+    ) -> None:
+        """Display the changed pages, as they are found, and a summary."""
+        if profile.get('quiet') and not profile.get('debug'):
+            collections.deque(changes, maxlen=0)
+            return
+        if profile.get('format'):
+            cls.write_records(profile, changes)
+            return
+        if profile.get('json') or profile.get('verbose'):
+            if summary:
+                collections.deque(changes, maxlen=0)
+                cls.display_data(profile, diff.summary())
+            else:
+                # The summary has its own 'pages', so the changes are given
+                # under a different key
+                pages = list(changes)
+                cls.display_data(
+                    profile, {'changes': pages, **diff.summary()})
+            return
+        if summary:
+            collections.deque(changes, maxlen=0)
+        else:
+            rows = (
+                (change['change'], change['page'], ', '.join(
+                    change['fields']))
+                for change in changes
+            )
+            if (first := next(rows, None)) is not None:
+                cls.display_table(profile, itertools.chain(
+                    [('7<Change', '30<Page', 'Fields'), first], rows))
+                profile['output'].write('\n')
+        counts = diff.summary()
+        cls.display_table(profile, [
+            ('20<', '>Unchanged', '>Changed', '>Added', '>Removed'),
+            *(
+                (name, *(f'{count:,}' for count in row.values()))
+                for name, row in [
+                    ('pages', counts['pages']),
+                    *(
+                        (f'field {name}', fields)
+                        for name, fields in counts['fields'].items()
+                    ),
+                ]
+            ),
+        ])
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'diff' command."""
+        from .diff import ReportDiff  # noqa: PLC0415
+
+        if not cls.set_format(profile, args):
+            return 64  # EX_USAGE
+        diff = ReportDiff(args.key)
+        tracer = profile.get('tracer')
+        report = args.old
+        try:
+            with contextlib.ExitStack() as stack:
+                chunks = cls.open_report(profile, args, report, stack)
+                if isinstance(chunks, int):
+                    return chunks
+                with span(tracer, 'index', report=report) as attributes:
+                    diff.add(iter_items(
+                        count_bytes(chunks, attributes), 'pages'))
+                    attributes['items'] = len(diff.index)
+            report = args.new
+            with contextlib.ExitStack() as stack:
+                chunks = cls.open_report(profile, args, report, stack)
+                if isinstance(chunks, int):
+                    return chunks
+                with span(tracer, 'compare', report=report) as attributes:
+                    cls.display_changes(
+                        profile,
+                        diff,
+                        diff.compare(iter_items(
+                            count_bytes(chunks, attributes), 'pages')),
+                        summary=args.summary,
+                    )
+        except ValueError as e:
+            sys.stderr.write(f'dexter diff: error: {report}: {e}\n')
+            return 65  # EX_DATAERR
+        if diff.pages['unchanged'] != diff.pages.total():
+            return 1  # The reports differ, as diff(1)
+        return 0  # EX_OK
+
+
+class Cache(Base):
+    """Manage the cache of fetched reports."""
+
+    description = 'Display statistics about, or clear, the report cache'
+    requires_api = False
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        parser.add_argument(
+            'action', choices=('stats', 'clear'),
+            help='Whether to display statistics or clear the cache')
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'cache' command."""
+        from .cache import ReportCache  # noqa: PLC0415
+
+        cache = ReportCache.from_profile(profile)
+        if args.action == 'clear':
+            count = cache.clear()
+            if not profile.get('quiet'):
+                profile['output'].write(
+                    f'Removed {count:,} cached report'
+                    f'{"" if count == 1 else "s"}\n')
+        elif not profile.get('quiet'):
+            cls.display_data(profile, cache.stats())
+        return 0  # EX_OK
+
+
+class Index(Base):
+    """Add fetched reports to the local index."""
+
+    description = 'Add fetched reports to the local index, for querying'
+    requires_api = False
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Index reports again, even if they are already indexed')
+        parser.add_argument(
+            '--fts', action='store_true',
+            help='Keep a full-text index of pages, for query --search')
+        parser.add_argument(
+            'report', metavar='ID', nargs='*',
+            help='Fetch these reports (via the cache) and index them,'
+            ' rather than indexing every report in the cache')
+
+    @classmethod
+    def sources(
+        cls,
+        profile: Profile,
+        args: argparse.Namespace,
+        cache: 'ReportCache',
+        counts: collections.Counter[str],
+    ) -> collections.abc.Iterator[tuple[Path, dict[str, Any] | None]]:
+        """
+        Yield the cache entry of each report to index, and its status.
+
+        Reports given on the command line are fetched one at a time, as
+        they are needed, counting those which cannot be fetched (or are too
+        large to be cached) as 'failed'. Otherwise, every report in the
+        cache is yielded, without its status.
+        """
+        if not args.report:
+            for path, _ in cache.entries():
+                yield path, None
+            return
+        for report in args.report:
+            status = Fetch.report_status(profile, report)
+            if isinstance(status, int):
+                counts['failed'] += 1
+                continue
+            response, cached = cache.fetch(
+                profile,
+                str(status.get('id') or report),
+                status['detail'],
+                immutable=status.get('status') == 'complete',
+            )
+            if cached is None:
+                if response is not None and response.status_code == 200:
+                    sys.stderr.write(
+                        f'dexter index: error: {report} is larger than the'
+                        ' cache\n')
+                elif response is not None:
+                    cls.display_response(profile, response)
+                counts['failed'] += 1
+                continue
+            yield cached, status
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'index' command."""
+        import sqlite3  # noqa: PLC0415
+
+        from .cache import ReportCache  # noqa: PLC0415
+        from .index import ReportIndex  # noqa: PLC0415
+
+        if args.report and not (
+            profile.get('root') and profile.get('api-key')
+        ):
+            sys.stderr.write(
+                'dexter index: error: root and api-key are required to fetch'
+                ' reports\n')
+            return 64  # EX_USAGE
+        cache = ReportCache.from_profile(profile)
+        counts: collections.Counter[str] = collections.Counter()
+        tracer = profile.get('tracer')
+        with ReportIndex.from_profile(profile) as index:
+            if args.fts:
+                try:
+                    index.enable_fts()
+                except sqlite3.OperationalError as e:
+                    sys.stderr.write(
+                        'dexter index: error: full-text search is not'
+                        f' available: {e}\n')
+                    return 74  # EX_IOERR
+            for path, status in cls.sources(profile, args, cache, counts):
+                try:
+                    file, metadata = cache.open(path)
+                except (OSError, ValueError):
+                    continue
+                version = str(
+                    metadata.get('etag') or metadata.get('last-modified') or
+                    path.stat().st_size)
+                report = metadata['report']
+                if not args.force and index.version(report) == version:
+                    file.close()
+                    counts['skipped'] += 1
+                    continue
+                try:
+                    with (
+                        file,
+                        span(tracer, 'index', report=report) as attributes,
+                    ):
+                        attributes['items'] = index.add(
+                            report,
+                            count_bytes(iter(functools.partial(
+                                file.read, CHUNK_SIZE), b''), attributes),
+                            version=version,
+                            detail=metadata.get('url'),
+                            fetched=path.stat().st_mtime,
+                            status=status,
+                        )
+                except ValueError as e:
+                    sys.stderr.write(f'dexter index: error: {report}: {e}\n')
+                    counts['invalid'] += 1
+                    continue
+                counts['indexed'] += 1
+                counts['pages'] += attributes['items']
+        if not profile.get('quiet'):
+            profile['output'].write(
+                f'Indexed {counts["indexed"]:,} report'
+                f'{"" if counts["indexed"] == 1 else "s"}'
+                f' ({counts["pages"]:,} pages), skipped'
+                f' {counts["skipped"]:,} already indexed\n')
+        if counts['invalid']:
+            return 65  # EX_DATAERR
+        if counts['failed']:
+            return 74  # EX_IOERR
+        return 0  # EX_OK
+
+
+class Query(Base):
+    """Query the local index of fetched reports."""
+
+    description = 'Query the pages of the reports in the local index'
+    requires_api = False
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        from .index import parse_statuses, parse_time  # noqa: PLC0415
+
+        parser.add_argument(
+            '--report', metavar='ID', action='append', dest='reports',
+            help='Only pages of this report (may be given more than once)')
+        parser.add_argument(
+            '--url',
+            help='Only pages with this URL, which may contain the wildcards'
+            ' * and ?')
+        parser.add_argument(
+            '--status', metavar='STATUS,...', type=parse_statuses,
+            help='Only pages with these HTTP statuses (e.g. 404,5xx)')
+        parser.add_argument(
+            '--search', metavar='WORDS',
+            help='Only pages containing all these words (requires a'
+            ' full-text index, see index --fts)')
+        parser.add_argument(
+            '--since', metavar='DATE', type=parse_time,
+            help='Only reports queued (or, if unknown, fetched) since this'
+            ' date or time')
+        parser.add_argument(
+            '--until', metavar='DATE', type=parse_time,
+            help='Only reports queued (or, if unknown, fetched) before this'
+            ' date or time')
+        parser.add_argument(
+            '--limit', metavar='N', type=int,
+            help='Display at most this many results')
+        parser.add_argument(
+            '--reports', action='store_true', dest='by_report',
+            help='List the reports with matching pages, rather than the'
+            ' pages')
+        cls.add_format_arguments(parser, 'the matching pages (or reports)')
+
+    @staticmethod
+    def record(
+        columns: tuple[str, ...], row: tuple[Any, ...]
+    ) -> dict[str, Any]:
+        """Return a row of results as a record, with its page's data."""
+        record = dict(zip(columns, row, strict=False))
+        for name in ('queued', 'fetched'):
+            if record.get(name) is not None:
+                record[name] = time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ', time.gmtime(record[name]))
+        if len(row) > len(columns):
+            record = {
+                'report': record['report'],
+                'position': record['position'],
+                **json.loads(row[-1]),
+            }
+        return record
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'query' command."""
+        from .index import (  # noqa: PLC0415
+            PAGE_COLUMNS,
+            REPORT_COLUMNS,
+            ReportIndex,
+        )
+
+        if not cls.set_format(profile, args):
+            return 64  # EX_USAGE
+        path = ReportIndex.default_path(profile)
+        if not path.exists():
+            sys.stderr.write(
+                "dexter query: error: there is no index (see 'dexter"
+                " index')\n")
+            return 74  # EX_IOERR
+        with ReportIndex(path) as index:
+            if args.search is not None and not index.fts:
+                sys.stderr.write(
+                    'dexter query: error: --search requires a full-text'
+                    " index (see 'dexter index --fts')\n")
+                return 64  # EX_USAGE
+            columns = REPORT_COLUMNS if args.by_report else PAGE_COLUMNS
+            fields = profile.get('fields')
+            records = profile.get('json') or profile.get('verbose') or (
+                profile.get('format'))
+            rows = index.query(
+                {
+                    'reports': args.reports,
+                    'url': args.url,
+                    'statuses': args.status,
+                    'search': args.search,
+                    'since': args.since,
+                    'until': args.until,
+                },
+                limit=args.limit,
+                by_report=args.by_report,
+                # The pages' JSON is only decoded if it is needed
+                data=bool(records) and not args.by_report and not (
+                    fields and set(fields) <= set(columns)),
+            )
+            if profile.get('format'):
+                cls.write_records(
+                    profile, (cls.record(columns, row) for row in rows))
+            elif records:
+                cls.display_data(
+                    profile, [cls.record(columns, row) for row in rows])
+            elif args.by_report:
+                now = time.time()
+                cls.display_table(profile, itertools.chain(
+                    [('Report', '20<URL', '8<Status', '>Age', '>Pages',
+                      '>Matched')],
+                    (
+                        (
+                            report, url or '', status or '',
+                            List.age(now - (queued or fetched)),
+                            f'{pages:,}', f'{matched:,}',
+                        )
+                        for report, url, status, queued, fetched, pages,
+                        matched in rows
+                    ),
+                ))
+            else:
+                cls.display_table(profile, itertools.chain(
+                    [('Report', '>Status', '30<URL', '20<Title')],
+                    (
+                        (report, '' if status is None else status, url or '',
+                         title or '')
+                        for report, _, url, status, title in rows
+                    ),
+                ))
+        return 0  # EX_OK
+
+
+class Batch(Base):
+    """Run many operations concurrently."""
+
+    description = (
+        'Run many queue, status, update and delete operations concurrently,'
+        ' reading them from a JSON lines or CSV file and writing the results'
+        ' in JSON lines format'
+    )
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        parser.add_argument(
+            '--completion-order', action='store_true',
+            help='Output the results as the operations complete rather than'
+            ' in input order')
+        parser.add_argument(
+            '--input-format', choices=('jsonl', 'csv'),
+            help='The input format (default: csv if the filename ends in'
+            ' ".csv", otherwise jsonl)')
+        parser.add_argument(
+            '--jobs', '-j', metavar='N', type=int, default=8,
+            help='The number of operations to run at once (default: 8)')
+        parser.add_argument(
+            'file', metavar='FILENAME', type='file',
+            nargs='?', default='-',
+            help='The file to read the operations from (default: stdin)')
+
+    @staticmethod
+    def read_operations(
+        file: IO[str], fmt: str
+    ) -> collections.abc.Iterator[tuple[int, dict[str, Any] | ValueError]]:
+        """Yield the line number and operation (or error) for each input."""
+        import csv  # noqa: PLC0415
+
+        if fmt == 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                operation: dict[str, Any] = {
+                    key: value for key, value in row.items()
+                    if key and value
+                }
+                try:
+                    for key in ('pages', 'lifetime', 'priority'):
+                        if key in operation:
+                            operation[key] = int(operation[key])
+                    if 'metadata' in operation:
+                        operation['metadata'] = json.loads(
+                            operation['metadata'])
+                except ValueError as exc:
+                    yield reader.line_num, exc
+                else:
+                    yield reader.line_num, operation
+            return
+        for line_num, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError as exc:
+                yield line_num, exc
+                continue
+            if not isinstance(operation, dict):
+                yield line_num, ValueError('operation must be an object')
+            else:
+                yield line_num, operation
+
+    @staticmethod
+    def request(operation: dict[str, Any]) -> dict[str, Any]:
+        """Return the arguments to api() for an operation."""
+        op = operation.get('op')
+        if op == 'queue':
+            if not operation.get('url'):
+                raise ValueError('url not specified')
+            return queue_request(
+                operation['url'],
+                operation.get('pages', 1),
+                callback=operation.get('callback'),
+                callback_id=operation.get('callbackId'),
+                config=operation.get('config'),
+                lifetime=operation.get('lifetime'),
+                metadata=operation.get('metadata'),
+                priority=operation.get('priority'),
+            )
+        if not operation.get('report'):
+            raise ValueError('report not specified')
+        report = str(operation['report'])
+        if op in {'status', 'info'}:
+            return status_request(report)
+        if op == 'update':
+            if 'metadata' not in operation:
+                raise ValueError('metadata not specified')
+            return update_request(report, operation['metadata'])
+        if op in {'delete', 'cancel'}:
+            return delete_request(report)
+        raise ValueError(f'unknown operation {op!r}')
+
+    @classmethod
+    def run(
+        cls, profile: Profile, line_num: int, operation: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Run a single operation and return its result."""
+        result: dict[str, Any] = {'line': line_num, **{
+            key: operation[key] for key in ('op', 'report', 'url')
+            if key in operation
+        }}
+        import requests  # noqa: PLC0415
+
+        try:
+            response = api(profile, **cls.request(operation))
+        except (ValueError, requests.RequestException) as exc:
+            result['error'] = str(exc)
+            return result
+        result['status'] = response.status_code
+        if not 200 <= response.status_code < 300:
+            result['error'] = response.reason
+        if response.content:
+            try:
+                result['response'] = response.json()
+            except ValueError:
+                result['response'] = response.text
+        return result
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'batch' command."""
+        fmt = args.input_format or (
+            'csv' if args.file.name.lower().endswith('.csv') else 'jsonl')
+        errors = invalid = 0
+
+        def tasks() -> collections.abc.Iterator[
+                collections.abc.Callable[[], dict[str, Any]]]:
+            nonlocal invalid
+            for line_num, operation in cls.read_operations(args.file, fmt):
+                if isinstance(operation, ValueError):
+                    invalid += 1
+                    yield functools.partial(
+                        dict, line=line_num, error=str(operation))
+                else:
+                    yield functools.partial(
+                        cls.run, profile, line_num, operation)
+
+        def output(result: dict[str, Any]) -> None:
+            nonlocal errors
+            if 'error' in result:
+                errors += 1
+            if not profile.get('quiet'):
+                profile['output'].write(json.dumps(result) + '\n')
+                profile['output'].flush()
+
+        cls.run_tasks(
+            profile, max(args.jobs, 1), tasks(), output,
+            completion_order=args.completion_order)
+        if invalid:
+            return 65  # EX_DATAERR
+        if errors:
+            return 74  # EX_IOERR
+        return 0  # EX_OK
+
+
+class Daemon(Base):
+    """Run commands on behalf of other dexter processes."""
+
+    description = (
+        'Run commands for other dexter processes, keeping the configuration'
+        ' and connections to the API between them')
+    requires_api = False
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        """Define the command-line arguments for this command."""
+        parser.add_argument(
+            '--idle-timeout', metavar='SECONDS', type=float, default=0,
+            help='Exit when no commands have been run for this long'
+            ' (default: never)')
+        parser.add_argument(
+            '--socket', metavar='PATH',
+            help='The socket to listen on (default: $DEXTER_SOCKET, or'
+            ' dexter.sock in $XDG_RUNTIME_DIR, or ~/.dexter.sock)')
+        parser.add_argument(
+            '--stop', action='store_true',
+            help='Stop the daemon, if it is running')
+
+    @classmethod
+    def process(cls, profile: Profile, args: argparse.Namespace) -> int:
+        """Run the 'daemon' command."""
+        from .daemon import Server, socket_path, stop  # noqa: PLC0415
+
+        path = args.socket or socket_path(os.environ)
+        if args.stop:
+            if not stop(path) and not profile.get('quiet'):
+                sys.stderr.write(f'dexter daemon: not running on {path}\n')
+            return 0  # EX_OK
+        server = Server(path, args.idle_timeout)
+        if not profile.get('quiet'):
+            sys.stderr.write(f'dexter daemon: listening on {path}\n')
+        try:
+            server.serve()
+        except FileExistsError as e:
+            sys.stderr.write(f'dexter daemon: error: {e}\n')
             return 74  # EX_IOERR
-        return cls.display_response(profile, requests.get(report, timeout=30))
+        except KeyboardInterrupt:
+            pass
+        return 0  # EX_OK
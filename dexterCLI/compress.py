@@ -0,0 +1,228 @@
+"""
+dexterCLI compression utilities.
+
+Every command opens its output with open_output(), so the compression
+libraries are only imported when they are used.
+"""
+
+import collections.abc
+import io
+from pathlib import Path
+import sys
+from typing import IO, Any, cast
+import zlib
+
+from .stream import CHUNK_SIZE
+
+# Map from filename suffix to HTTP content-coding
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+
+
+class _Compressor(io.RawIOBase):
+    """Binary stream that compresses what is written to it."""
+
+    def __init__(self, file: IO[bytes], encoding: str) -> None:
+        """Initialise the stream, writing compressed data to 'file'."""
+        import brotli  # type: ignore[import-untyped]  # noqa: PLC0415
+
+        super().__init__()
+        self.compressor: Any = (
+            brotli.Compressor() if encoding == 'br'
+            else zlib.compressobj(wbits=16 + zlib.MAX_WBITS))
+        self.file = file
+        self.pending: list[bytes] = []
+        self.pending_size = 0
+        self.used = False
+
+    def writable(self) -> bool:  # noqa: PLR6301
+        """Return True, since the stream is writable."""
+        return True
+
+    def write(self, data: Any) -> int:  # noqa: ANN401
+        """Compress some data, buffering small writes."""
+        self.used = True
+        data = bytes(data)
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.pending_size >= CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        """Pass the buffered data to the compressor."""
+        if self.pending:
+            self.file.write(self.compressor.process(b''.join(self.pending))
+                            if hasattr(self.compressor, 'process')
+                            else self.compressor.compress(
+                                b''.join(self.pending)))
+            self.pending.clear()
+            self.pending_size = 0
+
+    def finish(self) -> None:
+        """Write the end of the compressed stream."""
+        self.flush()
+        self.file.write(
+            self.compressor.finish() if hasattr(self.compressor, 'finish')
+            else self.compressor.flush())
+
+
+class CompressedOutput(io.TextIOBase):
+    """
+    Text output stream that compresses what is written to it.
+
+    The compression is either 'br' (brotli) or 'gzip', named after the HTTP
+    content-codings. Data which is already compressed in the same way may
+    instead be passed to write_raw(), if nothing else is written (see
+    raw_compression).
+    """
+
+    def __init__(
+        self, file: IO[bytes], compression: str, *, close_file: bool = True
+    ) -> None:
+        """Initialise the stream, writing compressed data to 'file'."""
+        super().__init__()
+        self.buffer = _Compressor(file, compression)
+        self.close_file = close_file
+        self.compression = compression
+        self.file = file
+        self.raw = False
+
+    def writable(self) -> bool:  # noqa: PLR6301
+        """Return True, since the stream is writable."""
+        return True
+
+    @property
+    def raw_compression(self) -> str | None:
+        """
+        Return the compression of data which may be passed to write_raw().
+
+        None is returned once text has been written, since compressed data
+        cannot then be written as it is.
+        """
+        return None if self.buffer.used else self.compression
+
+    def write(self, text: str) -> int:
+        """Write some text to the stream."""
+        if self.raw:
+            raise ValueError('Cannot mix raw and uncompressed output')
+        self.buffer.write(text.encode())
+        return len(text)
+
+    def write_raw(self, data: bytes) -> None:
+        """Write some data that is already compressed."""
+        if self.buffer.used:
+            raise ValueError('Cannot mix raw and uncompressed output')
+        self.raw = True
+        self.file.write(data)
+
+    def close(self) -> None:
+        """Finish the compressed stream and close the file."""
+        if self.closed:
+            return
+        if not self.raw:
+            self.buffer.finish()
+        if self.close_file:
+            self.file.close()
+        else:
+            self.file.flush()
+        super().close()
+
+
+class _Decompressor(io.RawIOBase):
+    """Binary stream that decompresses what is read from a file."""
+
+    def __init__(self, file: IO[bytes], encoding: str) -> None:
+        """Initialise the stream, reading compressed data from 'file'."""
+        super().__init__()
+        if encoding == 'br':
+            import brotli  # noqa: PLC0415
+
+            self.decompressor: Any = brotli.Decompressor()
+        else:
+            self.decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+        self.file = file
+        self.pending = memoryview(b'')
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress the next chunk of data."""
+        if self.encoding == 'br':
+            return bytes(self.decompressor.process(data))
+        result: bytes = self.decompressor.decompress(data)
+        # A gzip file may consist of several members
+        while self.decompressor.eof and self.decompressor.unused_data:
+            data = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            result += self.decompressor.decompress(data)
+        return result
+
+    def readable(self) -> bool:  # noqa: PLR6301
+        """Return True, since the stream is readable."""
+        return True
+
+    def readinto(self, buffer: Any) -> int:  # noqa: ANN401
+        """Read decompressed data into a buffer."""
+        while not self.pending:
+            data = self.file.read(CHUNK_SIZE)
+            if not data:
+                return 0
+            self.pending = memoryview(self.decompress(data))
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        """Close the stream and the underlying file."""
+        self.file.close()
+        super().close()
+
+
+def open_output(filename: str, compression: str | None = None) -> IO[str]:
+    """
+    Open an output file for writing text.
+
+    The filename '-' means stdout. If 'compression' is not given, it is
+    determined from the filename suffix ('.br' or '.gz').
+    """
+    if compression is None and filename != '-':
+        compression = ENCODINGS.get(Path(filename).suffix.lower())
+    if filename == '-':
+        if compression:
+            return cast('IO[str]', CompressedOutput(
+                sys.stdout.buffer, compression, close_file=False))
+        return sys.stdout
+    if compression:
+        file = Path(filename).open('wb')  # noqa: SIM115
+        return cast('IO[str]', CompressedOutput(file, compression))
+    return Path(filename).open('w', encoding='utf-8')
+
+
+def decompress(file: IO[bytes], encoding: str | None) -> IO[bytes]:
+    """
+    Wrap a binary file to decompress it, if necessary, as it is read.
+
+    Closing the returned stream closes 'file'.
+    """
+    if encoding in {'br', 'gzip'}:
+        return io.BufferedReader(_Decompressor(file, encoding), CHUNK_SIZE)
+    return file
+
+
+def decompress_chunks(
+    chunks: collections.abc.Iterable[bytes], encoding: str | None
+) -> collections.abc.Iterator[bytes]:
+    """Decompress chunks of data, if necessary, as they are iterated over."""
+    if encoding not in {'br', 'gzip'}:
+        yield from chunks
+        return
+    # Only the decompressor is used, not the stream
+    decompressor = _Decompressor(io.BytesIO(), encoding)
+    for chunk in chunks:
+        if data := decompressor.decompress(chunk):
+            yield data
+
+
+def open_decompressed(path: Path, encoding: str | None) -> IO[bytes]:
+    """Open a file for reading, decompressing it if necessary."""
+    return decompress(path.open('rb'), encoding)
@@ -0,0 +1,401 @@
+"""
+dexterCLI daemon.
+
+'dexter daemon' listens on a Unix socket, and runs commands on behalf of
+other dexter processes, which send it their command-line, environment,
+working directory and standard streams. The daemon keeps the modules, the
+parsed configuration profiles and their pools of HTTP connections between
+commands, so that each command only costs the time to start the
+interpreter and pass its arguments across. If the daemon is not running,
+commands are run in-process as usual.
+
+Only the client side, forward(), is used by every command, so this module
+imports as little as possible (using os.path rather than pathlib).
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sys
+import threading
+from typing import IO, TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import collections.abc
+    import concurrent.futures
+
+# The maximum size of a request from a client
+MAX_REQUEST = 1 << 20
+# The message sent by the client to stop the daemon
+STOP = {'stop': True}
+
+
+def socket_path(environ: 'collections.abc.Mapping[str, str]') -> str:
+    """Return the path of the daemon's socket."""
+    if path := environ.get('DEXTER_SOCKET'):
+        return path
+    if directory := environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(directory, 'dexter.sock')  # noqa: PTH118
+    return os.path.expanduser('~/.dexter.sock')  # noqa: PTH111
+
+
+def connect(path: str) -> socket.socket | None:
+    """Return a connection to the daemon, or None if it is not running."""
+    try:
+        if os.stat(path).st_uid != os.getuid():  # noqa: PTH116
+            return None
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (AttributeError, OSError):
+        return None
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        return None
+    return client
+
+
+def forward(argv: list[str] | None = None) -> int | None:
+    """
+    Run a command using the daemon, if it is running.
+
+    Returns the command's exit status, or None if the daemon is not running
+    (or the command is 'daemon' itself), in which case the command should be
+    run in-process.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if 'daemon' in argv or os.environ.get('DEXTER_DAEMON') == 'no':
+        return None
+    client = connect(socket_path(os.environ))
+    if client is None:
+        return None
+    with client:
+        try:
+            size = os.get_terminal_size(sys.__stdout__.fileno())  # type: ignore[union-attr]
+        except (AttributeError, OSError, ValueError):
+            size = None
+        request = json.dumps({
+            'argv': argv,
+            'cwd': os.getcwd(),  # noqa: PTH109
+            'env': dict(os.environ),
+            'terminal': size,
+        }).encode() + b'\n'
+        try:
+            socket.send_fds(client, [request], [0, 1, 2])
+        except OSError:
+            # Probably a standard stream is closed, so run in-process
+            return None
+        try:
+            reply = b''
+            while chunk := client.recv(64):
+                reply += chunk
+        except KeyboardInterrupt:
+            return 130
+        except OSError:
+            reply = b''
+    if not reply.strip().isdigit():
+        sys.stderr.write('dexter: error: lost connection to the daemon\n')
+        return 74  # EX_IOERR
+    return int(reply)
+
+
+def terminal_size(request: dict[str, Any]) -> os.terminal_size:
+    """Return a client's terminal size, as shutil.get_terminal_size()."""
+    columns, lines = request.get('terminal') or (0, 0)
+    with contextlib.suppress(ValueError):
+        columns = int(request['env'].get('COLUMNS') or columns)
+        lines = int(request['env'].get('LINES') or lines)
+    return os.terminal_size((columns or 80, lines or 24))
+
+
+def stop(path: str) -> bool:
+    """Ask the daemon to stop, returning False if it is not running."""
+    client = connect(path)
+    if client is None:
+        return False
+    with client:
+        client.sendall(json.dumps(STOP).encode() + b'\n')
+        while client.recv(64):
+            pass
+    return True
+
+
+class _Stream:
+    """A standard stream, which may be different in each thread."""
+
+    def __init__(self, default: Any) -> None:  # noqa: ANN401
+        """Initialise the stream, given the stream to use by default."""
+        self.default = default
+        self.local = threading.local()
+
+    def current(self) -> Any:  # noqa: ANN401
+        """Return the current thread's stream."""
+        return getattr(self.local, 'stream', self.default)
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        """Return an attribute of the current thread's stream."""
+        return getattr(self.current(), name)
+
+    def __iter__(self) -> 'collections.abc.Iterator[str]':
+        """Iterate over the lines of the current thread's stream."""
+        return iter(self.current())
+
+
+def thread_pool(max_workers: int) -> 'concurrent.futures.ThreadPoolExecutor':
+    """
+    Return a pool of threads which use the current thread's standard streams.
+
+    In the daemon, only the thread running a command has the client's
+    standard streams (see Server.bind()), so threads it starts to do some
+    of the work are given them too. Elsewhere, this is just a thread pool.
+    """
+    import concurrent.futures  # noqa: PLC0415
+
+    stdin, stdout, stderr = sys.stdin, sys.stdout, sys.stderr
+    if not (
+        isinstance(stdin, _Stream) and isinstance(stdout, _Stream) and
+        isinstance(stderr, _Stream)
+    ):
+        return concurrent.futures.ThreadPoolExecutor(max_workers)
+    streams = stdin.current(), stdout.current(), stderr.current()
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers, initializer=lambda: Server.bind(streams))
+
+
+class Profiles:
+    """
+    Cache of configuration profiles.
+
+    A profile is loaded again if its configuration file has changed. Each
+    command is given a copy of the cached profile, which shares its HTTP
+    session (and so its pool of connections) with every other command
+    using the same profile.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the cache."""
+        self.cache: dict[tuple[str, str], tuple[int, dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+
+    def load(
+        self, name: str = 'default', rcfile: str = '~/.dexter.conf', *,
+        required: bool = True,
+    ) -> dict[str, Any]:
+        """Return a profile, loading it if necessary, as load_profile()."""
+        from .api import load_profile, session  # noqa: PLC0415
+
+        path = os.path.abspath(os.path.expanduser(rcfile))  # noqa: PTH100, PTH111
+        try:
+            mtime = os.stat(path).st_mtime_ns  # noqa: PTH116
+        except OSError:
+            mtime = -1
+        with self.lock:
+            cached = self.cache.get((path, name))
+            if cached is None or cached[0] != mtime:
+                profile = load_profile(name, path, required=required)
+                if profile:
+                    session(profile)
+                cached = self.cache[path, name] = (mtime, profile)
+        return dict(cached[1])
+
+
+class Server:
+    """
+    The daemon, which runs commands sent to a Unix socket.
+
+    Each command is run on its own thread, with the standard streams,
+    environment and working directory of the client process. The daemon's
+    own working directory is never changed, since it is shared by every
+    thread; instead, relative paths are resolved against the client's. If
+    the client goes away (e.g. because it was interrupted), the command's
+    output is discarded and KeyboardInterrupt is raised in its thread.
+    """
+
+    def __init__(self, path: str, idle_timeout: float = 0) -> None:
+        """Initialise the daemon."""
+        self.active = 0
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.path = path
+        self.profiles = Profiles()
+        self.listener: socket.socket | None = None
+
+    def serve(self) -> None:
+        """
+        Run the daemon until it is stopped or has been idle for too long.
+
+        Raises FileExistsError if the daemon is already running.
+        """
+        import signal  # noqa: PLC0415
+
+        # Import everything that commands use in advance
+        import requests  # noqa: F401, PLC0415
+
+        from . import cli, commands  # noqa: F401, PLC0415
+
+        if (client := connect(self.path)) is not None:
+            client.close()
+            raise FileExistsError(f'already running on {self.path}')
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener = listener
+        if os.path.exists(self.path):  # noqa: PTH110
+            os.unlink(self.path)  # noqa: PTH108
+        umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(umask)
+        listener.listen(64)
+        if self.idle_timeout > 0:
+            listener.settimeout(self.idle_timeout)
+        streams = sys.stdin, sys.stdout, sys.stderr
+        sys.stdin, sys.stdout, sys.stderr = map(_Stream, streams)
+        handler = signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        try:
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except TimeoutError:
+                    with self.lock:
+                        if not self.active:
+                            break
+                    continue
+                except OSError:
+                    # The listening socket was closed by stop()
+                    break
+                with self.lock:
+                    self.active += 1
+                threading.Thread(
+                    target=self.handle, args=(connection,), daemon=True,
+                ).start()
+        finally:
+            signal.signal(signal.SIGTERM, handler)
+            sys.stdin, sys.stdout, sys.stderr = streams
+            listener.close()
+            if os.path.exists(self.path):  # noqa: PTH110
+                os.unlink(self.path)  # noqa: PTH108
+
+    def stop(self) -> None:
+        """Stop accepting commands."""
+        if self.listener is not None:
+            self.listener.shutdown(socket.SHUT_RDWR)
+            self.listener.close()
+
+    def handle(self, connection: socket.socket) -> None:
+        """Handle a connection from a client."""
+        try:
+            with connection:
+                data, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST, 3)
+                while not data.endswith(b'\n') and len(data) < MAX_REQUEST:
+                    if not (chunk := connection.recv(MAX_REQUEST)):
+                        break
+                    data += chunk
+                request = json.loads(data)
+                if request == STOP:
+                    self.stop()
+                elif len(fds) == 3:
+                    code = self.run(connection, request, fds)
+                    fds = []
+                    connection.sendall(f'{code}\n'.encode())
+                    connection.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            pass
+        finally:
+            for fd in fds:
+                os.close(fd)
+            with self.lock:
+                self.active -= 1
+
+    def run(
+        self,
+        connection: socket.socket,
+        request: dict[str, Any],
+        fds: list[int],
+    ) -> int:
+        """Run a command, with the client's standard streams."""
+        import traceback  # noqa: PLC0415
+
+        from .cli import prepare, run  # noqa: PLC0415
+
+        # The streams have the daemon's locale encoding, like sys.stdout
+        stdin = open(fds[0])  # noqa: PLW1514, PTH123, SIM115
+        stdout = open(  # noqa: PLW1514, PTH123, SIM115
+            fds[1], 'w', buffering=1 if os.isatty(fds[1]) else -1)
+        stderr = open(  # noqa: PLW1514, PTH123, SIM115
+            fds[2], 'w', buffering=1, errors='backslashreplace')
+        for name, stream in zip(
+            ('<stdin>', '<stdout>', '<stderr>'), (stdin, stdout, stderr),
+            strict=True,
+        ):
+            stream.buffer.raw.name = name  # type: ignore[attr-defined]
+        done = threading.Event()
+        guard = threading.Lock()
+        threading.Thread(
+            target=self.cancel,
+            args=(connection, threading.get_ident(), fds, done, guard),
+            daemon=True,
+        ).start()
+        code = 1
+        try:
+            try:
+                self.bind((stdin, stdout, stderr))
+                # A pager started here could not read keys from the client's
+                # terminal, which is not the daemon's controlling terminal
+                code = run(*prepare(
+                    ['--no-pager', *request['argv']],
+                    environ=request['env'],
+                    load=self.profiles.load,
+                    terminal=terminal_size(request),
+                    cwd=request['cwd'],
+                ))
+            finally:
+                with guard:
+                    done.set()
+        except KeyboardInterrupt:
+            code = 130
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                stderr.write(e.code + '\n')
+            code = e.code if isinstance(e.code, int) else int(bool(e.code))
+        except Exception:  # noqa: BLE001
+            traceback.print_exc(file=stderr)
+        finally:
+            self.bind(None)
+            for stream in (stdout, stderr, stdin):
+                with contextlib.suppress(OSError):
+                    stream.close()
+        return code
+
+    @staticmethod
+    def bind(streams: tuple[IO[str], IO[str], IO[str]] | None) -> None:
+        """Set (or reset) the current thread's standard streams."""
+        for fd, stream in enumerate((sys.stdin, sys.stdout, sys.stderr)):
+            if isinstance(stream, _Stream):
+                if streams is None:
+                    stream.local.__dict__.pop('stream', None)
+                else:
+                    stream.local.stream = streams[fd]
+
+    @staticmethod
+    def cancel(
+        connection: socket.socket,
+        ident: int,
+        fds: list[int],
+        done: 'threading.Event',
+        guard: 'threading.Lock',
+    ) -> None:
+        """Interrupt a command if its client goes away before it is done."""
+        import ctypes  # noqa: PLC0415
+
+        with contextlib.suppress(OSError):
+            connection.recv(1)
+        with guard:
+            if done.is_set():
+                return
+            null = os.open(os.devnull, os.O_RDWR)
+            for fd in fds:
+                os.dup2(null, fd)
+            os.close(null)
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(ident), ctypes.py_object(KeyboardInterrupt))
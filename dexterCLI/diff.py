@@ -0,0 +1,170 @@
+"""dexterCLI comparison of full reports."""
+
+import collections
+import hashlib
+import json
+from typing import Any
+
+from .formats import field
+
+# The kinds of change to a page, or to a field of a page
+CHANGES = ('unchanged', 'changed', 'added', 'removed')
+# The size of the hash of each field of a page
+DIGEST_SIZE = 8
+# Encodes field values canonically, for hashing
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+# The field names of a page, and the concatenated hashes of their values
+Digests = tuple[tuple[str, ...], bytes]
+
+
+class ReportDiff:
+    """
+    Compare the pages of two reports, using hashes of their fields.
+
+    The pages of the old report are indexed first, keeping only a hash of
+    each field of each page, and the pages of the new report are then
+    compared against the index as they are read, so the memory used depends
+    on the number of pages rather than the size of the reports. Pages are
+    matched by the value of their 'key' field (by default, the URL), or by
+    their position if they do not have one. Counts of unchanged, changed,
+    added and removed pages, and of each field of the pages present in
+    both reports, are kept in 'pages' and 'fields'.
+    """
+
+    def __init__(self, key: str = 'url') -> None:
+        """Initialise the comparison, matching pages by a field."""
+        self.fields: dict[str, collections.Counter[str]] = (
+            collections.defaultdict(collections.Counter))
+        self.index: dict[str, Digests] = {}
+        self.key = key
+        self.pages: collections.Counter[str] = collections.Counter()
+        self.shapes: dict[tuple[str, ...], tuple[str, ...]] = {}
+        self.unchanged: collections.Counter[tuple[str, ...]] = (
+            collections.Counter())
+
+    def keys(
+        self,
+        pages: collections.abc.Iterable[tuple[str | int, Any]],
+        seen: collections.abc.Container[str],
+    ) -> collections.abc.Iterator[tuple[str, Any]]:
+        """
+        Yield the key identifying each page, and the page.
+
+        If a key has already been seen, it is numbered (e.g. 'URL #2').
+        """
+        for index, page in pages:
+            value = field(page, self.key) if isinstance(page, dict) else None
+            key = f'#{index}' if value is None else str(value)
+            if key in seen:
+                number = 2
+                while f'{key} #{number}' in seen:
+                    number += 1
+                key = f'{key} #{number}'
+            yield key, page
+
+    def digests(self, page: Any) -> Digests:  # noqa: ANN401
+        """Return the sorted field names of a page and their hashes."""
+        if not isinstance(page, dict):
+            page = {'': page}
+        names = tuple(sorted(page))
+        # Pages usually have the same fields, so share their tuples
+        names = self.shapes.setdefault(names, names)
+        return names, b''.join([
+            hashlib.blake2b(
+                _ENCODER.encode(page[name]).encode(),
+                digest_size=DIGEST_SIZE,
+            ).digest()
+            for name in names
+        ])
+
+    def add(
+        self, pages: collections.abc.Iterable[tuple[str | int, Any]]
+    ) -> None:
+        """Index the pages of the old report."""
+        for key, page in self.keys(pages, self.index):
+            self.index[key] = self.digests(page)
+
+    def compare(
+        self, pages: collections.abc.Iterable[tuple[str | int, Any]]
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Compare the pages of the new report with the old report.
+
+        Yields a record for each page which has changed or been added, as
+        it is read, followed by a record for each page which has been
+        removed. Each record has the kind of 'change', the 'page' key and
+        the names of the 'fields' which have changed (prefixed with '+' if
+        they have been added, or '-' if they have been removed).
+        """
+        seen: set[str] = set()
+        for key, page in self.keys(pages, seen):
+            seen.add(key)
+            new = self.digests(page)
+            old = self.index.pop(key, None)
+            if old is None:
+                self.pages['added'] += 1
+                yield {'change': 'added', 'page': key, 'fields': []}
+            elif old == new:
+                self.pages['unchanged'] += 1
+                self.unchanged[new[0]] += 1
+            else:
+                self.pages['changed'] += 1
+                yield {
+                    'change': 'changed',
+                    'page': key,
+                    'fields': self.changed_fields(old, new),
+                }
+        for key in self.index:
+            self.pages['removed'] += 1
+            yield {'change': 'removed', 'page': key, 'fields': []}
+        self.index.clear()
+
+    def changed_fields(self, old: Digests, new: Digests) -> list[str]:
+        """Count the changes to the fields of a page, and list them."""
+        before = self.split(old)
+        after = self.split(new)
+        changes = []
+        for name in sorted(before.keys() | after.keys()):
+            if name not in after:
+                change = 'removed'
+                changes.append(f'-{name}')
+            elif name not in before:
+                change = 'added'
+                changes.append(f'+{name}')
+            elif before[name] != after[name]:
+                change = 'changed'
+                changes.append(name)
+            else:
+                change = 'unchanged'
+            self.fields[name][change] += 1
+        return changes
+
+    @staticmethod
+    def split(digests: Digests) -> dict[str, bytes]:
+        """Return the hash of each field of a page, by name."""
+        names, hashes = digests
+        return {
+            name: hashes[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]
+            for i, name in enumerate(names)
+        }
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Return the counts of each kind of change.
+
+        Only the fields which have changed in at least one page are
+        included.
+        """
+        for names, count in self.unchanged.items():
+            for name in names:
+                self.fields[name]['unchanged'] += count
+        self.unchanged.clear()
+        return {
+            'pages': {change: self.pages[change] for change in CHANGES},
+            'fields': {
+                name: {change: counts[change] for change in CHANGES}
+                for name, counts in sorted(self.fields.items())
+                if counts['unchanged'] != counts.total()
+            },
+        }
@@ -0,0 +1,153 @@
+"""dexterCLI resumable downloads of full reports."""
+
+import contextlib
+import json
+from pathlib import Path
+import re
+import threading
+from typing import IO, Any
+
+from .api import session, timeout
+from .stream import CHUNK_SIZE, Progress, format_size
+from .trace import count_bytes, span
+
+
+def report_filename(report: str) -> str:
+    """Return the name of the file to download a report to."""
+    name = report.rstrip('/').rsplit('/', 1)[-1]
+    return (re.sub(r'[^\w.-]', '_', name).lstrip('.') or 'report') + '.json'
+
+
+class DownloadProgress(Progress):
+    """
+    Display the progress of many concurrent downloads on stderr.
+
+    The number of reports finished and the total number of bytes and
+    throughput of all the downloads are displayed, and may be updated from
+    any thread.
+    """
+
+    def __init__(
+        self, reports: int | None = None, output: IO[str] | None = None
+    ) -> None:
+        """Initialise the progress display."""
+        super().__init__(output=output)
+        self.lock = threading.Lock()
+        self.finished = 0
+        self.reports = reports
+
+    def __str__(self) -> str:
+        """Return the progress as a human-friendly string."""
+        text = f'{self.finished:,}'
+        if self.reports is not None:
+            text += f' of {self.reports:,}'
+        return (f'{text} report{"" if self.reports == 1 else "s"},'
+                f' {super().__str__()}')
+
+    def update(self, size: int) -> None:
+        """Record that some more bytes have been transferred."""
+        with self.lock:
+            super().update(size)
+
+    def finish(self) -> None:
+        """Record that a report has been downloaded (or skipped)."""
+        with self.lock:
+            self.finished += 1
+            super().update(0)
+
+    def close(self) -> None:
+        """Display the final transfer statistics."""
+        with self.lock:
+            super().close()
+
+
+def download(
+    profile: dict[str, Any],
+    url: str,
+    path: Path,
+    *,
+    immutable: bool = False,
+    progress: DownloadProgress | None = None,
+) -> dict[str, Any]:
+    """
+    Download a full report to a file, resuming a partial download.
+
+    The body is written to a '.part' file, which is renamed when it is
+    complete. If the '.part' file already exists, only the rest of the
+    report is requested with a Range header, conditional on the report
+    being unchanged (using the ETag or Last-Modified date recorded in a
+    '.part.json' file). If the report has changed, or the server does not
+    support ranges, it is downloaded from the start. A file which is
+    already complete is skipped if 'immutable' is true. Returns the result
+    of the download, with its 'result' ('downloaded', 'resumed' or
+    'skipped') and the number of 'bytes' transferred; requests exceptions
+    are raised, leaving the partial download to be resumed.
+    """
+    if immutable and path.exists():
+        return {'file': str(path), 'result': 'skipped', 'bytes': 0}
+    part = path.with_name(path.name + '.part')
+    meta = path.with_name(path.name + '.part.json')
+    # Ranges apply to the transferred representation, so the report is
+    # requested without compression to be able to resume it
+    headers = {'Accept-Encoding': 'identity'}
+    offset = 0
+    with contextlib.suppress(OSError, ValueError):
+        validator = json.loads(meta.read_text()).get('validator')
+        offset = part.stat().st_size
+        if offset and validator:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+    tracer = profile.get('tracer')
+    with span(tracer, 'request', method='GET', url=url) as attributes:
+        response = session(profile).get(
+            url, headers=headers, stream=True, timeout=timeout(profile))
+        attributes['status'] = response.status_code
+        attributes['ttfb'] = response.elapsed.total_seconds()
+    with response:
+        if response.status_code == 206 and re.match(
+            rf'bytes {offset}-', response.headers.get('content-range', '')
+        ):
+            mode = 'ab'
+        elif response.status_code == 200:
+            mode, offset = 'wb', 0
+        elif response.status_code == 416 and offset:
+            # The partial download is not a prefix of the report, so it is
+            # downloaded again from the start
+            part.unlink()
+            meta.unlink()
+            return download(profile, url, path, progress=progress)
+        else:
+            return {
+                'status': response.status_code,
+                'error': response.reason or 'download failed',
+            }
+        if mode == 'wb':
+            validator = (
+                response.headers.get('etag') or
+                response.headers.get('last-modified'))
+            meta.write_text(json.dumps({'url': url, 'validator': validator}))
+        length = response.headers.get('content-length')
+        with (
+            span(tracer, 'download', url=url) as attributes,
+            part.open(mode) as file,
+        ):
+            for chunk in count_bytes(
+                response.iter_content(CHUNK_SIZE), attributes
+            ):
+                file.write(chunk)
+                if progress:
+                    progress.update(len(chunk))
+            size = attributes['bytes']
+    if length is not None and size < int(length):
+        return {
+            'file': str(part),
+            'bytes': size,
+            'error': f'incomplete download ({format_size(offset + size)})',
+        }
+    part.replace(path)
+    meta.unlink()
+    return {
+        'file': str(path),
+        'result': 'resumed' if offset else 'downloaded',
+        'bytes': size,
+    }
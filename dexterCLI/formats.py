@@ -0,0 +1,100 @@
+"""dexterCLI machine-readable output formats."""
+
+import csv
+import json
+from typing import IO, Any
+
+# The formats which records may be written in
+FORMATS = ('csv', 'json', 'ndjson', 'tsv')
+
+
+def parse_fields(fields: str) -> list[str]:
+    """Parse a comma-separated list of field names."""
+    return [name.strip() for name in fields.split(',') if name.strip()]
+
+
+def field(record: dict[str, Any], name: str) -> Any:  # noqa: ANN401
+    """
+    Return a field of a record, or None if it is missing.
+
+    A name containing dots (e.g. 'headers.content-type') selects a field
+    of a nested object, unless the record has a field with that name.
+    """
+    if name in record:
+        return record[name]
+    value: Any = record
+    for part in name.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def cell(value: Any) -> str:  # noqa: ANN401
+    """Return a field value as the text of a CSV or TSV cell."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class RecordWriter:
+    """
+    Write records to the output, one at a time, in a machine-readable format.
+
+    'ndjson' writes each record as a line of JSON, and 'json' writes a JSON
+    array with a record on each line. 'csv' and 'tsv' write a header row
+    followed by a row for each record, with nested values as JSON. If
+    'fields' is given then only those fields are written, in that order;
+    otherwise CSV and TSV have the fields of the first record.
+    """
+
+    def __init__(
+        self,
+        output: IO[str],
+        format: str,  # noqa: A002
+        fields: list[str] | None = None,
+    ) -> None:
+        """Initialise the writer."""
+        if format not in FORMATS:
+            raise ValueError(f'Unknown format {format!r}')
+        self.count = 0
+        self.fields = fields
+        self.format = format
+        self.output = output
+        self.writer = None
+        if format in {'csv', 'tsv'}:
+            self.writer = csv.writer(
+                output,
+                dialect='excel-tab' if format == 'tsv' else 'excel',
+                lineterminator='\n',
+            )
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Write a record."""
+        if self.writer is not None:
+            if self.fields is None:
+                self.fields = list(record)
+            if not self.count:
+                self.writer.writerow(self.fields)
+            self.writer.writerow(
+                [cell(field(record, name)) for name in self.fields])
+        else:
+            if self.fields is not None:
+                record = {name: field(record, name) for name in self.fields}
+            if self.format == 'json':
+                self.output.write(',\n  ' if self.count else '[\n  ')
+                self.output.write(json.dumps(record))
+            else:
+                self.output.write(json.dumps(record) + '\n')
+        self.count += 1
+
+    def close(self) -> None:
+        """Finish writing the records."""
+        if self.format == 'json':
+            self.output.write('\n]\n' if self.count else '[]\n')
+        elif self.writer is not None and not self.count and self.fields:
+            self.writer.writerow(self.fields)
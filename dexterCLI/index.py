@@ -0,0 +1,328 @@
+"""dexterCLI local index of fetched reports."""
+
+import argparse
+import datetime
+import json
+import os
+from pathlib import Path
+import re
+import sqlite3
+from typing import TYPE_CHECKING, Any
+
+from .api import parse_date
+from .formats import field
+from .stream import iter_items
+
+if TYPE_CHECKING:
+    import collections.abc
+
+# The tables of reports and their pages. Pages are stored as JSON, with
+# the fields which are usually queried in columns of their own.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id TEXT PRIMARY KEY,
+    url TEXT,
+    status TEXT,
+    queued REAL,
+    detail TEXT,
+    version TEXT,
+    fetched REAL,
+    pages INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reports_queued ON reports (queued);
+CREATE INDEX IF NOT EXISTS reports_url ON reports (url);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    report TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    url TEXT,
+    status INTEGER,
+    title TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (report, position)
+);
+CREATE INDEX IF NOT EXISTS pages_url ON pages (url);
+CREATE INDEX IF NOT EXISTS pages_status ON pages (status);
+"""
+# The full-text index of pages, which only stores the index itself
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    url, title, data, content='pages', content_rowid='id'
+);
+INSERT INTO pages_fts (pages_fts) VALUES ('rebuild');
+"""
+# The columns of the pages table which are returned by queries
+PAGE_COLUMNS = ('report', 'position', 'url', 'status', 'title')
+# The columns returned by queries for matching reports
+REPORT_COLUMNS = (
+    'id', 'url', 'status', 'queued', 'fetched', 'pages', 'matched')
+
+
+def parse_statuses(statuses: str) -> list[tuple[int, int]]:
+    """
+    Parse a comma-separated list of HTTP statuses, as ranges.
+
+    Each status is a number (e.g. '404') or a class of statuses (e.g.
+    '5xx').
+    """
+    ranges = []
+    for status in statuses.split(','):
+        if match := re.fullmatch(r'([1-5])xx', status.strip().lower()):
+            start = int(match.group(1)) * 100
+            ranges.append((start, start + 99))
+        elif status.strip().isdigit():
+            ranges.append((int(status), int(status)))
+        else:
+            raise argparse.ArgumentTypeError(f'invalid status: {status!r}')
+    return ranges
+
+
+def parse_time(time: str) -> float:
+    """
+    Parse a date, or date and time, as a POSIX timestamp.
+
+    Dates and times without a timezone are in local time.
+    """
+    try:
+        return parse_date(time).timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(time).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid date: {time!r}') from None
+
+
+def search_query(words: str) -> str:
+    """Return a full-text query matching pages containing all the words."""
+    return ' '.join(
+        '"' + word.replace('"', '""') + '"' for word in words.split())
+
+
+class ReportIndex:
+    """
+    Local SQLite database of the pages of fetched reports.
+
+    Each report is added in a single transaction, with its pages streamed
+    into the database as they are parsed, and replaces any earlier version
+    of the report. The version (e.g. its ETag) is recorded, so that a
+    report which has already been added can be skipped. If the database
+    has a full-text index of pages, it is kept up to date as reports are
+    added.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open the database, creating it if necessary."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> 'ReportIndex':  # noqa: PYI034
+        """Return the index, to be closed on exit."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the database."""
+        self.close()
+
+    @staticmethod
+    def default_path(profile: dict[str, Any]) -> Path:
+        """Return the path of the database configured by a profile."""
+        if profile.get('index-file'):
+            return Path(profile['index-file']).expanduser()
+        return Path(
+            profile.get('environ', os.environ).get('XDG_DATA_HOME') or
+            '~/.local/share'
+        ).expanduser() / 'dexter' / 'index.sqlite3'
+
+    @classmethod
+    def from_profile(cls, profile: dict[str, Any]) -> 'ReportIndex':
+        """Return the index configured by a profile."""
+        return cls(cls.default_path(profile))
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    @property
+    def fts(self) -> bool:
+        """Return whether the database has a full-text index of pages."""
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'pages_fts'"
+        ).fetchone() is not None
+
+    def enable_fts(self) -> None:
+        """
+        Add a full-text index of pages, if there is not one already.
+
+        Raises sqlite3.OperationalError if SQLite does not support FTS5.
+        """
+        if not self.fts:
+            with self.connection:
+                self.connection.executescript(FTS_SCHEMA)
+
+    def version(self, report: str) -> str | None:
+        """Return the version of a report in the index, if it is there."""
+        row = self.connection.execute(
+            'SELECT version FROM reports WHERE id = ?', (report,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def add(
+        self,
+        report: str,
+        chunks: 'collections.abc.Iterable[bytes]',
+        *,
+        version: str | None = None,
+        detail: str | None = None,
+        fetched: float | None = None,
+        status: dict[str, Any] | None = None,
+    ) -> int:
+        """
+        Add a report, given its body as chunks of bytes.
+
+        'status' is the report's status, if known; otherwise the URL,
+        status and queued time already in the index are kept. Returns the
+        number of pages added. If the body is not valid JSON, ValueError
+        is raised and the index is unchanged.
+        """
+        status = status or {}
+        queued = status.get('queued')
+        fts = self.fts
+        with self.connection:
+            if fts:
+                self.connection.execute(
+                    "INSERT INTO pages_fts (pages_fts, rowid, url, title,"
+                    " data) SELECT 'delete', id, url, title, data FROM pages"
+                    ' WHERE report = ?', (report,))
+            self.connection.execute(
+                'DELETE FROM pages WHERE report = ?', (report,))
+            self.connection.execute(
+                'INSERT INTO reports (id, url, status, queued, detail,'
+                ' version, fetched) VALUES (?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (id) DO UPDATE SET'
+                ' url = COALESCE(excluded.url, url),'
+                ' status = COALESCE(excluded.status, status),'
+                ' queued = COALESCE(excluded.queued, queued),'
+                ' detail = excluded.detail, version = excluded.version,'
+                ' fetched = excluded.fetched',
+                (
+                    report,
+                    status.get('url'),
+                    status.get('status'),
+                    parse_date(queued).timestamp() if queued else None,
+                    detail,
+                    version,
+                    fetched,
+                ),
+            )
+            pages = self.connection.executemany(
+                'INSERT INTO pages (report, position, url, status, title,'
+                ' data) VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (
+                        report,
+                        position,
+                        *(
+                            value if isinstance(value, (str, int)) else None
+                            for value in (
+                                field(page, 'url'),
+                                field(page, 'status'),
+                                field(page, 'title'),
+                            )
+                        ),
+                        json.dumps(page, separators=(',', ':')),
+                    )
+                    for position, page in iter_items(chunks, 'pages')
+                    if isinstance(page, dict)
+                ),
+            ).rowcount
+            self.connection.execute(
+                'UPDATE reports SET pages = ? WHERE id = ?', (pages, report))
+            if fts:
+                self.connection.execute(
+                    'INSERT INTO pages_fts (rowid, url, title, data)'
+                    ' SELECT id, url, title, data FROM pages'
+                    ' WHERE report = ?', (report,))
+        return pages
+
+    @staticmethod
+    def where(filters: dict[str, Any]) -> tuple[str, list[Any]]:
+        """
+        Return the WHERE clause selecting pages, and its parameters.
+
+        The filters are the page's 'reports', its 'url' (which may contain
+        the wildcards '*' and '?'), a list of ranges of HTTP 'statuses'
+        (any of which match), words to 'search' for (which requires a
+        full-text index), and the times 'since' and 'until' which the
+        report was queued (or, if that is not known, fetched).
+        """
+        conditions = []
+        parameters: list[Any] = []
+        if reports := filters.get('reports'):
+            conditions.append(
+                f'p.report IN ({", ".join("?" * len(reports))})')
+            parameters.extend(reports)
+        if (url := filters.get('url')) is not None:
+            conditions.append(
+                'p.url GLOB ?' if re.search(r'[*?[]', url) else 'p.url = ?')
+            parameters.append(url)
+        if statuses := filters.get('statuses'):
+            conditions.append('(' + ' OR '.join(
+                'p.status BETWEEN ? AND ?' for _ in statuses) + ')')
+            for start, end in statuses:
+                parameters.extend((start, end))
+        if (search := filters.get('search')) is not None:
+            conditions.append(
+                'p.id IN (SELECT rowid FROM pages_fts'
+                ' WHERE pages_fts MATCH ?)')
+            parameters.append(search_query(search))
+        if (since := filters.get('since')) is not None:
+            conditions.append('COALESCE(r.queued, r.fetched) >= ?')
+            parameters.append(since)
+        if (until := filters.get('until')) is not None:
+            conditions.append('COALESCE(r.queued, r.fetched) < ?')
+            parameters.append(until)
+        if not conditions:
+            return '', parameters
+        return f' WHERE {" AND ".join(conditions)}', parameters
+
+    def query(
+        self,
+        filters: dict[str, Any],
+        *,
+        limit: int | None = None,
+        by_report: bool = False,
+        data: bool = False,
+    ) -> sqlite3.Cursor:
+        """
+        Return the pages matching the filters (see where()).
+
+        The rows have PAGE_COLUMNS, or REPORT_COLUMNS if 'by_report' is
+        true, in which case each report with matching pages is returned
+        with the number of them. If 'data' is true, each page also has its
+        full data, as JSON.
+        """
+        # Only the parameters are given by the user, not the SQL
+        where, parameters = self.where(filters)
+        if by_report:
+            sql = (
+                'SELECT r.id, r.url, r.status, r.queued, r.fetched, r.pages,'  # noqa: S608
+                ' COUNT(*) FROM pages p JOIN reports r ON r.id = p.report'
+                f'{where} GROUP BY r.id'
+                ' ORDER BY COALESCE(r.queued, r.fetched) DESC'
+            )
+        else:
+            sql = (
+                'SELECT p.report, p.position, p.url, p.status, p.title'  # noqa: S608
+                f'{", p.data" if data else ""}'
+                f' FROM pages p JOIN reports r ON r.id = p.report{where}'
+                ' ORDER BY p.id'
+            )
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        return self.connection.execute(sql, parameters)
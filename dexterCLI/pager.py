@@ -0,0 +1,147 @@
+"""dexterCLI output pager."""
+
+import contextlib
+import io
+import os
+import subprocess  # noqa: S404
+from typing import IO, TYPE_CHECKING
+
+from .trace import Tracer, span
+
+if TYPE_CHECKING:
+    import collections.abc
+
+
+class Pager(io.TextIOBase):
+    """
+    Output stream that displays long output using a pager.
+
+    Output is buffered until it is known whether or not it fits on the
+    screen. If it does, it is written directly to the output when the stream
+    is closed. Otherwise, the pager is started as soon as the output
+    exceeds one screenful, and everything written from then on is piped
+    through to it as it is produced. Output which is flushed before then is
+    written out straight away, and is not paged (see flush()).
+    """
+
+    def __init__(
+        self,
+        output: IO[str],
+        width: int,
+        lines: int,
+        tracer: Tracer | None = None,
+        *,
+        environ: 'collections.abc.Mapping[str, str]' = os.environ,
+    ) -> None:
+        """
+        Initialise the pager for a screen of the given size.
+
+        The pager is given by $PAGER in 'environ', and is run with that
+        environment.
+        """
+        super().__init__()
+        self.pending: list[str] = []
+        self.column = 0
+        self.lines = 0
+        self.max_lines = lines
+        self.output = output
+        self.environ = environ
+        self.pager: str | None = environ.get('PAGER') or '/bin/more'
+        self.process: subprocess.Popen[str] | None = None
+        self.tracer = tracer
+        self.width = max(width, 1)
+        if not os.access(self.pager, os.X_OK):
+            self.pager = None
+
+    def isatty(self) -> bool:  # noqa: PLR6301
+        """Return True, since the output is destined for a terminal."""
+        return True
+
+    def writable(self) -> bool:  # noqa: PLR6301
+        """Return True, since the stream is writable."""
+        return True
+
+    def write(self, text: str) -> int:
+        """Write some text to the stream."""
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        if self.process:
+            if self.process.stdin:
+                try:
+                    self.process.stdin.write(text)
+                except BrokenPipeError:
+                    # The user has quit the pager, so discard the output
+                    self.process.stdin = None
+        elif self.pager is None:
+            self.output.write(text)
+        else:
+            self.pending.append(text)
+            if self.count(text) > self.max_lines:
+                self.start()
+        return len(text)
+
+    def count(self, text: str) -> int:
+        """Count the screen lines in the output so far, including 'text'."""
+        if text.count('\n') > self.max_lines:
+            return text.count('\n')
+        *lines, last = text.split('\n')
+        for line in lines:
+            self.lines += 1 + (self.column + len(line)) // self.width
+            self.column = 0
+        self.column += len(last)
+        return self.lines + 1 + self.column // self.width
+
+    def start(self) -> None:
+        """Start the pager and write the buffered output to it."""
+        with span(self.tracer, 'pager', command=self.pager):
+            self.process = subprocess.Popen(  # noqa: S603
+                self.pager,  # type: ignore[arg-type]
+                stdin=subprocess.PIPE,
+                stdout=self.output,
+                env=self.environ,
+                text=True,
+            )
+        text = ''.join(self.pending)
+        self.pending.clear()
+        self.write(text)
+
+    def write_pending(self) -> None:
+        """Write the buffered output directly to the output."""
+        output = ''.join(self.pending)
+        self.pending.clear()
+        while output:
+            output = output[self.output.write(output):]
+
+    def flush(self) -> None:
+        """
+        Flush the output written so far.
+
+        If the pager has not been started, the output is wanted before it
+        is known whether it fits on the screen (e.g. a line as each report
+        finishes), so the pager is not used: the buffered output, and
+        everything written from then on, is written directly to the output.
+        """
+        super().flush()
+        if self.process:
+            if self.process.stdin and not self.process.stdin.closed:
+                try:
+                    self.process.stdin.flush()
+                except BrokenPipeError:
+                    self.process.stdin = None
+            return
+        self.pager = None
+        self.write_pending()
+        self.output.flush()
+
+    def close(self) -> None:
+        """Flush the buffered output, or wait for the pager to finish."""
+        if self.closed:
+            return
+        if self.process:
+            if self.process.stdin:
+                with contextlib.suppress(BrokenPipeError):
+                    self.process.stdin.close()
+            self.process.wait()
+        else:
+            self.write_pending()
+        super().close()
@@ -0,0 +1,72 @@
+"""dexterCLI request rate limiting."""
+
+import contextlib
+import datetime
+import email.utils
+import random
+import threading
+import time
+
+# Response statuses which mean that a request should be retried later
+RETRY_STATUSES = frozenset((429, 503))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are added at 'rate' per second, up to 'burst' tokens, and each
+    call to acquire() takes one, waiting until it is available. Tokens are
+    reserved in the order that acquire() is called, so waiting threads are
+    served fairly.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        """Initialise the bucket, which starts off full."""
+        self.capacity = max(burst or rate, 1)
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def acquire(self) -> None:
+        """Take a token from the bucket, waiting if necessary."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+def retry_delay(
+    attempt: int,
+    retry_after: str | None = None,
+    base: float = 0.5,
+    maximum: float = 60,
+) -> float:
+    """
+    Return how many seconds to wait before retrying a request.
+
+    A Retry-After header value (in seconds or as an HTTP date) is honoured
+    if given, otherwise the delay increases exponentially with each attempt
+    (starting from zero), up to 'maximum'. Random jitter is added so that
+    clients which were refused at the same time do not all retry at once.
+    """
+    delay = None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            with contextlib.suppress(TypeError, ValueError):
+                delay = (
+                    email.utils.parsedate_to_datetime(retry_after) -
+                    datetime.datetime.now(tz=datetime.timezone.utc)
+                ).total_seconds()
+    if delay is None:
+        return random.uniform(0, min(maximum, base * 2 ** attempt))  # noqa: S311
+    return min(max(delay, 0), maximum) + random.uniform(0, base)  # noqa: S311
@@ -0,0 +1,72 @@
+"""dexterCLI report records."""
+
+import itertools
+from typing import Any
+
+from .api import parse_date
+
+# The order in which reports are listed, by status
+STATUS_ORDER = {'running': 0, 'callback': 1, 'queued': 2, 'complete': 3}
+
+
+class Report:
+    """
+    Summary of a report, as displayed in a list of reports.
+
+    Only the fields which are displayed are kept, in slots rather than a
+    dict, so that long lists of reports take up little memory. The queued
+    time is parsed once, to a POSIX timestamp, and the key by which reports
+    are sorted is computed when the record is created.
+    """
+
+    __slots__ = (
+        'id',
+        'pages',
+        'priority',
+        'queued',
+        'requested_pages',
+        'sort_key',
+        'status',
+        'url',
+    )
+
+    id: str
+    pages: int
+    priority: int
+    queued: float
+    requested_pages: int
+    sort_key: tuple[int, int, float]
+    status: str
+    url: str
+
+    def __init__(self, report_id: str, data: dict[str, Any]) -> None:
+        """Initialise the record from a report returned by the API."""
+        self.id = report_id
+        self.pages = data['pages']
+        self.priority = data['priority']
+        self.queued = parse_date(data['queued']).timestamp()
+        self.requested_pages = data['requestedPages']
+        self.status = data['status']
+        self.url = data['url']
+        self.sort_key = (
+            STATUS_ORDER.get(self.status, 1), -self.priority, self.queued)
+
+    def __repr__(self) -> str:
+        """Return a representation of the record, for debugging."""
+        return f'<Report {self.id} {self.status}>'
+
+    @classmethod
+    def from_reports(
+        cls, reports: dict[str, dict[str, Any]]
+    ) -> list['Report']:
+        """Return the records for the 'reports' object from the API."""
+        return list(itertools.starmap(cls, reports.items()))
+
+    @property
+    def progress(self) -> str:
+        """Return the number of pages, or progress, as a string."""
+        if self.status == 'queued':
+            return f'{self.requested_pages:,}'
+        if self.status == 'running':
+            return f'{self.pages:,}/{self.requested_pages:,}'
+        return f'{self.pages:,}'
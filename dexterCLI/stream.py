@@ -0,0 +1,542 @@
+"""dexterCLI streaming JSON utilities."""
+
+import codecs
+import collections
+import json
+import re
+import sys
+import time
+from typing import IO, Any
+
+CHUNK_SIZE = 256 * 1024
+
+Event = tuple[str, Any]
+
+_DECODER = json.JSONDecoder()
+_TOKEN = re.compile(
+    r'[ \t\n\r]*(?:'
+    r'([][{}:,])|'
+    r'("[^"\\\x00-\x1f]*")|'
+    r'("(?:[^"\\\x00-\x1f]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*")|'
+    r'(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)|'
+    r'(true|false|null)|'
+    r'(.))'
+)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_encode_string = json.encoder.encode_basestring_ascii
+_PUNCTUATION, _STRING, _ESCAPED_STRING, _NUMBER, _LITERAL, _INVALID = (
+    range(1, 7))
+_STRINGS = frozenset((_STRING, _ESCAPED_STRING))
+_LITERALS = {
+    'true': ('boolean', True),
+    'false': ('boolean', False),
+    'null': ('null', None),
+}
+
+# Parser states
+_VALUE = 0  # expecting a value
+_ARRAY_START = 1  # expecting a value or ']'
+_OBJECT_START = 2  # expecting a key or '}'
+_KEY = 3  # expecting a key
+_COLON = 4  # expecting ':'
+_AFTER = 5  # expecting ',' or the end of the current container
+_DONE = 6  # expecting the end of the input
+_KEY_STATES = frozenset((_KEY, _OBJECT_START))
+_VALUE_STATES = frozenset((_VALUE, _ARRAY_START))
+
+
+def _tokens(
+    chunks: collections.abc.Iterable[bytes | str]
+) -> collections.abc.Iterator[re.Match[str]]:
+    """Yield a regular expression match for each JSON token in the input."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    source = iter(chunks)
+    buf = ''
+    pos = 0
+    eof = False
+    while True:
+        for match in _TOKEN.finditer(buf, pos):
+            if match.lastindex == _INVALID or (
+                match.lastindex == _NUMBER and match.end() >= len(buf) - 2
+            ):
+                if eof and match.lastindex == _INVALID:
+                    raise json.JSONDecodeError(
+                        'Invalid JSON', buf, match.start(_INVALID))
+                if not eof:
+                    # The token may be incomplete, so read more input.
+                    pos = match.start()
+                    break
+            yield match
+        else:
+            if eof:
+                return
+            pos = len(buf)
+        text = ''
+        for chunk in source:
+            text = chunk if isinstance(chunk, str) else decoder.decode(chunk)
+            if text:
+                break
+        else:
+            text = decoder.decode(b'', final=True)
+            eof = True
+        buf = buf[pos:] + text
+        pos = 0
+
+
+def iter_events(
+    chunks: collections.abc.Iterable[bytes | str]
+) -> collections.abc.Iterator[Event]:
+    """
+    Parse a JSON document incrementally, yielding parser events.
+
+    The input is an iterable of chunks of UTF-8 bytes (or strings), and
+    only as much of it as is necessary to parse the next token is held in
+    memory at any one time. The events are tuples of the event name and
+    value, where the names are 'start_map', 'map_key', 'end_map',
+    'start_array', 'end_array', 'string', 'number', 'boolean' and 'null'.
+    """
+    stack: list[bool] = []  # True for an object, False for an array
+    state = _VALUE
+    for match in _tokens(chunks):
+        kind: int = match.lastindex  # type: ignore[assignment]
+        lexeme = match[kind]
+        if kind == _PUNCTUATION:
+            if lexeme in '{[' and state in _VALUE_STATES:
+                stack.append(lexeme == '{')
+                if lexeme == '{':
+                    yield 'start_map', None
+                    state = _OBJECT_START
+                else:
+                    yield 'start_array', None
+                    state = _ARRAY_START
+            elif lexeme == ',' and state == _AFTER:
+                state = _KEY if stack[-1] else _VALUE
+            elif lexeme == ':' and state == _COLON:
+                state = _VALUE
+            elif lexeme in '}]' and (
+                state == (_OBJECT_START if lexeme == '}' else _ARRAY_START)
+                or (state == _AFTER and stack[-1] == (lexeme == '}'))
+            ):
+                stack.pop()
+                yield ('end_map' if lexeme == '}' else 'end_array'), None
+                state = _AFTER if stack else _DONE
+            else:
+                raise json.JSONDecodeError(
+                    f'Unexpected {lexeme!r}', match.string, match.start(kind))
+        elif state in _VALUE_STATES:
+            if kind == _NUMBER:
+                yield 'number', (
+                    float(lexeme) if '.' in lexeme or 'e' in lexeme or
+                    'E' in lexeme else int(lexeme))
+            elif kind == _LITERAL:
+                yield _LITERALS[lexeme]
+            else:
+                yield 'string', (
+                    lexeme[1:-1] if kind == _STRING
+                    else _DECODER.decode(lexeme))
+            state = _AFTER if stack else _DONE
+        elif state in _KEY_STATES and kind in _STRINGS:
+            yield 'map_key', (
+                lexeme[1:-1] if kind == _STRING else _DECODER.decode(lexeme))
+            state = _COLON
+        else:
+            raise json.JSONDecodeError(
+                f'Unexpected {lexeme!r}', match.string, match.start(kind))
+    if state != _DONE:
+        raise json.JSONDecodeError('Unexpected end of input', '', 0)
+
+
+def dump_events(
+    events: collections.abc.Iterable[Event],
+    output: IO[str],
+    indent: int = 2,
+) -> None:
+    """
+    Write parser events to a file in JSON format.
+
+    For any parsed document the output is the same as that of json.dump()
+    with the same indent, but without the whole document ever being in
+    memory.
+    """
+    parts: list[str] = []
+    stack: list[bool] = []  # for each container, whether it is empty
+    after_key = False
+    for event, value in events:
+        if event in {'end_map', 'end_array'}:
+            if not stack.pop():
+                parts.append('\n' + ' ' * (indent * len(stack)))
+            parts.append('}' if event == 'end_map' else ']')
+            continue
+        if stack and not after_key:
+            parts.append(
+                ('\n' if stack[-1] else ',\n') + ' ' * (indent * len(stack)))
+            stack[-1] = False
+        after_key = event == 'map_key'
+        if after_key:
+            parts.append(_encode_string(value) + ': ')
+        elif event == 'start_map':
+            parts.append('{')
+            stack.append(True)
+        elif event == 'start_array':
+            parts.append('[')
+            stack.append(True)
+        elif event == 'string':
+            parts.append(_encode_string(value))
+        elif event == 'number' and isinstance(value, int):
+            parts.append(repr(value))
+        elif event == 'value' and isinstance(value, (dict, list)):
+            parts.append(json.dumps(value, indent=indent).replace(
+                '\n', '\n' + ' ' * (indent * len(stack))))
+        else:
+            parts.append(json.dumps(value))
+        if len(parts) > 4096:
+            output.write(''.join(parts))
+            parts.clear()
+    output.write(''.join(parts))
+
+
+def _verbose_value(
+    value: Any,  # noqa: ANN401
+    parts: list[str],
+    indents: list[str],
+    depth: int,
+    output: IO[str],
+) -> bool:
+    """
+    Add a decoded value to the parts of the output in 'verbose' format.
+
+    'depth' is the number of containers which the value is inside, and
+    'indents' is the indent of the items of a container at each depth,
+    which is extended as necessary. The value is rendered using a stack
+    of iterators rather than recursively, and the parts are written to the
+    output whenever there are enough of them. Returns whether they were.
+    """
+    append = parts.append
+    written = False
+    stack: list[tuple[collections.abc.Iterator[Any], bool]] = [
+        (iter((value,)), False)]
+    first = True
+    while stack:
+        items, is_map = stack[-1]
+        level = depth + len(stack) - 1
+        prefix = indents[level - 1] if len(stack) > 1 else None
+        for item in items:
+            if prefix is not None:
+                if prefix or not first:
+                    append('\n')
+                first = False
+                append(prefix)
+            if is_map:
+                key, item = item
+                append(f'{key}: ')
+            if isinstance(item, str):
+                append(item if item.isprintable() else repr(item))
+            elif isinstance(item, (dict, list)):
+                if len(indents) <= level:
+                    indents.append(indents[-1] + '    ')
+                stack.append(
+                    (iter(item.items()), True) if isinstance(item, dict)
+                    else (iter(item), False))
+                first = True
+                break
+            elif item is None:
+                append('null')
+            elif isinstance(item, bool):
+                append('true' if item else 'false')
+            elif isinstance(item, (int, float)):
+                append(f'{item:,}')
+            else:
+                raise ValueError(f'Cannot handle value of type {type(item)}')
+            if len(parts) > 4096:
+                output.write(''.join(parts))
+                parts.clear()
+                written = True
+        else:
+            stack.pop()
+            first = False
+    return written
+
+
+def dump_verbose(
+    events: collections.abc.Iterable[Event],
+    output: IO[str],
+    indent: str = '',
+) -> bool:
+    """
+    Write parser events to a file in our 'verbose' format.
+
+    Each item of an object ('key: value') or array is written on a line of
+    its own, indented by four spaces more than its container (and by
+    'indent' at the top level, in which case a container starts on a new
+    line). As well as the events of iter_events(), there may be 'value'
+    events for values which have already been decoded, as produced by
+    iter_value_events(). Nothing is rendered recursively, and the output is
+    written in large blocks. Returns whether anything was written. Raises
+    ValueError if a decoded value is not of a JSON type.
+    """
+    parts: list[str] = []
+    indents = [indent]
+    depth = 0
+    first = after_key = False
+    written = False
+    for event, value in events:
+        if event in {'end_map', 'end_array'}:
+            depth -= 1
+            first = False
+            continue
+        if depth and not after_key:
+            if indents[depth - 1] or not first:
+                parts.append('\n')
+            first = False
+            parts.append(indents[depth - 1])
+        after_key = event == 'map_key'
+        if after_key:
+            parts.append(f'{value}: ')
+        elif event in {'start_map', 'start_array'}:
+            depth += 1
+            if len(indents) < depth:
+                indents.append(indents[-1] + '    ')
+            first = True
+            continue
+        elif _verbose_value(value, parts, indents, depth, output):
+            written = True
+        if len(parts) > 4096:
+            output.write(''.join(parts))
+            parts.clear()
+            written = True
+    text = ''.join(parts)
+    output.write(text)
+    return written or bool(text)
+
+
+class _Reader:
+    """Incremental reader of JSON values, for iter_items() and others."""
+
+    def __init__(self, chunks: collections.abc.Iterable[bytes | str]) -> None:
+        """Initialise the reader."""
+        self.buf = ''
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.eof = False
+        self.pos = 0
+        self.source = iter(chunks)
+
+    def more(self, size: int = 1) -> bool:
+        """Read at least 'size' more characters, unless at the end."""
+        parts = [self.buf[self.pos:]]
+        wanted = len(parts[0]) + size
+        length = len(parts[0])
+        while length < wanted and not self.eof:
+            for chunk in self.source:
+                text = (
+                    chunk if isinstance(chunk, str)
+                    else self.decoder.decode(chunk))
+                if text:
+                    break
+            else:
+                text = self.decoder.decode(b'', final=True)
+                self.eof = True
+            parts.append(text)
+            length += len(text)
+        self.buf = ''.join(parts)
+        self.pos = 0
+        return length > len(parts[0])
+
+    def peek(self) -> str:
+        """Skip whitespace, and return the next character ('' at the end)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()  # type: ignore[union-attr]
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        """Read one of the given punctuation characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(
+                f'Expected one of {characters!r}', self.buf, self.pos)
+        self.pos += 1
+        return character
+
+    def value(self) -> Any:  # noqa: ANN401
+        """Read and decode a complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # The value may be incomplete, so read at least as much
+                # again, so that large values are not parsed many times.
+                if not self.more(max(len(self.buf) - self.pos, 1)):
+                    raise
+                continue
+            if (
+                end >= len(self.buf) - 2 and not self.eof and
+                isinstance(value, (int, float)) and
+                not isinstance(value, bool)
+            ):
+                # The number may continue in the next chunk (e.g. '1.' or
+                # '1e+' is followed by more digits)
+                self.more()
+                continue
+            self.pos = end
+            return value
+
+    def key(self) -> str:
+        """Read the key of an item of an object, and the following ':'."""
+        key = self.value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError('Expected a key', self.buf, self.pos)
+        self.expect(':')
+        return key
+
+    def items(
+        self, close: str
+    ) -> collections.abc.Iterator[tuple[str | int, Any]]:
+        """Yield the items of an object or array, up to its end."""
+        if self.peek() == close:
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            key: str | int = self.key() if close == '}' else index
+            yield key, self.value()
+            index += 1
+            if self.expect(',' + close) == close:
+                return
+
+
+def iter_items(
+    chunks: collections.abc.Iterable[bytes | str], key: str
+) -> collections.abc.Iterator[tuple[str | int, Any]]:
+    """
+    Parse a JSON object incrementally, yielding the items of one member.
+
+    The member 'key' should be an object, whose keys and values are yielded,
+    or an array, whose indices and values are yielded. Each item is decoded
+    with the json module as soon as it has been read, so only one item (and
+    a chunk of the input) is in memory at any one time. The other members
+    are decoded and discarded.
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+    else:
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name == key and reader.peek() in {'{', '['}:
+                yield from reader.items(
+                    '}' if reader.expect('{[') == '{' else ']')
+            else:
+                reader.value()
+            if reader.expect(',}') == '}':
+                break
+    if reader.peek():
+        raise json.JSONDecodeError('Extra data', reader.buf, reader.pos)
+
+
+def iter_value_events(
+    chunks: collections.abc.Iterable[bytes | str], depth: int = 2
+) -> collections.abc.Iterator[Event]:
+    """
+    Parse a JSON document incrementally, yielding events down to a depth.
+
+    The events are those of iter_events() for the containers which are
+    nested at most 'depth' deep, but every other value is decoded whole
+    with the json module and yielded as a 'value' event. This is much
+    faster than iter_events(), and only one such value (e.g. a page of a
+    full report) is in memory at any one time.
+    """
+    reader = _Reader(chunks)
+    # The punctuation which may follow an item of each open container
+    separators: list[str] = []
+    while True:
+        character = reader.peek()
+        if character in {'{', '['} and len(separators) < depth:
+            reader.pos += 1
+            separators.append(',}' if character == '{' else ',]')
+            yield ('start_map' if character == '{' else 'start_array'), None
+            if reader.peek() != separators[-1][1]:
+                if character == '{':
+                    yield 'map_key', reader.key()
+                continue
+            reader.pos += 1
+            closed = separators.pop()
+            yield ('end_map' if closed == ',}' else 'end_array'), None
+        else:
+            yield 'value', reader.value()
+        while separators:
+            if reader.expect(separators[-1]) == ',':
+                if separators[-1] == ',}':
+                    yield 'map_key', reader.key()
+                break
+            closed = separators.pop()
+            yield ('end_map' if closed == ',}' else 'end_array'), None
+        if not separators:
+            break
+    if reader.peek():
+        raise json.JSONDecodeError('Extra data', reader.buf, reader.pos)
+
+
+def format_size(size: float) -> str:
+    """Return a number of bytes as a human-friendly string."""
+    unit = 'B'
+    for unit in ('B', 'kB', 'MB', 'GB', 'TB'):
+        if size < 1000 or unit == 'TB':
+            break
+        size /= 1000
+    return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+
+
+class Progress:
+    """Display the progress of a transfer on stderr."""
+
+    def __init__(
+        self,
+        total: int | None = None,
+        output: IO[str] | None = None,
+        interval: float = 0.25
+    ) -> None:
+        """Initialise the progress display."""
+        self.done = 0
+        self.interval = interval
+        self.output = sys.stderr if output is None else output
+        self.start = self.last = time.monotonic()
+        self.total = total
+
+    def __str__(self) -> str:
+        """Return the progress as a human-friendly string."""
+        elapsed = time.monotonic() - self.start
+        text = format_size(self.done)
+        if self.total:
+            text += (f' of {format_size(self.total)}'
+                     f' ({100 * self.done // self.total}%)')
+        if elapsed > 0:
+            text += f' {format_size(self.done / elapsed)}/s'
+        return text
+
+    def wrap(
+        self, chunks: collections.abc.Iterable[bytes]
+    ) -> collections.abc.Iterator[bytes]:
+        """Yield the chunks, recording the progress as they pass through."""
+        for chunk in chunks:
+            self.update(len(chunk))
+            yield chunk
+        self.close()
+
+    def update(self, size: int) -> None:
+        """Record that some more bytes have been transferred."""
+        self.done += size
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.output.write(f'\r{self}\x1b[K')
+            self.output.flush()
+
+    def close(self) -> None:
+        """Display the final transfer statistics."""
+        self.output.write(f'\r{self}\x1b[K\n')
+        self.output.flush()
@@ -0,0 +1,113 @@
+"""dexterCLI timing instrumentation."""
+
+import collections
+import contextlib
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import IO, Any
+
+
+class Tracer:
+    """
+    Record the time taken by each phase of a command.
+
+    Each phase is recorded as a span, with its name, start time, duration
+    and any other attributes (such as the number of bytes transferred). If
+    a trace file is given, spans are appended to it in JSON lines format as
+    they finish. If 'summary' is true, the total time taken by each kind of
+    span is written to stderr when the tracer is closed.
+    """
+
+    def __init__(
+        self, filename: str | None = None, *, summary: bool = False
+    ) -> None:
+        """Initialise the tracer."""
+        self.file: IO[str] | None = None
+        if filename:
+            self.file = Path(filename).open('a', encoding='utf-8')  # noqa: SIM115
+        self.lock = threading.Lock()
+        self.summary = summary
+        self.totals: dict[str, list[float]] = collections.defaultdict(
+            lambda: [0, 0.0, 0])
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, **attributes: Any  # noqa: ANN401
+    ) -> collections.abc.Iterator[dict[str, Any]]:
+        """
+        Record the time taken by the body of a 'with' statement.
+
+        The attributes dict is returned, and may be updated in the body.
+        """
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.record(
+                name, start, time.perf_counter() - started, attributes)
+
+    def record(
+        self,
+        name: str,
+        start: float,
+        duration: float,
+        attributes: dict[str, Any],
+    ) -> None:
+        """Record a span."""
+        with self.lock:
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] += attributes.get('bytes') or 0
+            if self.file:
+                self.file.write(json.dumps({
+                    'name': name,
+                    'start': start,
+                    'duration': duration,
+                    'pid': os.getpid(),
+                    **attributes,
+                }, default=str) + '\n')
+
+    def close(self) -> None:
+        """Write the summary, if required, and close the trace file."""
+        if self.file:
+            self.file.close()
+            self.file = None
+        if self.summary and self.totals:
+            header = (f'{"Phase":<12}{"Count":>7}{"Total":>11}{"Mean":>11}'
+                      f'{"Bytes":>13}\n')
+            lines = [header]
+            for name, (count, total, size) in self.totals.items():
+                lines.append(
+                    f'{name:<12}{count:>7,.0f}{1000 * total:>9.1f}ms'
+                    f'{1000 * total / count:>9.1f}ms{size:>13,.0f}\n')
+            sys.stderr.write(''.join(lines))
+
+
+def span(
+    tracer: Tracer | None, name: str, **attributes: Any  # noqa: ANN401
+) -> contextlib.AbstractContextManager[dict[str, Any]]:
+    """
+    Return a context manager recording a span, if tracing is enabled.
+
+    Otherwise, the context manager does nothing, apart from returning the
+    attributes dict (so that the body may update it regardless).
+    """
+    if tracer is None:
+        return contextlib.nullcontext(attributes)
+    return tracer.span(name, **attributes)
+
+
+def count_bytes(
+    chunks: collections.abc.Iterable[bytes], attributes: dict[str, Any]
+) -> collections.abc.Iterator[bytes]:
+    """Yield the chunks, adding their total size to attributes['bytes']."""
+    attributes.setdefault('bytes', 0)
+    for chunk in chunks:
+        attributes['bytes'] += len(chunk)
+        yield chunk
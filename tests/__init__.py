@@ -0,0 +1 @@
+"""dexterCLI tests."""
@@ -0,0 +1,180 @@
+"""
+Fixtures for the dexterCLI tests.
+
+The tests run against the stand-in Dexter API server from the benchmarks
+(see benchmarks.server), and run the command-line interface in a
+subprocess with its configuration, cache and index in a temporary
+directory.
+"""
+
+import collections.abc
+import http.server
+import os
+from pathlib import Path
+import pty
+import subprocess  # noqa: S404
+import sys
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from benchmarks.server import DexterServer
+
+# The directory containing the dexterCLI package
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TextHandler(http.server.BaseHTTPRequestHandler):
+    """Request handler which sends the same response to every request."""
+
+    protocol_version = 'HTTP/1.1'
+    server: 'TextServer'
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Do not log requests."""
+
+    def respond(self) -> None:
+        """Send the server's response, discarding any request body."""
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(self.server.body)))
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    do_DELETE = do_GET = do_POST = do_PUT = respond  # noqa: N815
+
+
+class TextServer(http.server.ThreadingHTTPServer):
+    """
+    Server which answers every request with a page of HTML.
+
+    This stands in for a proxy or load balancer which sends an error page
+    (or some other body which is not JSON) in front of the API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, status: int, body: bytes) -> None:
+        """Initialise the server, listening on a free port."""
+        super().__init__(('127.0.0.1', 0), TextHandler)
+        self.body = body
+        self.root = f'http://127.0.0.1:{self.server_address[1]}/'
+        self.status = status
+
+
+class Dexter:
+    """Runs the command-line interface in a temporary home directory."""
+
+    def __init__(self, home: Path, root: str) -> None:
+        """Initialise the environment, using the API at 'root'."""
+        self.home = home
+        self.configure(root)
+        self.env = {
+            **{
+                name: value for name, value in os.environ.items()
+                if not name.startswith(('DEXTER_', 'XDG_'))
+            },
+            'DEXTER_DAEMON': 'no',
+            'HOME': str(home),
+            'PYTHONPATH': str(ROOT),
+            'XDG_CACHE_HOME': str(home / 'cache'),
+            'XDG_DATA_HOME': str(home / 'data'),
+        }
+
+    def configure(self, root: str) -> None:
+        """Write the configuration file, using the API at 'root'."""
+        (self.home / '.dexter.conf').write_text(
+            f'[default]\nroot = {root}\napi-key = test\n', encoding='utf-8')
+
+    @staticmethod
+    def command(*args: str) -> list[str]:
+        """Return the command-line to run a dexter command."""
+        return [sys.executable, '-m', 'dexterCLI', '--no-pager', *args]
+
+    def __call__(
+        self,
+        *args: str,
+        cwd: Path | None = None,
+        env: dict[str, str] | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        """Run a dexter command, returning its exit status and output."""
+        return subprocess.run(  # noqa: S603
+            self.command(*args),
+            capture_output=True,
+            check=False,
+            cwd=cwd or self.home,
+            encoding='utf-8',
+            env={**self.env, **(env or {})},
+            stdin=subprocess.DEVNULL,
+            timeout=60,
+        )
+
+    def terminal(
+        self, *args: str, env: dict[str, str] | None = None
+    ) -> list[tuple[float, str]]:
+        """
+        Run a dexter command with its output on a terminal.
+
+        The pager is not disabled. Returns each line of the output, and the
+        time in seconds after starting the command at which it was read.
+        """
+        controller, terminal = pty.openpty()
+        start = time.monotonic()
+        with subprocess.Popen(  # noqa: S603
+            [sys.executable, '-m', 'dexterCLI', *args],
+            cwd=self.home,
+            env={**self.env, **(env or {})},
+            stdin=subprocess.DEVNULL,
+            stdout=terminal,
+            stderr=subprocess.DEVNULL,
+        ) as process:
+            os.close(terminal)
+            lines: list[tuple[float, str]] = []
+            pending = b''
+            try:
+                while True:
+                    try:
+                        data = os.read(controller, 4096)
+                    except OSError:
+                        # The terminal is closed once the command exits
+                        break
+                    if not data:
+                        break
+                    *complete, pending = (pending + data).split(b'\n')
+                    lines.extend(
+                        (time.monotonic() - start, line.decode().rstrip('\r'))
+                        for line in complete)
+            finally:
+                os.close(controller)
+            process.wait(60)
+        return lines
+
+
+@pytest.fixture
+def server() -> collections.abc.Iterator[DexterServer]:
+    """Return a stand-in API server, with ten reports of about 64 kB."""
+    with DexterServer(reports=10, size=64 << 10, delay=0.5) as server:
+        yield server
+
+
+@pytest.fixture
+def text_server() -> collections.abc.Iterator[TextServer]:
+    """Return a server which answers '502 Bad Gateway' with HTML."""
+    server = TextServer(502, b'<html><body>Bad Gateway</body></html>')
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def dexter(tmp_path: Path, server: DexterServer) -> Dexter:
+    """Return a runner for dexter commands using the stand-in server."""
+    home = tmp_path / 'home'
+    home.mkdir()
+    return Dexter(home, server.root)
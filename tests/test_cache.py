@@ -0,0 +1,94 @@
+"""Tests for dexterCLI's report cache."""
+
+import json
+import os
+from pathlib import Path
+import time
+from typing import Any
+
+import requests
+
+from benchmarks.server import DexterServer
+from dexterCLI.cache import STALE_TEMPORARY, ReportCache
+from dexterCLI.compress import decompress_chunks
+
+from .conftest import Dexter
+
+
+def profile(server: DexterServer) -> dict[str, Any]:
+    """Return a profile for the stand-in server."""
+    return {'root': server.root, 'api-key': 'test'}
+
+
+def test_request(tmp_path: Path, server: DexterServer) -> None:
+    """A report is stored once it has been read, and then revalidated."""
+    cache = ReportCache(tmp_path, 10000000)
+    url = f'{server.root}detail/r2'
+    response, body = cache.request(profile(server), 'r2', url)
+    assert response is not None
+    assert body is not None
+    assert not isinstance(body, Path)
+    chunks = [next(body)]
+    # The report is written out before it has all been downloaded
+    assert [path.suffix for path in tmp_path.iterdir()] == ['.tmp']
+    chunks.extend(body)
+    [path] = tmp_path.iterdir()
+    assert path == cache.path(cache.key('r2', url))
+    report = b''.join(decompress_chunks(chunks, cache.encoded(response)))
+    assert json.loads(report)['id'] == 'r2'
+    response, body = cache.request(profile(server), 'r2', url)
+    assert response is not None
+    assert response.status_code == 304
+    assert body == path
+    with cache.open(path)[0] as file:
+        assert file.read() == report
+
+
+def test_request_closed(tmp_path: Path, server: DexterServer) -> None:
+    """A report which is not read to the end is not stored."""
+    cache = ReportCache(tmp_path, 10000000)
+    _, body = cache.request(
+        profile(server), 'r2', f'{server.root}detail/r2')
+    assert body is not None
+    assert not isinstance(body, Path)
+    next(body)
+    body.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_max_size(dexter: Dexter, server: DexterServer) -> None:
+    """A report larger than the cache is displayed, but not stored."""
+    with (dexter.home / '.dexter.conf').open('a', encoding='utf-8') as file:
+        file.write('cache-size = 0.01\n')
+    expected = requests.get(f'{server.root}detail/r2', timeout=10).content
+    for _ in range(2):
+        result = dexter('fetch', 'r2', '--stream')
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.encode() == expected
+    result = dexter('--json', 'cache', 'stats')
+    stats = json.loads(result.stdout)
+    assert stats['entries'] == 0
+    assert stats['size'] <= stats['max-size'] == 10000
+
+
+def test_clear(dexter: Dexter) -> None:
+    """The cache is cleared, along with files left by killed processes."""
+    for _ in range(2):
+        assert dexter('fetch', 'r2', '--stream').returncode == 0
+    assert dexter('fetch', 'r6', '--stream').returncode == 0
+    directory = dexter.home / 'cache' / 'dexter'
+    stale = directory / '.stale.tmp'
+    stale.write_bytes(b'{}\n')
+    old = time.time() - STALE_TEMPORARY - 60
+    os.utime(stale, (old, old))
+    writing = directory / '.writing.tmp'
+    writing.write_bytes(b'{}\n')
+    stats = json.loads(dexter('--json', 'cache', 'stats').stdout)
+    assert stats['entries'] == 2
+    assert stats['size'] == sum(
+        path.stat().st_size for path in directory.glob('*.entry')) + 3
+    result = dexter('cache', 'clear')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == 'Removed 2 cached reports\n'
+    # Only the file which may still be being written is left
+    assert list(directory.iterdir()) == [writing]
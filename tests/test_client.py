@@ -0,0 +1,120 @@
+"""Tests for dexterCLI's asynchronous client."""
+
+import asyncio
+import json
+from typing import Any
+
+import pytest
+
+from benchmarks.server import DexterServer
+from dexterCLI.client import DexterClient, DexterError
+
+from .conftest import TextServer
+
+
+def client(root: str, **options: Any) -> DexterClient:  # noqa: ANN401
+    """Return a client for the API at 'root'."""
+    return DexterClient({'root': root, 'api-key': 'test', **options})
+
+
+def test_requests(server: DexterServer) -> None:
+    """The client makes each kind of request."""
+
+    async def run() -> None:
+        async with client(server.root, concurrency=4) as dexter:
+            reports = await dexter.list_reports(['all'])
+            assert {report.id for report in reports} == {
+                f'r{number}' for number in range(10)}
+            statuses = await asyncio.gather(
+                *(dexter.status(f'r{number}') for number in range(10)))
+            assert [status['id'] for status in statuses] == [
+                f'r{number}' for number in range(10)]
+            queued = await dexter.queue('https://example.com/', 5)
+            assert queued['status'] == 'queued'
+            assert queued['pages'] == 5
+            updated = await dexter.update('r1', {'a': 1})
+            assert updated['metadata'] == {'a': 1}
+            await dexter.delete('r1')
+            with pytest.raises(DexterError) as error:
+                await dexter.status('r99')
+            assert error.value.status == 404
+
+    asyncio.run(run())
+
+
+def test_fetch(server: DexterServer) -> None:
+    """A full report is downloaded in chunks."""
+
+    async def run() -> bytes:
+        async with client(server.root) as dexter:
+            return b''.join([
+                chunk async for chunk in dexter.fetch('r2', 1000)])
+
+    report = json.loads(asyncio.run(run()))
+    assert report['id'] == 'r2'
+    assert len(report['pages']) == server.detail_pages()
+
+
+def test_fetch_concurrency(server: DexterServer) -> None:
+    """Reading a report does not stop the client making other requests."""
+
+    async def run() -> None:
+        async with client(server.root, concurrency=1) as dexter:
+            chunks = dexter.fetch('r2', 1000)
+            first = await anext(chunks)
+            status = await asyncio.wait_for(dexter.status('r3'), 10)
+            assert status['id'] == 'r3'
+            rest = b''.join([chunk async for chunk in chunks])
+            assert json.loads(first + rest)['id'] == 'r2'
+
+    asyncio.run(run())
+
+
+def test_error_page(text_server: TextServer) -> None:
+    """An error page which is not JSON is the error's data."""
+
+    async def run() -> None:
+        async with client(text_server.root) as dexter:
+            await dexter.status('r1')
+
+    with pytest.raises(DexterError) as error:
+        asyncio.run(run())
+    assert error.value.status == 502
+    assert error.value.reason == 'Bad Gateway'
+    assert error.value.data == text_server.body.decode()
+
+
+def test_invalid_json(text_server: TextServer) -> None:
+    """A successful response which is not JSON raises DexterError."""
+    text_server.status = 200
+
+    async def run() -> None:
+        async with client(text_server.root) as dexter:
+            await dexter.list_reports()
+
+    with pytest.raises(DexterError) as error:
+        asyncio.run(run())
+    assert error.value.status == 200
+    assert error.value.reason == 'Invalid JSON response'
+    assert error.value.data == text_server.body.decode()
+
+
+def test_fetch_error_page(text_server: TextServer) -> None:
+    """An error page when fetching a report raises DexterError."""
+
+    async def run() -> None:
+        async with client(text_server.root) as dexter:
+            async for _ in dexter.fetch('r1'):
+                pass
+
+    with pytest.raises(DexterError) as error:
+        asyncio.run(run())
+    assert error.value.status == 502
+
+
+def test_profile() -> None:
+    """The API key and root are required."""
+    with pytest.raises(ValueError, match='api-key'):
+        DexterClient({'root': 'http://127.0.0.1/'})
+    with pytest.raises(ValueError, match='root'):
+        DexterClient({'api-key': 'test'})
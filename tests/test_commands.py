@@ -0,0 +1,373 @@
+"""Tests for the dexter commands, against the stand-in API server."""
+
+import collections
+import collections.abc
+import functools
+import io
+import json
+import socket
+import subprocess  # noqa: S404
+import time
+from typing import Any
+
+import pytest
+import requests
+
+from benchmarks.server import DexterServer
+from dexterCLI.commands import Base
+
+from .conftest import Dexter, TextServer
+
+
+def lines(output: str) -> list[dict[str, Any]]:
+    """Return the objects in some output in JSON lines format."""
+    return [json.loads(line) for line in output.splitlines()]
+
+
+def detail(server: DexterServer, report: str) -> requests.Response:
+    """Return the full report from the server."""
+    response = requests.get(f'{server.root}detail/{report}', timeout=10)
+    response.raise_for_status()
+    return response
+
+
+def free_port() -> int:
+    """Return a port on the loopback interface which is not in use."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def test_list(dexter: Dexter) -> None:
+    """Reports are listed whole, or in pages fetched in advance."""
+    result = dexter('list', 'all', '--format', 'ndjson')
+    assert result.returncode == 0, result.stderr
+    expected = [report['id'] for report in lines(result.stdout)]
+    assert expected == [f'r{number}' for number in range(10)]
+    for page_size in ('1', '3', '10', '100'):
+        result = dexter(
+            'list', 'all', '--format', 'ndjson', '--page-size', page_size)
+        assert result.returncode == 0, result.stderr
+        assert [report['id'] for report in lines(result.stdout)] == expected
+    result = dexter(
+        'list', 'all', '--format', 'ndjson', '--page-size', '3',
+        '--limit', '4')
+    assert [report['id'] for report in lines(result.stdout)] == expected[:4]
+    result = dexter(
+        'list', 'complete', '--format', 'csv', '--fields', 'id,status',
+        '--page-size', '1')
+    assert result.stdout.splitlines() == [
+        'id,status', 'r2,complete', 'r6,complete']
+
+
+def table(rows: list[list[Any]], **profile: Any) -> list[str]:  # noqa: ANN401
+    """Return the lines of a table displayed by Base.display_table()."""
+    output = io.StringIO()
+    Base.display_table({'output': output, 'width': 80, **profile}, rows)
+    return output.getvalue().splitlines()
+
+
+def test_table() -> None:
+    """Column widths are taken from the first rows, within the width."""
+    rows: list[list[Any]] = [['<Name', '>Count'], ['a', 1], ['bb', 22]]
+    assert table(rows) == [
+        'Name   Count', '-----|------', 'a          1', 'bb        22']
+    rows.append(['a longer name', 333])
+    # Rows after the window are truncated to fit the columns
+    assert table(rows, **{'table-window': '2'})[-1] == 'a lo     333'
+    assert table(rows)[-1] == 'a longer name     333'
+    # Columns with a minimum width are narrowed to fit, with less padding
+    assert table([['5<Name', '>Count'], ['x' * 100, 1]], width=20) == [
+        'Name           Count', '--------------|-----',
+        'xxxxxxxxxxxxxx     1']
+    assert table([['3!<Id', 'Name'], ['abcdef', 'x']]) == [
+        'Id    Name', '----|-----', 'abc   x   ']
+    assert table([['Name']]) == ['No results']
+
+
+def test_table_streamed() -> None:
+    """Rows are written out as they are produced."""
+
+    def rows() -> collections.abc.Iterator[list[Any]]:
+        yield ['Number']
+        for number in range(1500):
+            yield [number]
+        raise RuntimeError
+
+    output = io.StringIO()
+    with pytest.raises(RuntimeError):
+        Base.display_table(
+            {'output': output, 'width': 80, 'table-window': '10'}, rows())
+    assert len(output.getvalue().splitlines()) >= 1000
+
+
+def test_list_pages(dexter: Dexter, server: DexterServer) -> None:
+    """Pages are fetched by cursor, or by the number of reports returned."""
+    trace = dexter.home / 'trace.jsonl'
+    expected = [f'r{number}' for number in range(10)]
+    # The server returns at most 4 reports, or uses cursors
+    for max_page, cursors, page_size, count in (
+        (4, False, '5', 3), (0, True, '3', 4),
+    ):
+        server.configure(max_page=max_page, cursors=cursors)
+        result = dexter(
+            'list', 'all', '--format', 'ndjson', '--page-size', page_size,
+            env={'DEXTER_TRACE': str(trace)})
+        assert result.returncode == 0, result.stderr
+        assert [report['id'] for report in lines(result.stdout)] == expected
+        spans = collections.Counter(span['name'] for span in lines(
+            trace.read_text(encoding='utf-8')))
+        assert spans['request'] == spans['decode'] == count
+        trace.unlink()
+        result = dexter(
+            'list', 'all', '--format', 'ndjson', '--page-size', page_size,
+            '--limit', '5')
+        assert [report['id'] for report in lines(result.stdout)] == (
+            expected[:5])
+
+
+def test_fetch(dexter: Dexter, server: DexterServer) -> None:
+    """A report is the same whether or not it is fetched from the cache."""
+    expected = detail(server, 'r2').content
+    for args in (['--no-cache'], [], []):
+        result = dexter('fetch', 'r2', '--stream', *args)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.encode() == expected
+    entries = list((dexter.home / 'cache' / 'dexter').glob('*.entry'))
+    assert len(entries) == 1
+    with entries[0].open('rb') as file:
+        metadata = json.loads(file.readline())
+        assert file.read() == expected
+    assert metadata['report'] == 'r2'
+    assert metadata['etag'] == detail(server, 'r2').headers['etag']
+    result = dexter('fetch', 'r2', '--pretty')
+    assert json.loads(result.stdout) == json.loads(expected)
+
+
+def test_fetch_debug(dexter: Dexter) -> None:
+    """The debug output is the same whether or not the cache is used."""
+    uncached = dexter('--debug', 'fetch', 'r2', '--no-cache')
+    assert uncached.returncode == 0, uncached.stderr
+    assert '200 OK\nid: r2\n' in uncached.stdout
+    for _ in range(2):
+        cached = dexter('--debug', 'fetch', 'r2')
+        assert cached.returncode == 0, cached.stderr
+        assert cached.stdout == uncached.stdout
+
+
+def test_diff(dexter: Dexter) -> None:
+    """The changed pages and the counts are in separate members."""
+    for name, pages in (
+        ('a.json', [('u1', 200), ('u2', 200), ('u3', 200)]),
+        ('b.json', [('u1', 200), ('u2', 404), ('u4', 200)]),
+    ):
+        (dexter.home / name).write_text(json.dumps({
+            'id': name,
+            'pages': [
+                {'url': url, 'status': status} for url, status in pages],
+        }), encoding='utf-8')
+    result = dexter('--json', 'diff', 'a.json', 'b.json')
+    assert result.returncode == 1, result.stderr
+    assert json.loads(result.stdout) == {
+        'changes': [
+            {'change': 'changed', 'page': 'u2', 'fields': ['status']},
+            {'change': 'added', 'page': 'u4', 'fields': []},
+            {'change': 'removed', 'page': 'u3', 'fields': []},
+        ],
+        'pages': {'unchanged': 1, 'changed': 1, 'added': 1, 'removed': 1},
+        'fields': {
+            'status': {
+                'unchanged': 1, 'changed': 1, 'added': 0, 'removed': 0},
+        },
+    }
+    result = dexter('--json', 'diff', 'r2', 'r6')
+    assert result.returncode == 0, result.stderr
+    data = json.loads(result.stdout)
+    assert data['changes'] == []
+    assert data['pages']['unchanged'] > 0
+
+
+def test_export(dexter: Dexter, server: DexterServer) -> None:
+    """Many reports are downloaded to files."""
+    result = dexter('fetch', '-O', 'out', '--status', 'complete')
+    assert result.returncode == 0, result.stderr
+    assert {row['report'] for row in lines(result.stdout)} == {'r2', 'r6'}
+    for report in ('r2', 'r6'):
+        assert (dexter.home / 'out' / f'{report}.json').read_bytes() == (
+            detail(server, report).content)
+    assert sorted(path.name for path in (dexter.home / 'out').iterdir()) == [
+        'r2.json', 'r6.json']
+    # The detail URL is requested if the list leaves it out
+    server.configure(details=False)
+    result = dexter('fetch', '-O', 'listed', '--status', 'complete')
+    assert result.returncode == 0, result.stderr
+    assert {row['result'] for row in lines(result.stdout)} == {'downloaded'}
+    assert sorted(
+        path.name for path in (dexter.home / 'listed').iterdir()
+    ) == ['r2.json', 'r6.json']
+
+
+def test_resume(dexter: Dexter, server: DexterServer) -> None:
+    """A partial download is resumed if the report is unchanged."""
+    response = detail(server, 'r2')
+    out = dexter.home / 'out'
+    out.mkdir()
+    for validator, result, size in (
+        (response.headers['etag'], 'resumed', len(response.content) - 1000),
+        ('"changed"', 'downloaded', len(response.content)),
+    ):
+        (out / 'r2.json.part').write_bytes(response.content[:1000])
+        (out / 'r2.json.part.json').write_text(
+            json.dumps({'validator': validator}), encoding='utf-8')
+        process = dexter('fetch', '-O', 'out', 'r2')
+        assert process.returncode == 0, process.stderr
+        [row] = lines(process.stdout)
+        assert row['result'] == result
+        assert row['bytes'] == size
+        assert (out / 'r2.json').read_bytes() == response.content
+        assert sorted(path.name for path in out.iterdir()) == ['r2.json']
+        (out / 'r2.json').unlink()
+
+
+def test_queue_file(dexter: Dexter, server: DexterServer) -> None:
+    """Reports are queued from a file, retrying when throttled."""
+    server.configure(throttle=3)
+    (dexter.home / 'urls.txt').write_text(''.join(
+        f'https://example.com/{number} {number + 1}\n'
+        for number in range(10)), encoding='utf-8')
+    result = dexter('queue', '--from-file', 'urls.txt', '--jobs', '2')
+    assert result.returncode == 0, result.stderr
+    rows = lines(result.stdout)
+    assert [row['line'] for row in rows] == list(range(1, 11))
+    assert all(row['status'] == 201 for row in rows)
+    assert sum(row['attempts'] for row in rows) > 10
+    assert 'Queued 10 of 10 reports' in result.stderr
+
+
+def test_queue_invalid_json(dexter: Dexter, text_server: TextServer) -> None:
+    """Queued reports whose ID is not known cannot be waited for."""
+    text_server.status = 202
+    dexter.configure(text_server.root)
+    (dexter.home / 'urls.txt').write_text(
+        'https://example.com/1\nhttps://example.com/2\n', encoding='utf-8')
+    result = dexter(
+        'queue', '--from-file', 'urls.txt', '--wait', '--timeout', '5')
+    assert result.returncode == 74, result.stderr
+    rows = lines(result.stdout)
+    assert [row['error'] for row in rows] == ['Invalid JSON response'] * 2
+    result = dexter(
+        '--quiet', 'queue', 'https://example.com/', '--wait',
+        '--timeout', '5')
+    assert result.returncode == 74, result.stderr
+
+
+def test_batch(dexter: Dexter) -> None:
+    """Operations are read in the input format, and run concurrently."""
+    (dexter.home / 'operations.txt').write_text(
+        'op,report,url,pages\nstatus,r2,,\nqueue,,https://example.com/,3\n'
+        'delete,r1,,\nstatus,r99,,\n', encoding='utf-8')
+    result = dexter('batch', '--input-format', 'csv', 'operations.txt')
+    assert result.returncode == 74, result.stderr
+    assert [
+        (row['line'], row['status']) for row in lines(result.stdout)
+    ] == [(2, 200), (3, 201), (4, 204), (5, 404)]
+    (dexter.home / 'operations.jsonl').write_text(
+        '{"op": "status", "report": "r2"}\n', encoding='utf-8')
+    result = dexter('batch', 'operations.jsonl')
+    assert result.returncode == 0, result.stderr
+    [row] = lines(result.stdout)
+    assert row['response']['id'] == 'r2'
+
+
+def test_run_tasks(server: DexterServer) -> None:
+    """Tasks are taken as they are needed, and output in order."""
+    taken: list[int] = []
+    output: list[tuple[int, int]] = []
+
+    def task(number: int) -> int:
+        # Some tasks finish before those started earlier
+        time.sleep(0.01 * (3 - number % 4))
+        return number
+
+    def tasks() -> collections.abc.Iterator[
+            collections.abc.Callable[[], int]]:
+        for number in range(20):
+            taken.append(number)
+            yield functools.partial(task, number)
+
+    def write(number: int) -> None:
+        output.append((number, len(taken)))
+
+    profile: dict[str, Any] = {'root': server.root, 'api-key': 'test'}
+    Base.run_tasks(profile, 2, tasks(), write)
+    assert [number for number, _ in output] == list(range(20))
+    # No more than twice the number of jobs are waiting to be output
+    assert all(count <= number + 6 for number, count in output)
+    assert profile['pool-maxsize'] == 10
+    output.clear()
+    Base.run_tasks(profile, 4, tasks(), write, completion_order=True)
+    assert sorted(number for number, _ in output) == list(range(20))
+    assert [number for number, _ in output] != list(range(20))
+
+
+def test_queue_wait(dexter: Dexter) -> None:
+    """A queued report is waited for by receiving its callback."""
+    result = dexter(
+        'queue', 'https://example.com/', '3', '--wait', '--timeout', '10')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith('201 Created\n')
+    row = json.loads(result.stdout.splitlines()[-1])
+    assert row['via'] == 'callback'
+    assert row['response']['status'] == 'complete'
+
+
+def test_wait(dexter: Dexter, server: DexterServer) -> None:
+    """Reports are waited for by their callbacks, or by polling."""
+    port = free_port()
+    server.delay = 2
+    with subprocess.Popen(  # noqa: S603
+        dexter.command(
+            'wait', '--listen', f'127.0.0.1:{port}', '--poll-after', '30',
+            '--timeout', '20', 'r10'),
+        cwd=dexter.home,
+        encoding='utf-8',
+        env=dexter.env,
+        stdout=subprocess.PIPE,
+    ) as process:
+        # Wait for the listener before the report can call back
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        status = server.queue({
+            'url': 'https://example.com/',
+            'callback': f'http://127.0.0.1:{port}/r10',
+        })
+        assert status['id'] == 'r10'
+        stdout, _ = process.communicate(timeout=30)
+    assert process.returncode == 0
+    [row] = lines(stdout)
+    assert row['via'] == 'callback'
+    result = dexter(
+        'wait', '--poll-after', '0', '--interval', '0.1', '--timeout', '1',
+        'r2', 'r1')
+    assert result.returncode == 75
+    assert lines(result.stdout) == [
+        {'report': 'r2', 'via': 'poll', 'response': json.loads(
+            requests.get(f'{server.root}reports/r2', timeout=10).text)},
+        {'report': 'r1', 'error': 'timed out'},
+    ]
+
+
+def test_wait_terminal(dexter: Dexter) -> None:
+    """Each report is displayed on a terminal as soon as it finishes."""
+    lines = dexter.terminal(
+        'wait', '--poll-after', '0', '--interval', '0.1', '--timeout', '4',
+        'r2', 'r0')
+    [(when, line)] = [(when, line) for when, line in lines if 'r2' in line]
+    assert json.loads(line)['via'] == 'poll'
+    assert when < 3
@@ -0,0 +1,74 @@
+"""Tests for compressed transfer, output and input."""
+
+import gzip
+import io
+import json
+from pathlib import Path
+
+import brotli  # type: ignore[import-untyped]
+import pytest
+import requests
+
+from benchmarks.server import DexterServer
+from dexterCLI.compress import decompress, decompress_chunks, open_output
+
+from .conftest import Dexter
+
+
+@pytest.mark.parametrize('encoding', ['br', 'gzip'])
+def test_decompress(encoding: str) -> None:
+    """Data is decompressed as it is read, including multi-member gzip."""
+    data = b'{"id": "r1", "pages": []}' * 1000
+    if encoding == 'br':
+        compressed = brotli.compress(data)
+    else:
+        compressed = gzip.compress(data[:10000]) + gzip.compress(data[10000:])
+    with decompress(io.BytesIO(compressed), encoding) as file:
+        assert file.read() == data
+    chunks = [compressed[start:start + 100]
+              for start in range(0, len(compressed), 100)]
+    assert b''.join(decompress_chunks(chunks, encoding)) == data
+    assert list(decompress_chunks([data], None)) == [data]
+
+
+@pytest.mark.parametrize('suffix', ['.br', '.gz'])
+def test_open_output(tmp_path: Path, suffix: str) -> None:
+    """Output is compressed according to the filename."""
+    path = tmp_path / f'output{suffix}'
+    with open_output(str(path)) as output:
+        output.write('text\n' * 1000)
+    data = path.read_bytes()
+    assert (brotli.decompress(data) if suffix == '.br' else
+            gzip.decompress(data)) == b'text\n' * 1000
+
+
+def test_fetch(dexter: Dexter, server: DexterServer) -> None:
+    """Reports compressed in transfer are output as they were, or not."""
+    expected = requests.get(
+        f'{server.root}detail/r2', timeout=10,
+        headers={'Accept-Encoding': 'identity'}).content
+    server.configure(encoding='br')
+    transferred = requests.get(
+        f'{server.root}detail/r2', timeout=10, stream=True,
+        headers={'Accept-Encoding': 'br'}).raw.read()
+    for args in (['--no-cache'], [], []):
+        result = dexter(
+            '-o', 'report.json.br', 'fetch', 'r2', '--stream', *args)
+        assert result.returncode == 0, result.stderr
+        # Passed through without being decompressed and compressed again
+        assert (dexter.home / 'report.json.br').read_bytes() == transferred
+        result = dexter('fetch', 'r2', '--stream', *args)
+        assert result.stdout.encode() == expected
+        result = dexter(
+            '--compress', 'gz', '-o', 'report.json', 'fetch', 'r2',
+            '--stream', *args)
+        assert result.returncode == 0, result.stderr
+        assert gzip.decompress(
+            (dexter.home / 'report.json').read_bytes()) == expected
+    [entry] = (dexter.home / 'cache' / 'dexter').glob('*.entry')
+    with entry.open('rb') as file:
+        assert json.loads(file.readline())['encoding'] == 'br'
+        assert file.read() == transferred
+    result = dexter('--json', 'diff', 'report.json.br', 'r2')
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['changes'] == []
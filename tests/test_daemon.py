@@ -0,0 +1,123 @@
+"""Tests for running dexter commands using the daemon."""
+
+import collections.abc
+import json
+from pathlib import Path
+import subprocess  # noqa: S404
+import sys
+import time
+
+import pytest
+import requests
+import requests.adapters
+
+from benchmarks.server import DexterServer
+from dexterCLI.api import session
+from dexterCLI.daemon import Profiles
+
+from .conftest import Dexter
+
+
+@pytest.fixture
+def daemon(
+    dexter: Dexter, tmp_path: Path
+) -> collections.abc.Iterator[Dexter]:
+    """Start the daemon, returning a runner for commands which use it."""
+    directory = tmp_path / 'daemon'
+    directory.mkdir()
+    dexter.env['DEXTER_SOCKET'] = str(tmp_path / 'dexter.sock')
+    del dexter.env['DEXTER_DAEMON']
+    with subprocess.Popen(  # noqa: S603
+        dexter.command('daemon'),
+        cwd=directory,
+        env=dexter.env,
+        stdin=subprocess.DEVNULL,
+    ) as process:
+        deadline = time.monotonic() + 10
+        while not (tmp_path / 'dexter.sock').exists():
+            assert time.monotonic() < deadline, 'the daemon did not start'
+            assert process.poll() is None, 'the daemon exited'
+            time.sleep(0.05)
+        yield dexter
+        assert dexter('daemon', '--stop').returncode == 0
+        assert process.wait(10) == 0
+    assert list(directory.iterdir()) == []
+
+
+def forwarded(
+    daemon: Dexter, *args: str, cwd: Path, env: dict[str, str] | None = None
+) -> str:
+    """Run a command using the daemon, returning its output."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, '-X', 'importtime', *daemon.command(*args)[1:]],
+        capture_output=True,
+        check=False,
+        cwd=cwd,
+        encoding='utf-8',
+        env={**daemon.env, **(env or {})},
+        stdin=subprocess.DEVNULL,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    # Only the daemon, not the client, imports the commands
+    assert 'dexterCLI.cli' not in result.stderr
+    return result.stdout
+
+
+def test_relative_paths(daemon: Dexter, server: DexterServer) -> None:
+    """Relative paths are resolved against each client's directory."""
+    directories = [daemon.home / 'a', daemon.home / 'b']
+    for directory, report in zip(directories, ('r2', 'r6'), strict=True):
+        directory.mkdir()
+        (directory / 'urls.txt').write_text(
+            f'https://example.com/{directory.name}\n', encoding='utf-8')
+        forwarded(
+            daemon, '--output', 'report.json', 'fetch', report, '--stream',
+            cwd=directory)
+        assert (directory / 'report.json').read_bytes() == requests.get(
+            f'{server.root}detail/{report}', timeout=10).content
+        forwarded(daemon, 'fetch', '-O', 'out', report, cwd=directory)
+        assert (directory / 'out' / f'{report}.json').exists()
+        output = forwarded(
+            daemon, 'queue', '--from-file', 'urls.txt', cwd=directory)
+        assert json.loads(output)['url'] == (
+            f'https://example.com/{directory.name}')
+    output = forwarded(
+        daemon, '--json', 'diff', 'report.json', '../b/report.json',
+        cwd=directories[0])
+    assert json.loads(output)['changes'] == []
+
+
+def test_environment(daemon: Dexter) -> None:
+    """The client's environment is used for the cache directory."""
+    for name in ('a', 'b'):
+        forwarded(
+            daemon, 'fetch', 'r2', '--stream', cwd=daemon.home,
+            env={'XDG_CACHE_HOME': str(daemon.home / name)})
+        assert len(list((daemon.home / name / 'dexter').iterdir())) == 1
+    assert not (daemon.home / 'cache').exists()
+
+
+def test_worker_output(daemon: Dexter, server: DexterServer) -> None:
+    """Output from a command's worker threads goes to the client."""
+    (daemon.home / 'operations.jsonl').write_text(''.join(
+        f'{{"op": "status", "report": "r{number}"}}\n'
+        for number in range(4)), encoding='utf-8')
+    output = forwarded(
+        daemon, '--debug', 'batch', 'operations.jsonl', cwd=daemon.home)
+    assert sorted(
+        line for line in output.splitlines() if line.startswith('GET ')
+    ) == [f'GET {server.root}reports/r{number}' for number in range(4)]
+
+
+def test_pool_size(dexter: Dexter) -> None:
+    """A command may use more connections than the shared session has."""
+    profiles = Profiles()
+    rcfile = str(dexter.home / '.dexter.conf')
+    http = session(profiles.load(rcfile=rcfile))
+    profile = profiles.load(rcfile=rcfile)
+    profile['pool-maxsize'] = 32
+    assert session(profile) is http
+    adapter = http.get_adapter('http://127.0.0.1/')
+    assert isinstance(adapter, requests.adapters.HTTPAdapter)
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 32
@@ -0,0 +1,83 @@
+"""Tests for the 'index' and 'query' commands."""
+
+import argparse
+import json
+
+import pytest
+
+from dexterCLI.index import parse_statuses, search_query
+
+from .conftest import Dexter
+
+
+def query(dexter: Dexter, *args: str) -> list[dict[str, object]]:
+    """Run a query, returning the matching records."""
+    result = dexter('--json', 'query', *args)
+    assert result.returncode == 0, result.stderr
+    records: list[dict[str, object]] = json.loads(result.stdout)
+    return records
+
+
+def test_parse_statuses() -> None:
+    """Statuses are parsed as ranges, and classes of statuses."""
+    assert parse_statuses('404, 5xx') == [(404, 404), (500, 599)]
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_statuses('6xx')
+
+
+def test_search_query() -> None:
+    """Words are searched for literally, as phrases."""
+    assert search_query('page "one" OR') == '"page" """one""" "OR"'
+
+
+def test_index(dexter: Dexter) -> None:
+    """Reports are indexed once, unless forced, and then queried."""
+    result = dexter('query')
+    assert result.returncode == 74
+    assert 'there is no index' in result.stderr
+    result = dexter('index', 'r2', 'r6')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith('Indexed 2 reports (')
+    assert result.stdout.endswith(', skipped 0 already indexed\n')
+    result = dexter('index', 'r2', 'r6')
+    assert result.stdout.startswith('Indexed 0 reports (0 pages)')
+    assert result.stdout.endswith(', skipped 2 already indexed\n')
+    # Every report in the cache, if none are given
+    result = dexter('index', '--force')
+    assert result.stdout.startswith('Indexed 2 reports (')
+
+    pages = query(dexter)
+    assert {page['report'] for page in pages} == {'r2', 'r6'}
+    r2 = query(dexter, '--report', 'r2')
+    assert [page['position'] for page in r2] == list(range(len(r2)))
+    assert r2[1]['url'] == 'https://example.com/page/0000000001'
+    assert r2[1]['title'] == 'Page 0000000001'
+    assert r2[1]['status'] == 200
+    assert query(dexter, '--limit', '3') == pages[:3]
+    assert len(query(
+        dexter, '--url', 'https://example.com/page/000000000?')) == 20
+    assert len(query(dexter, '--status', '2xx')) == len(pages)
+    assert query(dexter, '--status', '404,5xx') == []
+    [report] = query(dexter, '--reports', '--report', 'r6')
+    assert report['id'] == 'r6'
+    assert report['url'] == 'https://example.com/site/6'
+    assert report['status'] == 'complete'
+    assert report['pages'] == report['matched'] == len(pages) - len(r2)
+    # The full data of each page, as fetched
+    assert r2[0]['links'] == [
+        'https://example.com/', 'https://example.com/about']
+
+
+def test_search(dexter: Dexter) -> None:
+    """Pages are only searched with a full-text index."""
+    assert dexter('index', 'r2').returncode == 0
+    result = dexter('query', '--search', 'page')
+    assert result.returncode == 64
+    assert 'requires a full-text index' in result.stderr
+    result = dexter('index', '--fts', 'r6')
+    assert result.returncode == 0, result.stderr
+    # Reports already indexed are added to the full-text index
+    pages = query(dexter, '--search', 'Page 0000000003')
+    assert [(page['report'], page['position']) for page in pages] == [
+        ('r2', 3), ('r6', 3)]
+    assert query(dexter, '--search', 'missing') == []
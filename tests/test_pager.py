@@ -0,0 +1,80 @@
+"""Tests for dexterCLI's output pager."""
+
+import io
+from pathlib import Path
+
+from dexterCLI.pager import Pager
+
+from .conftest import Dexter
+
+
+def pager_script(path: Path) -> str:
+    """Write a pager which marks its output, returning its path."""
+    path.write_text('#!/bin/sh\necho PAGED\nexec cat\n', encoding='utf-8')
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_short(tmp_path: Path) -> None:
+    """Output which fits on the screen is written when it is closed."""
+    output = io.StringIO()
+    pager = Pager(
+        output, 10, 5, environ={'PAGER': pager_script(tmp_path / 'pager')})
+    pager.write('one\ntwo\n')
+    # Two lines of the screen
+    pager.write('a line which wraps\n')
+    assert not output.getvalue()
+    pager.close()
+    assert output.getvalue() == 'one\ntwo\na line which wraps\n'
+
+
+def test_long(tmp_path: Path) -> None:
+    """The pager is started once the output exceeds the screen."""
+    with (tmp_path / 'output').open('w', encoding='utf-8') as output:
+        pager = Pager(
+            output, 80, 3,
+            environ={'PAGER': pager_script(tmp_path / 'pager')})
+        pager.write('one\ntwo\n')
+        assert pager.process is None
+        pager.write('three\nfour\n')
+        assert pager.process is not None
+        pager.write('five\n')
+        pager.close()
+    assert (tmp_path / 'output').read_text(encoding='utf-8') == (
+        'PAGED\none\ntwo\nthree\nfour\nfive\n')
+
+
+def test_flush(tmp_path: Path) -> None:
+    """Output which is flushed is written straight away, and not paged."""
+    output = io.StringIO()
+    pager = Pager(
+        output, 80, 2, environ={'PAGER': pager_script(tmp_path / 'pager')})
+    pager.write('one\n')
+    pager.flush()
+    assert output.getvalue() == 'one\n'
+    pager.write('two\nthree\nfour\n')
+    assert pager.process is None
+    assert output.getvalue() == 'one\ntwo\nthree\nfour\n'
+    pager.close()
+
+
+def test_no_pager(tmp_path: Path) -> None:
+    """Output is written directly if the pager cannot be run."""
+    output = io.StringIO()
+    pager = Pager(output, 80, 2, environ={'PAGER': str(tmp_path / 'none')})
+    pager.write('one\ntwo\nthree\n')
+    assert output.getvalue() == 'one\ntwo\nthree\n'
+    pager.close()
+
+
+def test_terminal(dexter: Dexter) -> None:
+    """Only output longer than the terminal is paged."""
+    env = {'LINES': '24', 'PAGER': pager_script(dexter.home / 'pager')}
+    lines = [line for _, line in dexter.terminal('status', 'r2', env=env)]
+    assert 'PAGED' not in lines
+    assert 'id: r2' in lines
+    lines = [
+        line for _, line in dexter.terminal(
+            '--verbose', 'list', 'all', env=env)]
+    assert lines[0] == 'PAGED'
+    assert len(lines) > 24
@@ -0,0 +1,179 @@
+"""Tests for dexterCLI's streaming JSON utilities."""
+
+import collections.abc
+import io
+import json
+from typing import Any
+
+import pytest
+
+from dexterCLI.stream import (
+    dump_events,
+    dump_verbose,
+    iter_events,
+    iter_items,
+    iter_value_events,
+)
+
+DOCUMENTS = [
+    {},
+    [],
+    'text',
+    12345678,
+    None,
+    {'id': 'r1', 'pages': []},
+    {'id': 'r1', 'pages': [{}, [], {'a': []}]},
+    {
+        'id': 'r1',
+        'pages': [
+            {
+                'url': 'https://example.com/é',
+                'status': 200,
+                'time': 0.25,
+                'ok': True,
+                'error': None,
+                'links': ['https://example.com/', 'tab\there'],
+                'headers': {'content-type': 'text/html', 'x-empty': {}},
+            },
+            {'url': 'https://example.com/"quoted"', 'status': -1e-07},
+        ],
+        'total': 2,
+    },
+    [[1, [2, [3, [4, []]]]], {'a': {'b': {'c': {'d': 'e'}}}}],
+]
+
+
+def chunked(text: str, size: int) -> list[bytes]:
+    """Return a document encoded as UTF-8 in chunks of 'size' bytes."""
+    data = text.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def verbose(data: Any, output: io.StringIO, indent: str = '') -> None:  # noqa: ANN401
+    """Write data in the 'verbose' format, rendering it recursively."""
+    if data is None:
+        output.write('null')
+    elif isinstance(data, str):
+        output.write(data if data.isprintable() else repr(data))
+    elif isinstance(data, bool):
+        output.write('true' if data else 'false')
+    elif isinstance(data, (int, float)):
+        output.write(f'{data:,}')
+    elif data:
+        if indent:
+            output.write('\n')
+        items = data.items() if isinstance(data, dict) else enumerate(data)
+        for row, (key, value) in enumerate(items):
+            output.write(
+                indent + (f'{key}: ' if isinstance(data, dict) else ''))
+            verbose(value, output, indent + '    ')
+            if row < len(data) - 1:
+                output.write('\n')
+
+
+def render(
+    function: collections.abc.Callable[..., Any],
+    events: collections.abc.Iterable[tuple[str, Any]],
+) -> str:
+    """Return what a function writes given some parser events."""
+    output = io.StringIO()
+    function(events, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('size', [1, 7, 1 << 20])
+def test_dump_events(document: Any, size: int) -> None:  # noqa: ANN401
+    """Events are written as json.dump() would write the document."""
+    text = json.dumps(document)
+    expected = json.dumps(document, indent=2)
+    assert render(dump_events, iter_events(chunked(text, size))) == expected
+    assert render(
+        dump_events, iter_value_events(chunked(text, size))) == expected
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+@pytest.mark.parametrize('depth', [0, 1, 2, 10])
+def test_dump_verbose(document: Any, depth: int) -> None:  # noqa: ANN401
+    """The verbose format is the same however the document is parsed."""
+    expected = io.StringIO()
+    verbose(document, expected)
+    text = json.dumps(document)
+    assert render(
+        dump_verbose, iter_events(chunked(text, 3))) == expected.getvalue()
+    assert render(
+        dump_verbose, iter_value_events(chunked(text, 3), depth)
+    ) == expected.getvalue()
+    assert render(dump_verbose, [('value', document)]) == expected.getvalue()
+
+
+def test_dump_verbose_indent() -> None:
+    """Containers start on a new line when there is an indent."""
+    output = io.StringIO()
+    assert dump_verbose([('value', {'a': [1, 2], 'b': {}})], output, '  ')
+    assert output.getvalue() == '\n  a: \n      1\n      2\n  b: '
+    assert not dump_verbose([('value', [])], io.StringIO())
+
+
+def test_dump_verbose_deep() -> None:
+    """Documents nested beyond the recursion limit can be rendered."""
+    # The output grows with the square of the depth, because of the indent
+    depth = 3000
+    for text, expected in (
+        (
+            '[' * depth + '1' + ']' * depth,
+            '\n'.join(' ' * 4 * level for level in range(depth)) + '1',
+        ),
+        (
+            '{"a": ' * depth + '1' + '}' * depth,
+            '\n'.join(
+                ' ' * 4 * level + 'a: ' for level in range(depth)) + '1',
+        ),
+    ):
+        assert render(dump_verbose, iter_events([text])) == expected
+
+
+def test_iter_value_events() -> None:
+    """Values nested more deeply than 'depth' are decoded whole."""
+    text = json.dumps({'id': 'r1', 'pages': [{'url': 'u1'}, {'url': 'u2'}]})
+    assert list(iter_value_events(chunked(text, 5))) == [
+        ('start_map', None),
+        ('map_key', 'id'),
+        ('value', 'r1'),
+        ('map_key', 'pages'),
+        ('start_array', None),
+        ('value', {'url': 'u1'}),
+        ('value', {'url': 'u2'}),
+        ('end_array', None),
+        ('end_map', None),
+    ]
+    assert list(iter_value_events([text], 0)) == [
+        ('value', json.loads(text))]
+
+
+def test_iter_items() -> None:
+    """The items of one member are yielded, and the others skipped."""
+    text = json.dumps({
+        'before': {'reports': [1]},
+        'reports': {'r1': {'id': 'r1'}, 'r2': {'id': 'r2'}},
+        'total': 2,
+    })
+    assert list(iter_items(chunked(text, 2), 'reports')) == [
+        ('r1', {'id': 'r1'}), ('r2', {'id': 'r2'})]
+    assert list(iter_items(['{"reports": [3, 4]}'], 'reports')) == [
+        (0, 3), (1, 4)]
+    assert list(iter_items(['{}'], 'reports')) == []
+
+
+@pytest.mark.parametrize('text', [
+    '{"id": "r1", "pages": [1, 2',
+    '{"id": "r1"} x',
+    '{"id" "r1"}',
+    '[1, 2,]',
+    '',
+])
+def test_invalid(text: str) -> None:
+    """Invalid or incomplete documents raise JSONDecodeError."""
+    for parse in (iter_events, iter_value_events):
+        with pytest.raises(json.JSONDecodeError):
+            list(parse([text]))
@@ -0,0 +1,79 @@
+"""Tests for the --timings option and DEXTER_TRACE."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from dexterCLI.trace import Tracer, count_bytes, span
+
+from .conftest import Dexter
+
+
+def test_tracer(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Spans are written to the trace file, and totalled in the summary."""
+    tracer = Tracer(str(tmp_path / 'trace.jsonl'), summary=True)
+    for _ in range(2):
+        with tracer.span('download', url='/detail/r1') as attributes:
+            for _ in count_bytes([b'12345', b'678'], attributes):
+                pass
+    with span(tracer, 'render', format='json'):
+        pass
+    with span(None, 'render') as attributes:
+        attributes['bytes'] = 1
+    tracer.close()
+    spans = [
+        json.loads(line)
+        for line in (tmp_path / 'trace.jsonl').read_text(
+            encoding='utf-8').splitlines()]
+    assert [item['name'] for item in spans] == [
+        'download', 'download', 'render']
+    assert spans[0]['bytes'] == 8
+    assert spans[0]['url'] == '/detail/r1'
+    assert spans[2]['format'] == 'json'
+    assert all(item['duration'] >= 0 for item in spans)
+    header, *lines = capsys.readouterr().err.splitlines()
+    assert header.split() == ['Phase', 'Count', 'Total', 'Mean', 'Bytes']
+    assert [line.split()[:2] for line in lines] == [
+        ['download', '2'], ['render', '1']]
+    assert lines[0].split()[-1] == '16'
+
+
+def test_timings(dexter: Dexter) -> None:
+    """A command's timings are summarised on stderr."""
+    result = dexter('--timings', 'fetch', 'r2', '--stream')
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['id'] == 'r2'
+    header, *lines = result.stderr.splitlines()
+    assert header.split()[0] == 'Phase'
+    phases = {line.split()[0]: line.split() for line in lines}
+    assert {'request', 'download', 'command'} <= set(phases)
+    assert phases['command'][1] == '1'
+    assert int(phases['download'][-1].replace(',', '')) == len(
+        result.stdout.encode())
+    # Nothing is written without the option
+    assert not dexter('fetch', 'r2', '--stream').stderr
+
+
+def test_trace_file(dexter: Dexter) -> None:
+    """Spans are appended to the file named by DEXTER_TRACE."""
+    env = {'DEXTER_TRACE': 'trace.jsonl'}
+    for _ in range(2):
+        result = dexter('fetch', 'r2', '--stream', env=env)
+        assert result.returncode == 0, result.stderr
+        assert not result.stderr
+    spans = [
+        json.loads(line)
+        for line in (dexter.home / 'trace.jsonl').read_text(
+            encoding='utf-8').splitlines()]
+    commands = [item for item in spans if item['name'] == 'command']
+    assert [item['command'] for item in commands] == ['fetch', 'fetch']
+    first = spans.index(commands[0]) + 1
+    requests = [
+        item for item in spans
+        if item['name'] == 'request' and item['url'].endswith('/detail/r2')]
+    assert [item['status'] for item in requests] == [200, 304]
+    # The second fetch reads the report from the cache
+    assert 'download' in [item['name'] for item in spans[:first]]
+    assert 'download' not in [item['name'] for item in spans[first:]]
+    assert 'render' in [item['name'] for item in spans[first:]]
@@ -0,0 +1,106 @@
+"""Tests for the --watch option of the 'list' and 'status' commands."""
+
+import io
+import json
+from typing import Any
+
+import pytest
+
+from benchmarks.server import DexterServer
+from dexterCLI.commands import Base
+
+from .conftest import Dexter
+
+
+class Terminal(io.StringIO):
+    """Output which is taken to be a terminal."""
+
+    def isatty(self) -> bool:  # noqa: PLR6301
+        """Return True."""
+        return True
+
+
+class Response:
+    """Stand-in for a response from the API."""
+
+    def __init__(self, status_code: int, data: Any = None) -> None:  # noqa: ANN401
+        """Initialise the response, with its data as JSON."""
+        self.status_code = status_code
+        self.content = json.dumps(data).encode()
+        self.headers = {'etag': f'"{len(self.content)}"'}
+
+    def json(self) -> Any:  # noqa: ANN401
+        """Return the response's data."""
+        return json.loads(self.content)
+
+
+def test_redraw() -> None:
+    """Only the lines which have changed are redrawn on a terminal."""
+    output = Terminal()
+    profile = {'output': output, 'width': 10}
+    Base.redraw(profile, None, ['one', 'two', 'three'])
+    assert output.getvalue() == 'one\ntwo\nthree\n'
+    output.seek(0)
+    output.truncate()
+    Base.redraw(profile, ['one', 'two', 'three'], ['one', 'TWO', 'three'])
+    assert output.getvalue() == '\x1b[2A\r\x1b[2KTWO\r\x1b[2B'
+    output.seek(0)
+    output.truncate()
+    Base.redraw(profile, ['one', 'two', 'three'], ['one'])
+    assert output.getvalue() == '\x1b[2A\x1b[J'
+    output.seek(0)
+    output.truncate()
+    Base.redraw(profile, ['one'], ['one', 'a line which is too long'])
+    assert output.getvalue() == 'a line whi\n'
+
+
+def test_redraw_file() -> None:
+    """Output which is not a terminal is only written when it changes."""
+    output = io.StringIO()
+    profile = {'output': output, 'width': 10}
+    Base.redraw(profile, None, ['one'])
+    Base.redraw(profile, ['one'], ['one'])
+    Base.redraw(profile, ['one'], ['two', 'three'])
+    assert output.getvalue() == 'one\n\ntwo\nthree\n'
+
+
+def test_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The interval increases while nothing changes, unless active."""
+    statuses = [
+        'queued', 'queued', 'queued', 'queued', 'running', 'running',
+        'queued', 'complete']
+    responses = iter(statuses)
+    delays: list[float] = []
+    requests: list[dict[str, str]] = []
+    monkeypatch.setattr('dexterCLI.commands.time.sleep', delays.append)
+
+    def request(headers: dict[str, str]) -> Response:
+        requests.append(dict(headers))
+        return Response(200, {'status': next(responses)})
+
+    output = io.StringIO()
+    assert Base.watch(
+        {'output': output, 'width': 80},
+        1,
+        request,  # type: ignore[arg-type]
+        lambda profile, response: profile['output'].write(
+            response.json()['status'] + '\n') and 0,
+        lambda data: (
+            data['status'] == 'running', data['status'] == 'complete'),
+    ) == 0
+    assert delays == [1, 1.5, 2.25, 3.375, 1, 1, 1]
+    assert requests[0] == {}
+    assert requests[1] == {'If-None-Match': '"20"'}
+    assert output.getvalue().split() == [
+        'queued', 'running', 'queued', 'complete']
+
+
+def test_status(dexter: Dexter, server: DexterServer) -> None:
+    """Watching a report's status stops when it is complete."""
+    server.delay = 0.3
+    server.queue({'url': 'https://example.com/'})
+    result = dexter('status', 'r10', '--watch', '0.1')
+    assert result.returncode == 0, result.stderr
+    paragraphs = result.stdout.split('\n\n')
+    assert 'status: queued' in paragraphs[0]
+    assert 'status: complete' in paragraphs[-1]